@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
-from utils.auth import initialize_session, check_authentication
+from utils.auth import initialize_session, check_authentication, start_session
 from utils.database import initialize_database
+from utils.passwords import PasswordHashBusy
+from utils.session_tokens import SESSION_URL_TOKENS
 
 # Configure the page
 st.set_page_config(
@@ -125,18 +127,19 @@ def login_form():
     with st.form("login_form"):
         username = st.text_input("Username")
         password = st.text_input("Password", type="password")
-        remember_me = st.checkbox("Remember me")
+        # Remembering a login needs a URL token, which is off unless SESSION_URL_TOKENS is set
+        remember_me = st.checkbox("Remember me") if SESSION_URL_TOKENS else False
         
         if st.form_submit_button("Login", use_container_width=True):
             if username and password:
                 # Simple authentication (in production, use proper password hashing)
-                if authenticate_user(username, password):
-                    st.session_state.authenticated = True
-                    st.session_state.user_data = {
-                        'username': username,
-                        'role': 'student',  # Default role
-                        'login_time': pd.Timestamp.now()
-                    }
+                try:
+                    user_record = authenticate_user(username, password)
+                except PasswordHashBusy as e:
+                    st.warning(str(e))
+                    return
+                if user_record:
+                    start_session(user_record, remember=remember_me)
                     st.success("Login successful!")
                     st.rerun()
                 else:
@@ -0,0 +1,139 @@
+"""
+Benchmark per-user, newest-first queries before and after the composite indexes
+
+Builds a throwaway SQLite database with ``--rows`` activity rows spread over
+``--users`` users, runs the dashboard queries without the composite indexes,
+applies migrate_indexes() and runs them again.
+
+Usage: python benchmarks/bench_composite_indexes.py [--rows 1000000] [--users 2000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def build_database(engine, rows: int, users: int):
+    """Bulk-load synthetic activities and quiz results"""
+    activity_types = ['lesson_viewed', 'lesson_completed', 'dashboard_visit', 'search_performed', 'quiz_completed']
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        batch = []
+        for i in range(rows):
+            batch.append((
+                rng.randint(1, users),
+                rng.choice(activity_types),
+                '{}',
+                (start + timedelta(seconds=i * 7)).isoformat(sep=' ')
+            ))
+            if len(batch) == 50000:
+                cursor.executemany(
+                    "INSERT INTO user_activities (user_id, activity_type, activity_data, timestamp) VALUES (?, ?, ?, ?)",
+                    batch
+                )
+                batch.clear()
+        if batch:
+            cursor.executemany(
+                "INSERT INTO user_activities (user_id, activity_type, activity_data, timestamp) VALUES (?, ?, ?, ?)",
+                batch
+            )
+
+        cursor.executemany(
+            "INSERT INTO quiz_results (user_id, quiz_topic, language, total_questions, correct_answers, score_percentage, completed_at) "
+            "VALUES (?, 'loops', 'python', 10, ?, ?, ?)",
+            [(rng.randint(1, users), c, c * 10.0, (start + timedelta(minutes=i)).isoformat(sep=' '))
+             for i, c in ((i, rng.randint(0, 10)) for i in range(rows // 10))]
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+QUERIES = {
+    'recent_activities': (
+        "SELECT * FROM user_activities WHERE user_id = :uid ORDER BY timestamp DESC LIMIT 10"
+    ),
+    'lessons_completed': (
+        "SELECT COUNT(*) FROM user_activities WHERE user_id = :uid AND activity_type = 'lesson_completed'"
+    ),
+    'activity_count': (
+        "SELECT COUNT(*) FROM user_activities WHERE user_id = :uid"
+    ),
+    'recent_quizzes': (
+        "SELECT * FROM quiz_results WHERE user_id = :uid ORDER BY completed_at DESC LIMIT 50"
+    ),
+}
+
+def run_queries(engine, users: int, samples: int):
+    """Return {query: (plan, mean_ms, p95_ms)}"""
+    from sqlalchemy import text
+
+    rng = random.Random(7)
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = ' | '.join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), {'uid': 1}))
+            timings = []
+            for _ in range(samples):
+                uid = rng.randint(1, users)
+                started = time.perf_counter()
+                conn.execute(text(sql), {'uid': uid}).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = (plan, sum(timings) / len(timings), timings[int(len(timings) * 0.95) - 1])
+    return results
+
+def print_results(title: str, results):
+    print(f"\n{title}")
+    for name, (plan, mean_ms, p95_ms) in results.items():
+        print(f"  {name:18} mean {mean_ms:9.3f} ms  p95 {p95_ms:9.3f} ms  plan: {plan}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--samples', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_indexes_")
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from utils.db_schema import Base, engine, migrate_indexes
+
+    # Create the tables as an old database had them: without the composite indexes
+    composite = {}
+    for table in Base.metadata.sorted_tables:
+        composite[table.name] = [ix for ix in table.indexes if len(ix.columns) > 1]
+        for index in composite[table.name]:
+            table.indexes.discard(index)
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        table.indexes.update(composite[table.name])
+
+    print(f"Loading {args.rows:,} activity rows for {args.users:,} users into {workdir} ...")
+    started = time.perf_counter()
+    build_database(engine, args.rows, args.users)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"Loaded in {time.perf_counter() - started:.1f}s")
+
+    print_results("Before (single-column id indexes only):", run_queries(engine, args.users, args.samples))
+
+    started = time.perf_counter()
+    created = migrate_indexes()
+    print(f"\nmigrate_indexes() created {', '.join(created)} in {time.perf_counter() - started:.1f}s")
+
+    print_results("After (composite per-user indexes):", run_queries(engine, args.users, args.samples))
+
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
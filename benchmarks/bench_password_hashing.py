@@ -0,0 +1,118 @@
+"""
+Benchmark login latency under a burst of concurrent logins
+
+Creates --users accounts in a temporary SQLite file, then fires --logins
+simultaneous authenticate_user_db calls (the start-of-class login storm) and
+reports latency percentiles and throughput. Logins refused by admission
+control (PasswordHashBusy) are counted separately and fail fast. Cost
+settings are read from the usual environment variables, so compare
+configurations by running it again:
+
+    python benchmarks/bench_password_hashing.py
+    SCRYPT_N=32768 python benchmarks/bench_password_hashing.py
+    PASSWORD_HASH_ALGORITHM=pbkdf2_sha256 PBKDF2_ITERATIONS=300000 python benchmarks/bench_password_hashing.py
+    PASSWORD_HASH_WORKERS=2 python benchmarks/bench_password_hashing.py
+    PASSWORD_HASH_MAX_WAIT_MS=100000 python benchmarks/bench_password_hashing.py  # admit everything
+
+Usage: python benchmarks/bench_password_hashing.py [--logins 200] [--users 200] [--legacy]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--legacy', action='store_true', help="Seed legacy SHA-256 hashes, so every login also rehashes")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_passwords_")
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    try:
+        from sqlalchemy import insert
+        from utils import passwords
+        from utils.auth import authenticate_user_db
+        from utils.db_schema import User, SessionLocal, create_tables
+
+        create_tables()
+
+        print(f"algorithm={passwords.PASSWORD_HASH_ALGORITHM} scrypt_n={passwords.SCRYPT_N} "
+              f"pbkdf2_iterations={passwords.PBKDF2_ITERATIONS} workers={passwords.PASSWORD_HASH_WORKERS} "
+              f"cpus={os.cpu_count()}")
+
+        started = time.perf_counter()
+        if args.legacy:
+            hashes = [hashlib.sha256(f"pw{i}".encode()).hexdigest() for i in range(args.users)]
+        else:
+            hashes = [passwords.hash_password(f"pw{i}") for i in range(args.users)]
+        print(f"seeded {args.users} hashes in {time.perf_counter() - started:.2f}s")
+
+        with SessionLocal() as db:
+            db.execute(insert(User), [
+                {'username': f"user{i}", 'email': f"user{i}@example.com", 'password_hash': hashes[i]}
+                for i in range(args.users)
+            ])
+            db.commit()
+
+        latencies = []
+        rejected_latencies = []
+        failures = 0
+        lock = threading.Lock()
+        barrier = threading.Barrier(args.logins)
+
+        def login(i):
+            nonlocal failures
+            user = i % args.users
+            barrier.wait()
+            begin = time.perf_counter()
+            try:
+                ok = authenticate_user_db(f"user{user}", f"pw{user}") is not None
+            except passwords.PasswordHashBusy:
+                with lock:
+                    rejected_latencies.append((time.perf_counter() - begin) * 1000)
+                return
+            elapsed = (time.perf_counter() - begin) * 1000
+            with lock:
+                latencies.append(elapsed)
+                failures += 0 if ok else 1
+
+        threads = [threading.Thread(target=login, args=(i,)) for i in range(args.logins)]
+        burst_started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - burst_started
+
+        latencies.sort()
+        print(f"{args.logins} concurrent logins in {wall:.2f}s, admitted={len(latencies)} "
+              f"({len(latencies) / wall:.0f} logins/s), failures={failures}, busy={len(rejected_latencies)}")
+        if latencies:
+            print(f"admitted latency ms: p50={percentile(latencies, 50):.0f} p95={percentile(latencies, 95):.0f} "
+                  f"p99={percentile(latencies, 99):.0f} max={latencies[-1]:.0f}")
+        if rejected_latencies:
+            rejected_latencies.sort()
+            print(f"busy latency ms: p99={percentile(rejected_latencies, 99):.0f} max={rejected_latencies[-1]:.0f}")
+
+        if args.legacy:
+            with SessionLocal() as db:
+                upgraded = sum(1 for (h,) in db.query(User.password_hash) if not passwords.needs_rehash(h))
+            print(f"rehashed to the configured KDF: {upgraded}/{args.users}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
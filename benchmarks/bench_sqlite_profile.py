@@ -0,0 +1,95 @@
+"""
+Benchmark concurrent read/write throughput with and without the SQLite profile
+
+Runs writer threads doing one-row commits (the old per-click pattern) and
+reader threads running the per-user dashboard query against the same file,
+first with SQLITE_PROFILE=default and then with the production profile.
+
+Usage: python benchmarks/bench_sqlite_profile.py [--writers 4] [--readers 8] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def run_profile(profile: str, workdir: str, writers: int, readers: int, seconds: float, users: int):
+    from sqlalchemy import text
+    from utils.db_schema import Base, create_db_engine
+
+    url = f"sqlite:///{os.path.join(workdir, f'{profile}.db')}"
+    engine = create_db_engine(url, profile=profile)
+    Base.metadata.create_all(bind=engine)
+
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO user_activities (user_id, activity_type, activity_data, timestamp) "
+                             "VALUES (:uid, 'page_visit', '{}', :ts)"),
+                        {'uid': rng.randint(1, users), 'ts': datetime.utcnow()}
+                    )
+                with lock:
+                    counts['writes'] += 1
+            except Exception:
+                with lock:
+                    counts['errors'] += 1
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT * FROM user_activities WHERE user_id = :uid ORDER BY timestamp DESC LIMIT 10"),
+                        {'uid': rng.randint(1, users)}
+                    ).fetchall()
+                with lock:
+                    counts['reads'] += 1
+            except Exception:
+                with lock:
+                    counts['errors'] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(100 + i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    return {name: value / seconds if name != 'errors' else value for name, value in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--users', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+    try:
+        print(f"{args.writers} writer / {args.readers} reader threads, {args.seconds:.0f}s per profile\n")
+        for profile in ('default', 'production'):
+            result = run_profile(profile, workdir, args.writers, args.readers, args.seconds, args.users)
+            print(f"  {profile:10}  writes {result['writes']:9.1f}/s  reads {result['reads']:9.1f}/s  errors {result['errors']}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
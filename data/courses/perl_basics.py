@@ -52,3 +52,20 @@ use strict;
 use warnings;
 
 print "Hello, World!\\n";
+```
+
+`use strict` and `use warnings` catch common mistakes early; start every script with them.
+                        ''',
+                        'exercises': [
+                            {
+                                'title': 'Hello World Exercise',
+                                'description': 'Write a PERL program that prints "Hello, World!" to the console.',
+                                'starter_code': '#!/usr/bin/perl\nuse strict;\nuse warnings;\n\n# Write your code here\n',
+                                'solution': '#!/usr/bin/perl\nuse strict;\nuse warnings;\n\nprint "Hello, World!\\n";'
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
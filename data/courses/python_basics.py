@@ -41,3 +41,20 @@ The Zen of Python emphasizes:
 ## Your First Python Program
 ```python
 print("Hello, World!")
+```
+
+The `print()` function writes its arguments to the console, followed by a newline.
+                        ''',
+                        'exercises': [
+                            {
+                                'title': 'Hello World Exercise',
+                                'description': 'Write a Python program that prints "Hello, World!" to the console.',
+                                'starter_code': '# Write your code here\n',
+                                'solution': 'print("Hello, World!")'
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
@@ -4,8 +4,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from utils.auth import check_authentication, get_current_user, is_instructor
-from utils.database import get_user_progress_data, get_learning_analytics, log_user_activity
-from utils.ai_services import ai_assistant
+from utils.database import get_user_progress_data, get_learning_analytics, log_user_activity, get_fallback_records
+from utils.recommendations import get_cached_recommendations, refresh_recommendations, DEFAULT_RECOMMENDATIONS
 
 # Page configuration
 st.set_page_config(page_title="Dashboard", page_icon="🏠", layout="wide")
@@ -111,16 +111,16 @@ def show_student_dashboard():
         # AI Recommendations
         st.subheader("🤖 AI Recommendations")
         
-        try:
-            recommendations = ai_assistant.get_learning_recommendations(
-                st.session_state.get('user_progress', {}),
-                current_topic=""
-            )
-            
-            for i, rec in enumerate(recommendations[:5], 1):
-                st.markdown(f"**{i}.** {rec}")
-        except Exception as e:
-            st.warning("Unable to load AI recommendations at this time.")
+        recommendations = get_cached_recommendations()
+        
+        if recommendations is None:
+            # Nothing precomputed yet - schedule it and show general advice meanwhile
+            refresh_recommendations()
+            recommendations = DEFAULT_RECOMMENDATIONS
+            st.caption("Personalized recommendations are being prepared.")
+        
+        for i, rec in enumerate(recommendations[:5], 1):
+            st.markdown(f"**{i}.** {rec}")
         
         # Recent Activities
         st.subheader("📝 Recent Activities")
@@ -229,13 +229,15 @@ def show_instructor_dashboard():
     with col3:
         if st.button("View All Submissions", use_container_width=True):
             st.info("Submission review features would be implemented here")
+        
+        if st.button("🤖 AI Review All Submissions", use_container_width=True):
+            run_bulk_review()
     
     # Recent Student Activities
     st.subheader("📈 Recent Student Activities")
     
-    if st.session_state.get('user_activities'):
-        recent_activities = st.session_state['user_activities'][-10:]
-        
+    recent_activities = get_fallback_records('activity', limit=10)
+    if recent_activities:
         activities_df = pd.DataFrame(recent_activities)
         if not activities_df.empty:
             activities_df['timestamp'] = pd.to_datetime(activities_df['timestamp'])
@@ -248,5 +250,33 @@ def show_instructor_dashboard():
     else:
         st.info("No recent activities to display")
 
+def run_bulk_review():
+    """Run AI analysis over every submission that has no feedback yet"""
+    from utils.bulk_analysis import run_bulk_analysis
+    
+    progress_bar = st.progress(0.0, text="Collecting submissions...")
+    
+    def on_progress(progress):
+        unique = progress['unique_submissions']
+        processed = progress['analyzed'] + progress['failed']
+        fraction = processed / unique if unique else 1.0
+        progress_bar.progress(
+            fraction,
+            text=f"Analyzed {processed}/{unique} unique submissions ({progress['total_submissions']} total)"
+        )
+    
+    try:
+        result = run_bulk_analysis(progress_callback=on_progress)
+        
+        if result['total_submissions'] == 0:
+            st.info("All submissions already have AI feedback.")
+        else:
+            st.success(f"AI feedback saved for {result['updated_rows']} submissions.")
+        
+        if result['failed']:
+            st.warning(f"{result['failed']} submissions could not be analyzed. Run the review again to retry them.")
+    except Exception as e:
+        st.error(f"Bulk review failed: {str(e)}")
+
 if __name__ == "__main__":
     main()
@@ -1,49 +1,14 @@
 import streamlit as st
-import markdown
 from utils.auth import check_authentication, get_current_user
 from utils.course_data import course_manager
 from utils.database import log_user_activity, save_code_submission
 from utils.ai_services import ai_assistant
 from utils.code_executor import code_executor
+from utils.lesson_render import get_rendered_lesson
 
 # Page configuration
 st.set_page_config(page_title="Courses", page_icon="📚", layout="wide")
 
-def get_all_lessons_ordered(modules):
-    """Get all lessons in sequential order across modules"""
-    all_lessons = []
-    for module in modules:
-        for lesson in module.get('lessons', []):
-            all_lessons.append({
-                'module': module,
-                'lesson': lesson,
-                'module_id': module['id'],
-                'lesson_id': lesson['id']
-            })
-    return all_lessons
-
-def find_lesson_index(all_lessons, target_module_id, target_lesson_id):
-    """Find the index of a specific lesson in the ordered list"""
-    for i, item in enumerate(all_lessons):
-        if item['module_id'] == target_module_id and item['lesson_id'] == target_lesson_id:
-            return i
-    return -1
-
-def get_navigation_info(all_lessons, current_module_id, current_lesson_id):
-    """Get previous and next lesson information"""
-    current_index = find_lesson_index(all_lessons, current_module_id, current_lesson_id)
-    
-    prev_lesson = None
-    next_lesson = None
-    
-    if current_index > 0:
-        prev_lesson = all_lessons[current_index - 1]
-    
-    if current_index < len(all_lessons) - 1:
-        next_lesson = all_lessons[current_index + 1]
-    
-    return prev_lesson, next_lesson
-
 def main():
     if not check_authentication():
         st.error("Please log in to access courses.")
@@ -70,98 +35,90 @@ def show_course_content(course_id):
         return
     
     # Course header
-    st.header(course['title'])
-    st.markdown(f"**Description:** {course['description']}")
+    st.header(course.title)
+    st.markdown(f"**Description:** {course.description}")
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Difficulty", course['difficulty'])
+        st.metric("Difficulty", course.difficulty)
     with col2:
-        st.metric("Estimated Hours", course['estimated_hours'])
+        st.metric("Estimated Hours", course.estimated_hours)
     with col3:
-        st.metric("Modules", len(course['modules']))
+        st.metric("Modules", len(course.modules))
     
     st.divider()
     
     # Module and lesson selection
-    modules = course.get('modules', [])
+    modules = course.modules
     
     if not modules:
         st.warning("No modules available for this course yet.")
         return
     
-    # Get all lessons for navigation
-    all_lessons = get_all_lessons_ordered(modules)
+    # Precomputed with the catalog; every lookup below is constant time
+    navigation = course.navigation
     
     # Initialize navigation state
     nav_key = f"{course_id}_navigation"
     if nav_key not in st.session_state:
         st.session_state[nav_key] = {
-            'current_module_id': modules[0]['id'] if modules else None,
-            'current_lesson_id': modules[0]['lessons'][0]['id'] if modules and modules[0].get('lessons') else None
+            'current_module_id': modules[0].id if modules else None,
+            'current_lesson_id': modules[0].lessons[0].id if modules and modules[0].lessons else None
         }
     
     # Sidebar for navigation
     with st.sidebar:
-        st.subheader(f"{course['title']} Navigation")
+        st.subheader(f"{course.title} Navigation")
         
         # Find current module
-        current_module = None
-        for module in modules:
-            if module['id'] == st.session_state[nav_key]['current_module_id']:
-                current_module = module
-                break
+        current_module = course.get_module(st.session_state[nav_key]['current_module_id'])
         
         if not current_module:
             current_module = modules[0]
-            st.session_state[nav_key]['current_module_id'] = current_module['id']
+            st.session_state[nav_key]['current_module_id'] = current_module.id
         
         # Module selection
-        module_index = next((i for i, m in enumerate(modules) if m['id'] == current_module['id']), 0)
+        module_index = next((i for i, m in enumerate(modules) if m.id == current_module.id), 0)
         selected_module = st.selectbox(
             "Select Module",
             options=modules,
             index=module_index,
-            format_func=lambda x: x['title'],
+            format_func=lambda x: x.title,
             key=f"{course_id}_module_select"
         )
         
         # Update navigation state when module changes
-        if selected_module['id'] != st.session_state[nav_key]['current_module_id']:
-            st.session_state[nav_key]['current_module_id'] = selected_module['id']
-            if selected_module.get('lessons'):
-                st.session_state[nav_key]['current_lesson_id'] = selected_module['lessons'][0]['id']
+        if selected_module.id != st.session_state[nav_key]['current_module_id']:
+            st.session_state[nav_key]['current_module_id'] = selected_module.id
+            if selected_module.lessons:
+                st.session_state[nav_key]['current_lesson_id'] = selected_module.lessons[0].id
         
         # Lesson selection
-        if selected_module and selected_module.get('lessons'):
-            current_lesson = None
-            for lesson in selected_module['lessons']:
-                if lesson['id'] == st.session_state[nav_key]['current_lesson_id']:
-                    current_lesson = lesson
-                    break
+        if selected_module and selected_module.lessons:
+            current_lesson = navigation.lesson(selected_module.id, st.session_state[nav_key]['current_lesson_id'])
             
             if not current_lesson:
-                current_lesson = selected_module['lessons'][0]
-                st.session_state[nav_key]['current_lesson_id'] = current_lesson['id']
+                current_lesson = selected_module.lessons[0]
+                st.session_state[nav_key]['current_lesson_id'] = current_lesson.id
             
-            lesson_index = next((i for i, l in enumerate(selected_module['lessons']) if l['id'] == current_lesson['id']), 0)
+            lesson_index = navigation.position(selected_module.id, current_lesson.id).index_in_module
             selected_lesson = st.selectbox(
                 "Select Lesson",
-                options=selected_module['lessons'],
+                options=selected_module.lessons,
                 index=lesson_index,
-                format_func=lambda x: x['title'],
+                format_func=lambda x: x.title,
                 key=f"{course_id}_lesson_select"
             )
             
             # Update navigation state when lesson changes
-            if selected_lesson['id'] != st.session_state[nav_key]['current_lesson_id']:
-                st.session_state[nav_key]['current_lesson_id'] = selected_lesson['id']
+            if selected_lesson.id != st.session_state[nav_key]['current_lesson_id']:
+                st.session_state[nav_key]['current_lesson_id'] = selected_lesson.id
         else:
             selected_lesson = None
     
     # Main content area
     if selected_lesson:
-        show_lesson_content(course_id, selected_module, selected_lesson, all_lessons)
+        show_lesson_content(course_id, selected_module, selected_lesson, navigation)
     else:
         show_course_overview(course_id, course, modules)
 
@@ -171,12 +128,12 @@ def show_course_overview(course_id, course, modules):
     st.subheader("📋 Course Modules")
     
     for i, module in enumerate(modules, 1):
-        with st.expander(f"Module {i}: {module['title']}", expanded=i==1):
-            st.markdown(f"**Lessons in this module:** {len(module.get('lessons', []))}")
+        with st.expander(f"Module {i}: {module.title}", expanded=i==1):
+            st.markdown(f"**Lessons in this module:** {len(module.lessons)}")
             
-            if module.get('lessons'):
-                for j, lesson in enumerate(module['lessons'], 1):
-                    st.markdown(f"{j}. {lesson['title']}")
+            if module.lessons:
+                for j, lesson in enumerate(module.lessons, 1):
+                    st.markdown(f"{j}. {lesson.title}")
     
     # Course evaluation section
     st.subheader("📝 Course Evaluation")
@@ -209,36 +166,65 @@ def show_course_overview(course_id, course, modules):
                 'rating': rating
             })
 
-def show_lesson_content(course_id, module, lesson, all_lessons):
+def show_lesson_content(course_id, module, lesson, navigation):
     """Display individual lesson content"""
     
-    st.subheader(f"📖 {lesson['title']}")
+    st.subheader(f"📖 {lesson.title}")
     
     # Log lesson view
     log_user_activity('lesson_viewed', {
         'course_id': course_id,
-        'module_id': module['id'],
-        'lesson_id': lesson['id']
+        'module_id': module.id,
+        'lesson_id': lesson.id
     })
     
-    # Lesson content
-    if lesson.get('content'):
-        # Convert markdown to HTML and display
-        lesson_html = markdown.markdown(lesson['content'], extensions=['codehilite', 'fenced_code'])
-        st.markdown(lesson_html, unsafe_allow_html=True)
+    language = 'python' if course_id == 'python' else 'perl'
+    
+    # Lesson content, rendered once per lesson version and shared across sessions
+    if lesson.content:
+        rendered = get_rendered_lesson(course_id, module.id, lesson)
+        st.markdown(rendered.html, unsafe_allow_html=True)
+        
+        # Try it: run the lesson's own examples
+        examples = rendered.runnable_blocks(language)
+        if examples:
+            with st.expander("▶️ Try it"):
+                example_index = 0
+                if len(examples) > 1:
+                    example_index = st.selectbox(
+                        "Example",
+                        options=range(len(examples)),
+                        format_func=lambda i: f"Example {i + 1}",
+                        key=f"{course_id}_{module.id}_{lesson.id}_try_select"
+                    )
+                
+                # Versioned so an edited lesson replaces the example code instead of keeping the old widget value
+                version = course_manager.lesson_version(course_id, module.id, lesson.id)
+                try_key = f"{course_id}_{module.id}_{lesson.id}_v{version}_try_{example_index}"
+                try_code = st.text_area("Code:", value=examples[example_index].code, height=200, key=f"{try_key}_code")
+                
+                if st.button("Run Example", key=f"{try_key}_run"):
+                    result = code_executor.execute_code(try_code, language)
+                    if result['success']:
+                        if result['output']:
+                            st.code(result['output'], language='text')
+                    else:
+                        st.error("❌ Execution failed")
+                        if result['error']:
+                            st.code(result['error'], language='text')
     
     st.divider()
     
     # Exercises section
-    if lesson.get('exercises'):
+    if lesson.exercises:
         st.subheader("💻 Practice Exercises")
         
-        for i, exercise in enumerate(lesson['exercises'], 1):
-            with st.expander(f"Exercise {i}: {exercise['title']}", expanded=True):
-                st.markdown(f"**Description:** {exercise['description']}")
+        for i, exercise in enumerate(lesson.exercises, 1):
+            with st.expander(f"Exercise {i}: {exercise.title}", expanded=True):
+                st.markdown(f"**Description:** {exercise.description}")
                 
                 # Code editor
-                exercise_key = f"{course_id}_{module['id']}_{lesson['id']}_ex_{i}"
+                exercise_key = f"{course_id}_{module.id}_{lesson.id}_ex_{i}"
                 
                 col1, col2 = st.columns([3, 1])
                 
@@ -246,14 +232,12 @@ def show_lesson_content(course_id, module, lesson, all_lessons):
                     # Use text area as code editor (streamlit-ace would be better but not in requirements)
                     code = st.text_area(
                         "Your Code:",
-                        value=exercise.get('starter_code', ''),
+                        value=exercise.starter_code,
                         height=200,
                         key=f"{exercise_key}_code"
                     )
                 
                 with col2:
-                    language = 'python' if course_id == 'python' else 'perl'
-                    
                     if st.button("Run Code", key=f"{exercise_key}_run"):
                         if code.strip():
                             # Execute code
@@ -290,8 +274,8 @@ def show_lesson_content(course_id, module, lesson, all_lessons):
                             st.warning("Please enter some code to run.")
                     
                     if st.button("Show Solution", key=f"{exercise_key}_solution"):
-                        if exercise.get('solution'):
-                            st.code(exercise['solution'], language=language)
+                        if exercise.solution:
+                            st.code(exercise.solution, language=language)
                         else:
                             st.info("No solution available for this exercise.")
     
@@ -299,25 +283,27 @@ def show_lesson_content(course_id, module, lesson, all_lessons):
     col1, col2, col3 = st.columns([1, 2, 1])
     
     # Get navigation information
-    prev_lesson, next_lesson = get_navigation_info(all_lessons, module['id'], lesson['id'])
+    position = navigation.position(module.id, lesson.id)
+    prev_lesson = position.prev if position else None
+    next_lesson = position.next if position else None
     nav_key = f"{course_id}_navigation"
     
     with col1:
         if prev_lesson:
-            if st.button("⬅️ Previous Lesson", key=f"prev_lesson_{course_id}_{module['id']}_{lesson['id']}"):
+            if st.button("⬅️ Previous Lesson", key=f"prev_lesson_{course_id}_{module.id}_{lesson.id}"):
                 # Navigate to previous lesson
-                st.session_state[nav_key]['current_module_id'] = prev_lesson['module_id']
-                st.session_state[nav_key]['current_lesson_id'] = prev_lesson['lesson_id']
+                st.session_state[nav_key]['current_module_id'] = prev_lesson[0]
+                st.session_state[nav_key]['current_lesson_id'] = prev_lesson[1]
                 st.rerun()
         else:
-            st.button("⬅️ Previous Lesson", disabled=True, key=f"prev_lesson_disabled_{course_id}_{module['id']}_{lesson['id']}")
+            st.button("⬅️ Previous Lesson", disabled=True, key=f"prev_lesson_disabled_{course_id}_{module.id}_{lesson.id}")
     
     with col2:
-        if st.button("✅ Mark as Completed", use_container_width=True, key=f"complete_lesson_{course_id}_{module['id']}_{lesson['id']}"):
+        if st.button("✅ Mark as Completed", use_container_width=True, key=f"complete_lesson_{course_id}_{module.id}_{lesson.id}"):
             log_user_activity('lesson_completed', {
                 'course_id': course_id,
-                'module_id': module['id'],
-                'lesson_id': lesson['id']
+                'module_id': module.id,
+                'lesson_id': lesson.id
             })
             
             # Update progress
@@ -328,24 +314,26 @@ def show_lesson_content(course_id, module, lesson, all_lessons):
             
             # Auto-advance to next lesson if available
             if next_lesson:
-                st.session_state[nav_key]['current_module_id'] = next_lesson['module_id']
-                st.session_state[nav_key]['current_lesson_id'] = next_lesson['lesson_id']
+                st.session_state[nav_key]['current_module_id'] = next_lesson[0]
+                st.session_state[nav_key]['current_lesson_id'] = next_lesson[1]
                 st.rerun()
     
     with col3:
         if next_lesson:
-            if st.button("Next Lesson ➡️", key=f"next_lesson_{course_id}_{module['id']}_{lesson['id']}"):
+            if st.button("Next Lesson ➡️", key=f"next_lesson_{course_id}_{module.id}_{lesson.id}"):
                 # Navigate to next lesson
-                st.session_state[nav_key]['current_module_id'] = next_lesson['module_id']
-                st.session_state[nav_key]['current_lesson_id'] = next_lesson['lesson_id']
+                st.session_state[nav_key]['current_module_id'] = next_lesson[0]
+                st.session_state[nav_key]['current_lesson_id'] = next_lesson[1]
                 st.rerun()
         else:
-            st.button("Next Lesson ➡️", disabled=True, key=f"next_lesson_disabled_{course_id}_{module['id']}_{lesson['id']}")
+            st.button("Next Lesson ➡️", disabled=True, key=f"next_lesson_disabled_{course_id}_{module.id}_{lesson.id}")
             
-    # Show navigation context
-    current_index = find_lesson_index(all_lessons, module['id'], lesson['id'])
-    if current_index >= 0:
-        st.caption(f"Lesson {current_index + 1} of {len(all_lessons)}")
+    # Show where this lesson sits in the course; completion is tracked on the Progress page
+    if position:
+        st.progress(
+            navigation.progress_percent(position.index + 1) / 100,
+            text=f"Reading position: lesson {position.index + 1} of {navigation.total_lessons}"
+        )
 
 def show_ai_feedback(feedback):
     """Display AI code analysis feedback"""
@@ -3,7 +3,8 @@ import time
 from datetime import datetime
 from utils.auth import check_authentication, get_current_user, update_user_progress
 from utils.ai_services import ai_assistant
-from utils.database import save_quiz_result, log_user_activity
+from utils.database import save_quiz_result, log_user_activity, get_fallback_records
+from utils.recommendations import get_cached_recommendations, refresh_recommendations, DEFAULT_RECOMMENDATIONS
 
 # Page configuration
 st.set_page_config(page_title="Quizzes", page_icon="📝", layout="wide")
@@ -387,38 +388,28 @@ def show_quiz_results():
     if score_percentage < 70:
         st.subheader("📖 Recommended Study Topics")
         
-        try:
-            recommendations = ai_assistant.get_learning_recommendations(
-                user_progress={'quiz_score': score_percentage, 'weak_areas': quiz['topic']},
-                current_topic=quiz['topic']
-            )
-            
-            if recommendations:
-                for rec in recommendations[:3]:
-                    st.markdown(f"• {rec}")
-            else:
-                st.info("Practice more questions on this topic to improve your understanding.")
-                
-        except Exception as e:
-            st.info("Focus on reviewing the questions you missed and study the explanations provided.")
+        st.markdown(f"• Review the **{quiz['topic']}** questions you missed and study their explanations")
+        
+        # Precomputed in the background; rendering never waits on the AI service
+        recommendations = get_cached_recommendations()
+        if recommendations is None:
+            refresh_recommendations()
+            recommendations = DEFAULT_RECOMMENDATIONS
+        
+        for rec in recommendations[:3]:
+            st.markdown(f"• {rec}")
 
 def show_recent_quiz_results():
     """Show recent quiz results"""
     
     st.subheader("📈 Your Recent Quiz Results")
     
-    if 'quiz_results' in st.session_state and st.session_state.quiz_results:
-        # Filter results for current user
-        user = get_current_user()
-        user_results = [
-            result for result in st.session_state.quiz_results
-            if result.get('user') == user['username']
-        ]
+    user = get_current_user()
+    if user:
+        # Last 5 results for the current user
+        recent_results = get_fallback_records('quiz', user['username'], limit=5)
         
-        if user_results:
-            # Show last 5 results
-            recent_results = user_results[-5:]
-            
+        if recent_results:
             for result in reversed(recent_results):
                 score_pct = (result['score'] / result['total_questions']) * 100
                 timestamp = result['timestamp'][:19].replace('T', ' ')
@@ -426,7 +417,7 @@ def show_recent_quiz_results():
                 col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
                 
                 with col1:
-                    st.write(f"**{result['topic']}** ({result['language'].title()})")
+                    st.write(f"**{result['quiz_topic']}** ({result['language'].title()})")
                 
                 with col2:
                     st.write(f"{result['score']}/{result['total_questions']}")
@@ -4,7 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from utils.auth import check_authentication, get_current_user, is_instructor
-from utils.database import get_user_progress_data, get_learning_analytics
+from utils.database import get_user_progress_data, get_learning_analytics, get_fallback_records
 from utils.ai_services import ai_assistant
 
 # Page configuration
@@ -57,7 +57,9 @@ def show_student_progress():
     
     with col4:
         # Calculate learning streak (simplified)
-        learning_streak = calculate_learning_streak(progress_data['recent_activities'])
+        learning_streak = progress_data.get('current_streak')
+        if learning_streak is None:
+            learning_streak = calculate_learning_streak(progress_data['recent_activities'])
         st.metric(
             "Learning Streak",
             f"{learning_streak} days",
@@ -466,8 +468,9 @@ def show_activity_heatmap():
     st.subheader("🔥 Activity Heatmap")
     
     # Mock heatmap data
-    if st.session_state.get('user_activities'):
-        activities_df = pd.DataFrame(st.session_state['user_activities'])
+    session_activities = get_fallback_records('activity')
+    if session_activities:
+        activities_df = pd.DataFrame(session_activities)
         activities_df['timestamp'] = pd.to_datetime(activities_df['timestamp'])
         activities_df['date'] = activities_df['timestamp'].dt.date
         activities_df['hour'] = activities_df['timestamp'].dt.hour
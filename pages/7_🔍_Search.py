@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime
 from utils.auth import check_authentication, get_current_user
 from utils.course_data import course_manager
+from utils.course_search import get_query_terms, get_search_entries
 from utils.database import log_user_activity
 from utils.ai_services import ai_assistant
 
@@ -141,51 +142,54 @@ def search_course_content(query, language_filter, content_type, difficulty_filte
     results = []
     query_lower = query.lower()
     
-    # Get all courses
-    courses = st.session_state.get('courses', {})
-    
-    for course_id, course in courses.items():
+    # Search the shared course catalog through its word index
+    catalog = course_manager.catalog
+    entries = get_search_entries(catalog)
+    terms = get_query_terms(catalog, query_lower)
+    for course in catalog:
+        course_id = course.id
         # Apply language filter
         if language_filter != "All" and course_id != language_filter.lower():
             continue
         
         # Search through modules and lessons
-        for module in course.get('modules', []):
-            for lesson in module.get('lessons', []):
+        for module in course.modules:
+            for lesson in module.lessons:
+                entry = entries[(course_id, module.id, lesson.id)]
+                hit = entry.search(query_lower, terms)
+                if hit is None:
+                    continue
+                
                 # Search in lesson title and content
-                if (query_lower in lesson.get('title', '').lower() or 
-                    query_lower in lesson.get('content', '').lower()):
+                if hit.lesson:
                     
                     # Apply content type filter
                     if content_type == "All" or content_type == "Lessons":
                         results.append({
                             'type': 'lesson',
-                            'title': lesson.get('title', ''),
-                            'content': lesson.get('content', '')[:200] + '...',
+                            'title': lesson.title,
+                            'content': entry.preview + '...',
                             'language': course_id,
-                            'module': module.get('title', ''),
-                            'course': course.get('title', ''),
-                            'lesson_id': lesson.get('id', ''),
-                            'module_id': module.get('id', '')
+                            'module': module.title,
+                            'course': course.title,
+                            'lesson_id': lesson.id,
+                            'module_id': module.id
                         })
                 
                 # Search through exercises
-                for exercise in lesson.get('exercises', []):
-                    if (query_lower in exercise.get('title', '').lower() or 
-                        query_lower in exercise.get('description', '').lower()):
-                        
-                        if content_type == "All" or content_type == "Exercises":
-                            results.append({
-                                'type': 'exercise',
-                                'title': exercise.get('title', ''),
-                                'content': exercise.get('description', ''),
-                                'language': course_id,
-                                'module': module.get('title', ''),
-                                'course': course.get('title', ''),
-                                'lesson_title': lesson.get('title', ''),
-                                'lesson_id': lesson.get('id', ''),
-                                'module_id': module.get('id', '')
-                            })
+                for exercise in hit.exercises:
+                    if content_type == "All" or content_type == "Exercises":
+                        results.append({
+                            'type': 'exercise',
+                            'title': exercise.title,
+                            'content': exercise.description,
+                            'language': course_id,
+                            'module': module.title,
+                            'course': course.title,
+                            'lesson_title': lesson.title,
+                            'lesson_id': lesson.id,
+                            'module_id': module.id
+                        })
     
     # Search through sample code and examples
     examples = get_code_examples()
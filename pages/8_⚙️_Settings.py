@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.auth import check_authentication, get_current_user, logout, update_user_progress, update_skill_level
-from utils.database import log_user_activity, export_user_data
+from utils.auth import check_authentication, get_current_user, logout, end_session, change_password, update_user_profile, update_user_progress, update_skill_level
+from utils.database import log_user_activity, export_user_data, get_user_progress_data, clear_fallback_records
+from utils.data_export import write_user_export
+from utils.passwords import PasswordHashBusy
 
 # Page configuration
 st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
@@ -108,19 +110,8 @@ def show_profile_settings():
         # Save button
         if st.form_submit_button("💾 Save Profile", use_container_width=True):
             try:
-                from utils.database import get_db
-                from utils.db_schema import User
-                from sqlalchemy.orm import Session
-                
-                db: Session = next(get_db())
-                
                 # Update user profile in database
-                db_user = db.query(User).filter(User.username == user['username']).first()
-                if db_user:
-                    db_user.email = email
-                    db_user.full_name = display_name
-                    db.commit()
-                    
+                if user.get('id') and update_user_profile(user['id'], email, display_name):
                     st.success("✅ Profile updated successfully!")
                     
                     # Log activity
@@ -237,27 +228,21 @@ def show_privacy_data_settings():
     # Data overview
     st.markdown("**Your Data Overview:**")
     
-    progress_data = st.session_state.get('user_progress', {})
+    progress_data = get_user_progress_data()
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Lessons Completed", progress_data.get('lessons_completed', 0))
+        st.metric("Lessons Completed", progress_data['lessons_completed'])
     
     with col2:
-        quiz_count = len([r for r in st.session_state.get('quiz_results', []) 
-                         if r.get('user') == get_current_user()['username']])
-        st.metric("Quizzes Taken", quiz_count)
+        st.metric("Quizzes Taken", progress_data['quiz_count'])
     
     with col3:
-        code_count = len([s for s in st.session_state.get('code_submissions', []) 
-                         if s.get('user') == get_current_user()['username']])
-        st.metric("Code Submissions", code_count)
+        st.metric("Code Submissions", progress_data['code_submissions_count'])
     
     with col4:
-        activity_count = len([a for a in st.session_state.get('user_activities', []) 
-                             if a.get('user') == get_current_user()['username']])
-        st.metric("Total Activities", activity_count)
+        st.metric("Total Activities", progress_data['total_activities'])
     
     st.divider()
     
@@ -294,13 +279,22 @@ def show_privacy_data_settings():
         
         if st.button("📥 Export My Data", use_container_width=True):
             try:
-                user_data_json = export_user_data()
-                st.download_button(
-                    label="💾 Download Data Export",
-                    data=user_data_json,
-                    file_name=f"my_learning_data_{datetime.now().strftime('%Y%m%d')}.json",
-                    mime="application/json"
-                )
+                user_id = (st.session_state.get('user_data') or {}).get('id')
+                if user_id:
+                    # Built in a temporary file only when clicked; Streamlit then holds the gzipped export in memory
+                    st.download_button(
+                        label="💾 Download Data Export",
+                        data=lambda: write_user_export(user_id, compress=True),
+                        file_name=f"my_learning_data_{datetime.now().strftime('%Y%m%d')}.ndjson.gz",
+                        mime="application/gzip"
+                    )
+                else:
+                    st.download_button(
+                        label="💾 Download Data Export",
+                        data=export_user_data(),
+                        file_name=f"my_learning_data_{datetime.now().strftime('%Y%m%d')}.json",
+                        mime="application/json"
+                    )
                 st.success("✅ Data export ready for download!")
             except Exception as e:
                 st.error(f"Failed to export data: {str(e)}")
@@ -397,11 +391,18 @@ def show_security_settings():
             elif len(new_password) < 6:
                 st.error("Password must be at least 6 characters long.")
             else:
-                # Password change functionality would be implemented here
-                st.info("Password change functionality requires additional security measures and will be available in a future update.")
-                
-                # Log activity
-                log_user_activity('password_change_attempted', {'timestamp': datetime.now().isoformat()})
+                user = get_current_user()
+                try:
+                    changed = bool(user and user.get('id')) and change_password(user['id'], current_password, new_password)
+                except PasswordHashBusy as e:
+                    st.warning(str(e))
+                    changed = None
+                if changed:
+                    st.success("Password changed. Your other sessions have been signed out.")
+                    log_user_activity('password_changed', {'timestamp': datetime.now().isoformat()})
+                elif changed is False:
+                    st.error("Current password is incorrect.")
+                    log_user_activity('password_change_attempted', {'timestamp': datetime.now().isoformat()})
     
     st.divider()
     
@@ -577,8 +578,7 @@ def show_account_settings():
                 clear_user_data()
                 
                 # Logout
-                st.session_state.authenticated = False
-                st.session_state.user_data = {}
+                end_session()
                 
                 st.success("Account deleted successfully. Thank you for using our platform!")
                 st.rerun()
@@ -589,19 +589,8 @@ def clear_user_data():
     user = get_current_user()
     username = user['username']
     
-    # Clear user activities
-    if 'user_activities' in st.session_state:
-        st.session_state.user_activities = [
-            activity for activity in st.session_state.user_activities
-            if activity.get('user') != username
-        ]
-    
-    # Clear quiz results
-    if 'quiz_results' in st.session_state:
-        st.session_state.quiz_results = [
-            result for result in st.session_state.quiz_results
-            if result.get('user') != username
-        ]
+    # Clear buffered activities and quiz results
+    clear_fallback_records(username)
     
     # Clear code submissions
     if 'code_submissions' in st.session_state:
@@ -629,19 +618,24 @@ def reset_learning_progress():
     user = get_current_user()
     if user:
         try:
-            from utils.database import get_db
-            from utils.db_schema import UserProgress, QuizResult, CodeSubmission, ChatSession, UserActivity
+            from utils.db_schema import get_db, UserProgress, QuizResult, CodeSubmission, ChatSession, UserActivity, ActivityDailyAggregate
+            from utils.user_stats import reset_user_stats
             from sqlalchemy.orm import Session
             
             db: Session = next(get_db())
             user_id = user['id']
             
+            # Buffered events would otherwise be replayed into the history deleted below
+            clear_fallback_records(user['username'])
+            
             # Delete progress data but keep user account
             db.query(UserActivity).filter(UserActivity.user_id == user_id).delete()
+            db.query(ActivityDailyAggregate).filter(ActivityDailyAggregate.user_id == user_id).delete()
             db.query(ChatSession).filter(ChatSession.user_id == user_id).delete()
             db.query(CodeSubmission).filter(CodeSubmission.user_id == user_id).delete()
             db.query(QuizResult).filter(QuizResult.user_id == user_id).delete()
             db.query(UserProgress).filter(UserProgress.user_id == user_id).delete()
+            reset_user_stats(db, user_id)
             
             db.commit()
             
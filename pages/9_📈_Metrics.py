@@ -0,0 +1,144 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import json
+from datetime import datetime
+from utils.auth import check_authentication, is_instructor
+from utils.ai_metrics import ai_metrics
+import utils.database  # Registers the write-behind queues
+from utils.write_behind import get_writer_metrics
+
+# Page configuration
+st.set_page_config(page_title="System Metrics", page_icon="📈", layout="wide")
+
+def main():
+    if not check_authentication():
+        st.error("Please log in to view system metrics.")
+        return
+
+    if not is_instructor():
+        st.error("System metrics are only available to instructors.")
+        return
+
+    st.title("📈 System Metrics")
+
+    show_write_queues()
+
+    st.header("🤖 AI Service")
+    st.markdown("Latency, token usage, cost and cache behaviour of the AI assistant, per method.")
+
+    snapshot = ai_metrics.snapshot()
+    methods = snapshot['methods']
+
+    if not methods:
+        st.info("No AI calls have been recorded since the server started.")
+        return
+
+    show_overview(methods)
+    show_method_details(methods)
+
+    # Raw JSON for budgeting scripts and external dashboards
+    st.subheader("🧾 Raw Metrics")
+    metrics_json = json.dumps(snapshot, indent=2)
+    st.download_button(
+        label="💾 Download Metrics JSON",
+        data=metrics_json,
+        file_name=f"ai_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json"
+    )
+
+    with st.expander("View JSON"):
+        st.json(snapshot)
+
+def show_write_queues():
+    """Show depth and throughput of the write-behind database queues"""
+
+    st.header("💾 Write-Behind Queues")
+
+    rows = [
+        {
+            'Queue': metrics['name'],
+            'Depth': metrics['queue_depth'],
+            'Max Depth': metrics['max_queue_depth'],
+            'Oldest Pending (ms)': round(metrics['oldest_pending_ms']),
+            'Rows Written': metrics['rows_written'],
+            'Batches': metrics['batches_written'],
+            'Last Batch': metrics['last_batch_size'],
+            'Last Flush (ms)': round(metrics['last_flush_ms'], 1),
+            'Failed Batches': metrics['failed_batches'],
+            'Rejected': metrics['rows_rejected'],
+            'Spilled': metrics['rows_spilled'],
+            'Retry In (ms)': round(metrics['retry_in_ms'])
+        }
+        for metrics in get_writer_metrics()
+    ]
+
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+    else:
+        st.info("No write-behind queues are active.")
+
+def show_overview(methods):
+    """Show a summary table across all methods"""
+
+    rows = []
+    for name, stats in methods.items():
+        window = stats['window']
+        rows.append({
+            'Method': name,
+            'Calls': window['calls'],
+            'Success': window['outcomes']['success'],
+            'Served Fallback': window['served_by_fallback'],
+            'Errors': window['outcomes']['error'],
+            'Cache Hit Rate': f"{window['cache_hit_rate'] * 100:.1f}%",
+            'p50 (ms)': round(window['latency_ms']['p50']),
+            'p95 (ms)': round(window['latency_ms']['p95']),
+            'p99 (ms)': round(window['latency_ms']['p99']),
+            'Tokens': stats['total_prompt_tokens'] + stats['total_completion_tokens'],
+            'Cost (USD)': f"${stats['total_cost_usd']:.4f}"
+        })
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Total Calls", sum(row['Calls'] for row in rows))
+
+    with col2:
+        st.metric("Total Tokens", sum(row['Tokens'] for row in rows))
+
+    with col3:
+        st.metric("Estimated Cost", f"${sum(stats['total_cost_usd'] for stats in methods.values()):.4f}")
+
+    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+def show_method_details(methods):
+    """Show latency and token histograms for one method"""
+
+    st.subheader("⏱️ Latency & Token Distribution")
+
+    method = st.selectbox("Method:", sorted(methods.keys()))
+    window = methods[method]['window']
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        latency_df = pd.DataFrame(
+            list(window['latency_histogram'].items()),
+            columns=['Latency (ms)', 'Calls']
+        )
+        fig = px.bar(latency_df, x='Latency (ms)', y='Calls', title='Upstream Latency')
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        token_df = pd.DataFrame(
+            list(window['token_histogram'].items()),
+            columns=['Tokens', 'Calls']
+        )
+        fig = px.bar(token_df, x='Tokens', y='Calls', title='Tokens per Call')
+        st.plotly_chart(fig, use_container_width=True)
+
+    if window['models']:
+        st.caption(f"Models: {', '.join(window['models'])}")
+
+if __name__ == "__main__":
+    main()
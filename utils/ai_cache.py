@@ -0,0 +1,210 @@
+"""
+Local similarity cache for AI chatbot answers
+
+Questions are embedded as hashed character n-gram TF-IDF vectors with NumPy,
+so paraphrases of an earlier question can be answered from memory without any
+external service.
+
+Similarity only works for prose. Questions that contain code or literals
+(brackets, quotes, separators, digits) differ in exactly the characters the
+tokenizer drops or the n-grams blur, so ``print(len([1,2,3]))`` would match
+``print(max([1,2,3]))``. Those questions, and whole namespaces whose prompts
+embed quiz or code text, are only answered on an exact match of the
+whitespace-normalized question.
+"""
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+
+# Filler words that carry no topic information in a question
+STOP_WORDS = {
+    'a', 'an', 'the', 'what', 'whats', 'is', 'are', 'how', 'do', 'does', 'can', 'could',
+    'you', 'i', 'me', 'please', 'explain', 'tell', 'about', 'in', 'to', 'of', 'and',
+    'with', 'work', 'works', 'mean', 'means', 'describe', 'show', 'give', 'example'
+}
+
+# Words (keeping sigils like $_ @_ %h and suffixes like c++ c#) and runs of operator characters
+TOKEN_PATTERN = re.compile(r"[$@%&*]?[a-z0-9_]+[+#]*|[=!<>&|^~*/%+\-:?.$@]+")
+PLAIN_WORD = re.compile(r"[a-z0-9_]+")
+# Sentence punctuation at the end of a question is not part of any operator being asked about
+TRAILING_PUNCTUATION = re.compile(r"(?:\s*\?+|(?<=\w)[.!]+)\s*$")
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and filler words, keep sigils and operators"""
+    words = TOKEN_PATTERN.findall(TRAILING_PUNCTUATION.sub('', text.lower()))
+    kept = [w for w in words if w not in STOP_WORDS]
+    return ' '.join(kept or words)
+
+# Characters that only appear in code or literal values; their questions need an exact match
+LITERAL_PATTERN = re.compile(r"[()\[\]{}\"'`;,\\]|\d")
+
+def requires_exact_match(question: str) -> bool:
+    """Whether the question contains code or literal tokens that similarity would blur"""
+    return '```' in question or LITERAL_PATTERN.search(question) is not None
+
+def exact_key(question: str) -> str:
+    """Question with whitespace collapsed; case is kept because code is case-sensitive"""
+    return ' '.join(question.split())
+
+def symbol_tokens(normalized: str) -> frozenset:
+    """Tokens that are not plain words; two questions only match if these agree"""
+    return frozenset(w for w in normalized.split() if not PLAIN_WORD.fullmatch(w))
+
+class _LanguageIndex:
+    """Fixed-capacity TF-IDF matrix with LRU slot reuse for one namespace"""
+
+    def __init__(self, capacity: int, dim: int):
+        self.tf = np.zeros((capacity, dim), dtype=np.float32)
+        self.df = np.zeros(dim, dtype=np.float32)
+        self.entries = OrderedDict()  # normalized question -> (slot, answer, symbol tokens)
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+class SimilarityCache:
+    """Bounded cosine-similarity cache of question/answer pairs per language"""
+
+    def __init__(self, capacity: int = 256, threshold: float = 0.75, dim: int = 2048,
+                 ngram_range: tuple = (3, 5), max_question_length: int = 300,
+                 max_namespaces: int = 16, exact_capacity: int = 1024):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.max_question_length = max_question_length
+        # Each namespace holds a capacity x dim float32 matrix (2 MB at the defaults)
+        self.max_namespaces = max_namespaces
+        self.exact_capacity = exact_capacity
+        self._indexes = OrderedDict()  # namespace -> _LanguageIndex, least recently used first
+        self._exact = OrderedDict()  # (namespace, exact key) -> answer
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_cacheable(self, question: str) -> bool:
+        """Only short questions are cached"""
+        return len(question) <= self.max_question_length
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        """Hashed character n-gram term frequencies"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f" {text} "
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                vector[zlib.crc32(padded[i:i + n].encode()) % self.dim] += 1.0
+        return vector
+
+    def _index(self, namespace: str) -> _LanguageIndex:
+        index = self._indexes.get(namespace)
+        if index is None:
+            while len(self._indexes) >= self.max_namespaces:
+                self._indexes.popitem(last=False)
+            index = _LanguageIndex(self.capacity, self.dim)
+            self._indexes[namespace] = index
+        self._indexes.move_to_end(namespace)
+        return index
+
+    def _get_exact(self, key: Tuple[str, str]) -> Optional[str]:
+        with self._lock:
+            answer = self._exact.get(key)
+            if answer is None:
+                self.misses += 1
+                return None
+            self._exact.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def get(self, question: str, namespace: str, exact_only: bool = False) -> Optional[str]:
+        """Return the cached answer of the most similar question above the threshold
+
+        With exact_only, or for questions containing code or literals, only an
+        exact match is returned.
+        """
+        if not self.is_cacheable(question):
+            return None
+        if exact_only or requires_exact_match(question):
+            return self._get_exact((namespace, exact_key(question)))
+
+        normalized = normalize_question(question)
+
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None or not index.entries:
+                self.misses += 1
+                return None
+            self._indexes.move_to_end(namespace)
+
+            exact = index.entries.get(normalized)
+            if exact is not None:
+                index.entries.move_to_end(normalized)
+                self.hits += 1
+                return exact[1]
+
+            # "$_" and "@_", or "=" and "==", differ by one character but are different questions
+            symbols = symbol_tokens(normalized)
+            keys = [k for k, entry in index.entries.items() if entry[2] == symbols]
+            if not keys:
+                self.misses += 1
+                return None
+            slots = np.fromiter((index.entries[k][0] for k in keys), dtype=np.intp, count=len(keys))
+            idf = np.log((1.0 + len(index.entries)) / (1.0 + index.df)) + 1.0
+
+            matrix = index.tf[slots] * idf
+            query = self._vectorize(normalized) * idf
+
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            norms[norms == 0] = 1.0
+            scores = (matrix @ query) / norms
+
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = keys[best]
+            index.entries.move_to_end(key)
+            self.hits += 1
+            return index.entries[key][1]
+
+    def put(self, question: str, answer: str, namespace: str, exact_only: bool = False):
+        """Store an answer, evicting the least recently used entry when full"""
+        if not self.is_cacheable(question):
+            return
+        if exact_only or requires_exact_match(question):
+            key = (namespace, exact_key(question))
+            with self._lock:
+                self._exact[key] = answer
+                self._exact.move_to_end(key)
+                while len(self._exact) > self.exact_capacity:
+                    self._exact.popitem(last=False)
+            return
+
+        normalized = normalize_question(question)
+        vector = self._vectorize(normalized)
+
+        with self._lock:
+            index = self._index(namespace)
+
+            existing = index.entries.get(normalized)
+            if existing is not None:
+                index.entries[normalized] = (existing[0], answer, existing[2])
+                index.entries.move_to_end(normalized)
+                return
+
+            if not index.free_slots:
+                _, (evicted_slot, _, _) = index.entries.popitem(last=False)
+                index.df -= index.tf[evicted_slot] > 0
+                index.free_slots.append(evicted_slot)
+
+            slot = index.free_slots.pop()
+            index.tf[slot] = vector
+            index.df += vector > 0
+            index.entries[normalized] = (slot, answer, symbol_tokens(normalized))
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._indexes.clear()
+            self._exact.clear()
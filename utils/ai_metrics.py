@@ -0,0 +1,164 @@
+"""
+Instrumentation for AI service calls
+
+Every call records exactly one sample: latency, token usage, model, outcome
+and whether the user was served fallback content. 'error' is a failed upstream
+call and 'fallback' a call that never produced usable output otherwise (an
+unparseable response or a failure before the request). Samples are kept in a
+rolling window per method and summarized into histograms for the instructor
+metrics page.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2000, 5000, 10000, 30000]
+
+# Upper bounds of the token histogram buckets (prompt + completion)
+TOKEN_BUCKETS = [100, 250, 500, 1000, 2000, 4000]
+
+# USD per 1K tokens as (prompt, completion)
+MODEL_PRICING_PER_1K = {
+    'gpt-4o': (0.0025, 0.01),
+}
+
+OUTCOMES = ('success', 'fallback', 'error', 'cache_hit')
+
+def _histogram(values: List[float], bounds: List[float]) -> Dict[str, int]:
+    labels = [f"<={b}" for b in bounds] + [f">{bounds[-1]}"]
+    counts = dict.fromkeys(labels, 0)
+    for value in values:
+        for bound, label in zip(bounds, labels):
+            if value <= bound:
+                counts[label] += 1
+                break
+        else:
+            counts[labels[-1]] += 1
+    return counts
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one call"""
+    prompt_price, completion_price = MODEL_PRICING_PER_1K.get(model, (0.0, 0.0))
+    return (prompt_tokens / 1000) * prompt_price + (completion_tokens / 1000) * completion_price
+
+class _MethodStats:
+    """Rolling samples plus lifetime totals for one assistant method"""
+
+    def __init__(self, window_size: int):
+        self.samples = deque(maxlen=window_size)
+        self.totals = dict.fromkeys(OUTCOMES, 0)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.served_by_fallback = 0
+
+class AIMetrics:
+    """Thread-safe recorder for AI call metrics"""
+
+    def __init__(self, window_size: int = 1000):
+        self.window_size = window_size
+        self._methods = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, outcome: str, latency_ms: float = 0.0, model: str = "",
+               prompt_tokens: int = 0, completion_tokens: int = 0, error_type: Optional[str] = None,
+               fallback: bool = False):
+        """Record one call outcome for a method"""
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        sample = {
+            'timestamp': time.time(),
+            'outcome': outcome,
+            'latency_ms': latency_ms,
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cost_usd': cost,
+            'error_type': error_type,
+            'fallback': fallback or outcome == 'fallback'
+        }
+
+        with self._lock:
+            stats = self._methods.get(method)
+            if stats is None:
+                stats = self._methods[method] = _MethodStats(self.window_size)
+            stats.samples.append(sample)
+            stats.totals[outcome] = stats.totals.get(outcome, 0) + 1
+            stats.served_by_fallback += sample['fallback']
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost_usd += cost
+
+    def record_response(self, method: str, model: str, started: float, response,
+                        outcome: str = 'success', error_type: Optional[str] = None):
+        """Record a completed upstream call from its response object"""
+        usage = getattr(response, 'usage', None)
+        self.record(
+            method, outcome,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            model=getattr(response, 'model', None) or model,
+            prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+            completion_tokens=getattr(usage, 'completion_tokens', 0) or 0,
+            error_type=error_type
+        )
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable summary of every method's rolling window and totals"""
+        with self._lock:
+            methods = {
+                name: (list(stats.samples), dict(stats.totals), stats.prompt_tokens,
+                       stats.completion_tokens, stats.cost_usd, stats.served_by_fallback)
+                for name, stats in self._methods.items()
+            }
+
+        summary = {'window_size': self.window_size, 'generated_at': time.time(), 'methods': {}}
+
+        for name, (samples, totals, prompt_tokens, completion_tokens, cost, served_by_fallback) in methods.items():
+            # Samples with a model reached the API; cache hits and early fallbacks did not
+            upstream = [s for s in samples if s['model']]
+            latencies = sorted(s['latency_ms'] for s in upstream)
+            tokens = [s['prompt_tokens'] + s['completion_tokens'] for s in upstream if s['outcome'] != 'error']
+            window_outcomes = dict.fromkeys(OUTCOMES, 0)
+            for s in samples:
+                window_outcomes[s['outcome']] = window_outcomes.get(s['outcome'], 0) + 1
+
+            summary['methods'][name] = {
+                'totals': totals,
+                'total_served_by_fallback': served_by_fallback,
+                'total_prompt_tokens': prompt_tokens,
+                'total_completion_tokens': completion_tokens,
+                'total_cost_usd': round(cost, 6),
+                'window': {
+                    'calls': len(samples),
+                    'outcomes': window_outcomes,
+                    'served_by_fallback': sum(1 for s in samples if s['fallback']),
+                    'cache_hit_rate': window_outcomes['cache_hit'] / len(samples) if samples else 0.0,
+                    'latency_ms': {
+                        'p50': _percentile(latencies, 50),
+                        'p95': _percentile(latencies, 95),
+                        'p99': _percentile(latencies, 99),
+                        'max': latencies[-1] if latencies else 0.0
+                    },
+                    'latency_histogram': _histogram(latencies, LATENCY_BUCKETS_MS),
+                    'token_histogram': _histogram(tokens, TOKEN_BUCKETS),
+                    'models': sorted({s['model'] for s in samples if s['model']})
+                }
+            }
+
+        return summary
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self._methods.clear()
+
+# Global metrics instance
+ai_metrics = AIMetrics(window_size=int(os.environ.get('AI_METRICS_WINDOW', '1000')))
@@ -1,21 +1,123 @@
 import json
 import os
+import threading
+import time
 from typing import Dict, List, Optional
-from openai import OpenAI
+from utils.ai_cache import SimilarityCache
+from utils.ai_metrics import ai_metrics
 
 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # do not change this unless explicitly requested by the user
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "your-api-key-here")
-client = OpenAI(api_key=OPENAI_API_KEY)
+
+# Contexts whose prompts embed a quiz question or code; only identical prompts share an answer
+EXACT_MATCH_CONTEXTS = {'quiz hint', 'code explanation'}
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_openai_client():
+    """Import the OpenAI SDK and build the client on first use
+
+    Pages import ai_assistant on every cold script run, so the SDK import is
+    deferred until an AI feature actually makes a request.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+def _mark_recorded(error: Exception):
+    try:
+        error.ai_metrics_recorded = True
+    except AttributeError:
+        pass  # Exceptions without a __dict__ get recorded twice at worst
+
+def _json_content(default: str):
+    """Parser for _complete that decodes the JSON message content"""
+    return lambda response: json.loads(response.choices[0].message.content or default)
+
+def _recommendation_list(response) -> List[str]:
+    """Parser for _complete that extracts the recommendation list from various possible formats"""
+    result = json.loads(response.choices[0].message.content or "{}")
+    if isinstance(result, list) and result:
+        return result
+    if isinstance(result, dict):
+        for key in ('recommendations', 'suggestions'):
+            if result.get(key):
+                return result[key]
+        # Try to find a list in the response
+        for value in result.values():
+            if isinstance(value, list) and value:
+                return value
+    raise ValueError("No recommendations in the response")
 
 class AILearningAssistant:
     """AI-powered learning assistant for PERL and Python"""
     
     def __init__(self):
-        self.client = client
+        self.chat_cache = SimilarityCache()
+    
+    @property
+    def client(self):
+        """OpenAI client, created lazily"""
+        return get_openai_client()
+    
+    def _complete(self, method: str, parse=None, **kwargs):
+        """Call the chat completions API and record one sample for the call
+        
+        Returns parse(response) when a parser is given. Every caller serves
+        fallback content when this raises, so failed calls are recorded here
+        as served by fallback and the exception is marked for _record_fallback.
+        """
+        started = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception as e:
+            ai_metrics.record(
+                method, 'error',
+                latency_ms=(time.perf_counter() - started) * 1000,
+                model=kwargs.get('model', ''),
+                error_type=type(e).__name__,
+                fallback=True
+            )
+            _mark_recorded(e)
+            raise
+        
+        if parse is None:
+            ai_metrics.record_response(method, kwargs.get('model', ''), started, response)
+            return response
+        
+        try:
+            result = parse(response)
+        except Exception as e:
+            # The upstream call succeeded (and was billed) but its output is unusable
+            ai_metrics.record_response(method, kwargs.get('model', ''), started, response,
+                                       outcome='fallback', error_type=type(e).__name__)
+            _mark_recorded(e)
+            raise
+        
+        ai_metrics.record_response(method, kwargs.get('model', ''), started, response)
+        return result
+    
+    def _record_fallback(self, method: str, error: Exception):
+        """Record a call that served fallback content, unless _complete already did"""
+        if not getattr(error, 'ai_metrics_recorded', False):
+            ai_metrics.record(method, 'fallback', error_type=type(error).__name__, fallback=True)
     
     def get_chatbot_response(self, user_message: str, context: str = "", language: str = "python"):
         """Get response from AI chatbot for learning support"""
+        # Near-duplicate questions in the same language and context share an answer
+        cache_namespace = f"{language.lower()}|{context}"
+        exact_only = context in EXACT_MATCH_CONTEXTS
+        cached_response = self.chat_cache.get(user_message, cache_namespace, exact_only)
+        if cached_response is not None:
+            ai_metrics.record("get_chatbot_response", 'cache_hit')
+            return cached_response
+        
         try:
             system_prompt = f"""You are an expert programming tutor specializing in {language.upper()} and PERL. 
             You help students learn programming concepts, debug code, and provide clear explanations.
@@ -29,7 +131,8 @@ class AILearningAssistant:
             
             Context: {context}"""
             
-            response = self.client.chat.completions.create(
+            response = self._complete(
+                "get_chatbot_response",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -39,8 +142,14 @@ class AILearningAssistant:
                 temperature=0.7
             )
             
-            return response.choices[0].message.content or "No response received"
+            content = response.choices[0].message.content
+            if not content:
+                return "No response received"
+            
+            self.chat_cache.put(user_message, content, cache_namespace, exact_only)
+            return content
         except Exception as e:
+            self._record_fallback("get_chatbot_response", e)
             error_msg = str(e).lower()
             if "quota" in error_msg or "429" in error_msg:
                 return "I'm temporarily unavailable due to high usage. You can still use the code practice, courses, and quiz features with sample content. Please try the AI chat again later."
@@ -69,7 +178,9 @@ Please provide analysis in this JSON format:
     "overall_feedback": "brief overall assessment"
 }}"""
             
-            response = self.client.chat.completions.create(
+            feedback = self._complete(
+                "analyze_code",
+                parse=_json_content("{}"),
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": f"You are an expert {language.upper()} code reviewer. Provide detailed analysis in valid JSON format."},
@@ -79,13 +190,10 @@ Please provide analysis in this JSON format:
                 max_tokens=1000,
                 temperature=0.3
             )
-            
-            import json
-            content = response.choices[0].message.content or "{}"
-            feedback = json.loads(content)
             return feedback
             
         except Exception as e:
+            self._record_fallback("analyze_code", e)
             error_msg = str(e).lower()
             if "quota" in error_msg or "429" in error_msg:
                 return self._get_fallback_analysis(code, language, "quota_exceeded")
@@ -141,7 +249,8 @@ Please provide analysis in this JSON format:
                 "Add error handling where appropriate",
                 "Test code with different inputs"
             ],
-            "overall_feedback": feedback
+            "overall_feedback": feedback,
+            "is_fallback": True
         }
     
     def generate_quiz_questions(self, topic: str, language: str, difficulty: str = "beginner", count: int = 5) -> List[Dict]:
@@ -160,7 +269,9 @@ Format each question as JSON with this structure:
 
 Return an array of {count} questions in valid JSON format."""
             
-            response = self.client.chat.completions.create(
+            result = self._complete(
+                "generate_quiz_questions",
+                parse=_json_content("[]"),
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": f"You are an expert {language.upper()} programming instructor. Generate educational quiz questions in valid JSON format."},
@@ -171,10 +282,6 @@ Return an array of {count} questions in valid JSON format."""
                 temperature=0.7
             )
             
-            import json
-            content = response.choices[0].message.content or "[]"
-            result = json.loads(content)
-            
             # Handle different response formats
             if isinstance(result, dict):
                 if 'questions' in result:
@@ -192,12 +299,18 @@ Return an array of {count} questions in valid JSON format."""
             return []
             
         except Exception as e:
+            self._record_fallback("generate_quiz_questions", e)
             # Return fallback quiz questions from sample data
             from data.quizzes.sample_quizzes import get_quiz_by_criteria
             return get_quiz_by_criteria(language, topic, difficulty, count)
     
-    def get_learning_recommendations(self, user_progress: Dict, current_topic: str = "") -> List[str]:
-        """Get personalized learning recommendations"""
+    def get_learning_recommendations(self, user_progress: Dict, current_topic: str = "",
+                                     fallback: bool = True) -> List[str]:
+        """Get personalized learning recommendations
+        
+        With fallback=False a failed call raises instead of returning the
+        generic list, so callers that store the result can tell them apart.
+        """
         try:
             prompt = f"""Based on this learning progress data: {user_progress}
             Current topic: {current_topic}
@@ -207,7 +320,9 @@ Return an array of {count} questions in valid JSON format."""
             
             Return as JSON array of recommendation strings."""
             
-            response = self.client.chat.completions.create(
+            return self._complete(
+                "get_learning_recommendations",
+                parse=_recommendation_list,
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are a programming education expert. Provide specific, actionable learning recommendations."},
@@ -218,27 +333,10 @@ Return an array of {count} questions in valid JSON format."""
                 temperature=0.6
             )
             
-            import json
-            content = response.choices[0].message.content or "{}"
-            result = json.loads(content)
-            
-            # Extract recommendations from various possible formats
-            if isinstance(result, dict):
-                if 'recommendations' in result:
-                    return result['recommendations']
-                elif 'suggestions' in result:
-                    return result['suggestions']
-                else:
-                    # Try to find a list in the response
-                    for value in result.values():
-                        if isinstance(value, list):
-                            return value
-            elif isinstance(result, list):
-                return result
-            
-            return ["Continue practicing with code examples", "Review fundamental concepts", "Take more quizzes to test understanding"]
-            
         except Exception as e:
+            self._record_fallback("get_learning_recommendations", e)
+            if not fallback:
+                raise
             return [
                 "Practice coding exercises regularly",
                 "Review course materials for better understanding",
@@ -254,7 +352,9 @@ Return an array of {count} questions in valid JSON format."""
             
             Return as JSON array of suggestion strings."""
             
-            response = self.client.chat.completions.create(
+            result = self._complete(
+                "get_search_suggestions",
+                parse=_json_content("{}"),
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "You are a programming education search assistant. Suggest helpful related search terms."},
@@ -265,10 +365,6 @@ Return an array of {count} questions in valid JSON format."""
                 temperature=0.5
             )
             
-            import json
-            content = response.choices[0].message.content or "{}"
-            result = json.loads(content)
-            
             # Extract suggestions from response
             if isinstance(result, dict):
                 for value in result.values():
@@ -280,6 +376,7 @@ Return an array of {count} questions in valid JSON format."""
             return []
             
         except Exception as e:
+            self._record_fallback("get_search_suggestions", e)
             return []
     
     def explain_concept(self, concept: str, language: str):
@@ -287,7 +384,8 @@ Return an array of {count} questions in valid JSON format."""
         try:
             prompt = f"Explain the {language} programming concept: {concept}. Keep it concise and educational."
             
-            response = self.client.chat.completions.create(
+            response = self._complete(
+                "explain_concept",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": f"You are an expert {language} programming tutor. Provide clear, concise explanations."},
@@ -300,6 +398,7 @@ Return an array of {count} questions in valid JSON format."""
             return response.choices[0].message.content or "Unable to explain concept at this time."
             
         except Exception as e:
+            self._record_fallback("explain_concept", e)
             return f"Unable to explain {concept} at this time. Please try again later."
 
 # Global AI assistant instance
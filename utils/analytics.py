@@ -0,0 +1,107 @@
+"""
+Instructor analytics computed in SQL and served from cached snapshots
+
+Snapshots are keyed by a time bucket. A request in a new bucket gets the
+previous snapshot immediately while a background thread computes the next
+one, so the instructor dashboard never waits on the class-wide queries after
+the first load.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from utils.db_schema import User, QuizResult, UserStats, SessionLocal
+
+ANALYTICS_BUCKET_SECONDS = int(os.environ.get('ANALYTICS_BUCKET_SECONDS', '300'))
+POPULAR_TOPICS_LIMIT = 10
+
+def compute_learning_analytics() -> Dict:
+    """Class-wide analytics from GROUP BY queries over the database"""
+    with SessionLocal() as db:
+        total_users = db.query(func.count(User.id)).filter(User.role == 'student').scalar()
+        
+        # Event totals come from the per-user rollup instead of counting raw rows
+        total_activities, total_quizzes, total_submissions = db.query(
+            func.coalesce(func.sum(UserStats.total_activities), 0),
+            func.coalesce(func.sum(UserStats.quiz_count), 0),
+            func.coalesce(func.sum(UserStats.code_submission_count), 0)
+        ).one()
+        
+        active_today = db.query(func.count(UserStats.user_id)).filter(
+            UserStats.last_activity_date == datetime.utcnow().date()
+        ).scalar()
+        
+        language_rows = db.query(
+            QuizResult.language,
+            func.count(QuizResult.id),
+            func.avg(QuizResult.score_percentage)
+        ).group_by(QuizResult.language).all()
+        
+        topic_rows = db.query(
+            QuizResult.quiz_topic,
+            func.count(QuizResult.id)
+        ).group_by(QuizResult.quiz_topic).order_by(func.count(QuizResult.id).desc()).limit(POPULAR_TOPICS_LIMIT).all()
+    
+    return {
+        'total_users': total_users,
+        'total_activities': int(total_activities),
+        'total_quizzes_taken': int(total_quizzes),
+        'total_code_submissions': int(total_submissions),
+        'active_today': active_today,
+        'popular_topics': {topic: count for topic, count in topic_rows},
+        'language_preferences': {language: count for language, count, _ in language_rows},
+        'average_scores': {language: float(avg or 0) for language, _, avg in language_rows},
+        'computed_at': datetime.utcnow().isoformat()
+    }
+
+class AnalyticsSnapshotCache:
+    """Time-bucketed analytics snapshot with background refresh"""
+    
+    def __init__(self, bucket_seconds: int = ANALYTICS_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self._snapshot = None
+        self._bucket = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+    
+    def _current_bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+    
+    def _refresh(self, bucket: int):
+        try:
+            snapshot = compute_learning_analytics()
+            with self._lock:
+                self._snapshot, self._bucket = snapshot, bucket
+        finally:
+            with self._lock:
+                self._refreshing = False
+    
+    def get(self) -> Dict:
+        """Return the current snapshot, refreshing in the background when it is stale"""
+        bucket = self._current_bucket()
+        
+        with self._lock:
+            snapshot, snapshot_bucket = self._snapshot, self._bucket
+            stale = snapshot is not None and snapshot_bucket != bucket
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, args=(bucket,), name="analytics-refresh", daemon=True).start()
+        
+        if snapshot is not None:
+            return snapshot
+        
+        # First request in this process: compute synchronously
+        snapshot = compute_learning_analytics()
+        with self._lock:
+            self._snapshot, self._bucket = snapshot, bucket
+        return snapshot
+    
+    def invalidate(self):
+        """Force the next request to trigger a refresh"""
+        with self._lock:
+            self._bucket = None
+
+# Global analytics cache instance
+analytics_cache = AnalyticsSnapshotCache()
@@ -1,22 +1,30 @@
 import streamlit as st
 import pandas as pd
-import hashlib
 from typing import Dict, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from utils import passwords
 from utils.db_schema import User, SessionLocal
+from utils.session_tokens import (
+    issue_token, verify_token, get_cached_user, invalidate_user,
+    SESSION_TOKEN_TTL_SECONDS, SESSION_REMEMBER_TTL_SECONDS, SESSION_URL_TOKENS
+)
 from datetime import datetime
 
 def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password with the configured KDF"""
+    return passwords.hash_password(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(password) == hashed
+    """Verify password against hash (KDF or legacy SHA-256)"""
+    return passwords.verify_password(password, hashed)
 
 def create_user(username: str, email: str, password: str, role: str = "student") -> bool:
     """Create new user in database"""
     try:
+        # Hash before checking out a pooled connection
+        password_hash = hash_password(password)
+        
         with SessionLocal() as db:
             # Check if user already exists
             existing_user = db.query(User).filter(
@@ -30,7 +38,7 @@ def create_user(username: str, email: str, password: str, role: str = "student")
             new_user = User(
                 username=username,
                 email=email,
-                password_hash=hash_password(password),
+                password_hash=password_hash,
                 role=role,
                 created_at=datetime.utcnow()
             )
@@ -39,6 +47,9 @@ def create_user(username: str, email: str, password: str, role: str = "student")
             db.commit()
             return True
             
+    except passwords.PasswordHashBusy as e:
+        st.warning(str(e))
+        return False
     except Exception as e:
         st.error(f"Error creating user: {str(e)}")
         return False
@@ -48,29 +59,188 @@ def authenticate_user_db(username: str, password: str) -> Optional[Dict]:
     try:
         with SessionLocal() as db:
             user = db.query(User).filter(User.username == username).first()
-            
-            if user and verify_password(password, user.password_hash):
-                # Update last login
-                db.query(User).filter(User.id == user.id).update({
-                    User.last_login: datetime.utcnow()
-                })
+        
+        # The KDF runs with no pooled connection checked out, and for unknown
+        # usernames too, so response time doesn't reveal which accounts exist
+        if user is None:
+            verify_password(password, passwords.dummy_hash())
+            return None
+        if not verify_password(password, user.password_hash):
+            return None
+        
+        # Upgrade legacy or outdated hashes while the plaintext is at hand
+        if passwords.needs_rehash(user.password_hash):
+            with SessionLocal() as db:
+                db.query(User).filter(User.id == user.id).update({User.password_hash: hash_password(password)})
                 db.commit()
-                
-                return {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'role': user.role,
-                    'full_name': user.full_name,
-                    'created_at': user.created_at,
-                    'last_login': user.last_login
-                }
-        return None
         
+        # last_login and the login activity go through the write-behind batches
+        from utils.database import record_login
+        user.last_login = datetime.utcnow()
+        record_login(user.id, user.last_login, user.username)
+        
+        return _user_record(user)
+        
+    except passwords.PasswordHashBusy:
+        raise  # The login form asks the user to retry
     except Exception as e:
         st.error(f"Authentication error: {str(e)}")
         return None
 
+# Session-token query parameter
+SESSION_QUERY_PARAM = 'session'
+
+def _user_record(user: User) -> Dict:
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'role': user.role,
+        'full_name': user.full_name,
+        'created_at': user.created_at,
+        'last_login': user.last_login,
+        'session_generation': user.session_generation or 0
+    }
+
+def _load_user(user_id: int) -> Optional[Dict]:
+    """Active user's record from the database"""
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        if user is None or user.is_active is False:
+            return None
+        return _user_record(user)
+
+def start_session(user_record: Dict, remember: bool = False):
+    """Mark the session authenticated and, with SESSION_URL_TOKENS, hand the browser a signed token"""
+    st.session_state.authenticated = True
+    st.session_state.user_data = {
+        **user_record,
+        'login_time': pd.Timestamp.now()
+    }
+    
+    st.session_state.session_generation = user_record.get('session_generation', 0)
+    
+    if SESSION_URL_TOKENS and user_record.get('id'):
+        ttl = SESSION_REMEMBER_TTL_SECONDS if remember else SESSION_TOKEN_TTL_SECONDS
+        st.session_state.session_ttl = ttl
+        st.query_params[SESSION_QUERY_PARAM] = issue_token(user_record['id'], ttl, st.session_state.session_generation)
+
+def end_session():
+    """Sign out this session and drop its token"""
+    st.session_state.authenticated = False
+    st.session_state.user_data = {}
+    if SESSION_QUERY_PARAM in st.query_params:
+        del st.query_params[SESSION_QUERY_PARAM]
+
+def _restore_session() -> bool:
+    """Re-authenticate from a signed token, e.g. after a server restart"""
+    if not SESSION_URL_TOKENS:
+        # Never honour a token from a link while URL tokens are off
+        if SESSION_QUERY_PARAM in st.query_params:
+            del st.query_params[SESSION_QUERY_PARAM]
+        return False
+    
+    verified = verify_token(st.query_params.get(SESSION_QUERY_PARAM))
+    if verified is None:
+        return False
+    user_id, generation = verified
+    
+    try:
+        record = get_cached_user(user_id, _load_user)
+    except Exception as e:
+        return False
+    if record is None:
+        return False
+    
+    # The user logged out or changed their password after this token was issued
+    if record.get('session_generation', 0) != generation:
+        del st.query_params[SESSION_QUERY_PARAM]
+        return False
+    
+    st.session_state.session_generation = generation
+    st.session_state.authenticated = True
+    st.session_state.user_data = {**record, 'login_time': pd.Timestamp.now()}
+    return True
+
+def update_user_profile(user_id: int, email: str, full_name: str) -> bool:
+    """Update profile fields and refresh the cached record"""
+    with SessionLocal() as db:
+        updated = db.query(User).filter(User.id == user_id).update({
+            User.email: email,
+            User.full_name: full_name
+        })
+        db.commit()
+    invalidate_user(user_id)
+    return bool(updated)
+
+def revoke_sessions(user_id: int) -> bool:
+    """Invalidate every token issued to the user so far, on all devices"""
+    with SessionLocal() as db:
+        updated = db.query(User).filter(User.id == user_id).update(
+            {User.session_generation: User.session_generation + 1}
+        )
+        db.commit()
+    invalidate_user(user_id)
+    return bool(updated)
+
+def change_password(user_id: int, current_password: str, new_password: str) -> bool:
+    """Replace the password after checking the current one; signs out the user's other sessions"""
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+    
+    # The KDF runs with no pooled connection checked out
+    if user is None or not verify_password(current_password, user.password_hash):
+        return False
+    new_hash = hash_password(new_password)
+    
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({
+            User.password_hash: new_hash,
+            User.session_generation: User.session_generation + 1
+        })
+        db.commit()
+    invalidate_user(user_id)
+    
+    # Keep the session that made the change signed in under the new generation
+    if (st.session_state.get('user_data') or {}).get('id') == user_id:
+        record = get_cached_user(user_id, _load_user)
+        if record is not None:
+            st.session_state.user_data = {**st.session_state.user_data, **record}
+            st.session_state.session_generation = record['session_generation']
+            if SESSION_URL_TOKENS:
+                ttl = st.session_state.get('session_ttl', SESSION_TOKEN_TTL_SECONDS)
+                st.query_params[SESSION_QUERY_PARAM] = issue_token(user_id, ttl, record['session_generation'])
+    return True
+
+def set_user_role(user_id: int, role: str) -> bool:
+    """Change a user's role; open sessions pick it up on their next rerun"""
+    with SessionLocal() as db:
+        updated = db.query(User).filter(User.id == user_id).update({User.role: role})
+        db.commit()
+    invalidate_user(user_id)
+    return bool(updated)
+
+def ensure_default_admin() -> bool:
+    """Create the default admin account if it doesn't exist; returns True if it was created"""
+    with SessionLocal() as db:
+        if db.query(User.id).filter(User.username == 'admin').first():
+            return False
+        
+        db.add(User(
+            username='admin',
+            email='admin@example.com',
+            password_hash=hash_password('admin123'),
+            role='instructor',
+            created_at=datetime.utcnow()
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another server process seeded it first
+            db.rollback()
+            return False
+        return True
+
 def initialize_session():
     """Initialize session state variables"""
     if 'authenticated' not in st.session_state:
@@ -79,16 +249,6 @@ def initialize_session():
     if 'user_data' not in st.session_state:
         st.session_state.user_data = {}
     
-    # Create default admin user if database is available
-    try:
-        with SessionLocal() as db:
-            admin_user = db.query(User).filter(User.username == 'admin').first()
-            if not admin_user:
-                create_user('admin', 'admin@example.com', 'admin123', 'instructor')
-    except:
-        # If database is not available, continue without fallback
-        pass
-    
     if 'user_progress' not in st.session_state:
         st.session_state.user_progress = {
             'lessons_completed': 0,
@@ -105,7 +265,32 @@ def initialize_session():
 
 def check_authentication() -> bool:
     """Check if user is authenticated"""
-    return st.session_state.get('authenticated', False)
+    if not st.session_state.get('authenticated', False):
+        return _restore_session()
+    
+    user_data = st.session_state.get('user_data') or {}
+    user_id = user_data.get('id')
+    if not user_id:
+        return True  # Session-only account
+    
+    # A cache hit is a dictionary lookup; a miss reloads the user after it was invalidated or expired
+    try:
+        record = get_cached_user(user_id, _load_user)
+    except Exception as e:
+        return True  # Keep the session while the database is unavailable
+    
+    if record is None:
+        end_session()
+        return False
+    
+    # Revoked by a logout or password change in another session
+    if record.get('session_generation', 0) != st.session_state.get('session_generation', 0):
+        end_session()
+        return False
+    
+    if any(user_data.get(key) != value for key, value in record.items()):
+        st.session_state.user_data = {**user_data, **record}
+    return True
 
 def get_current_user() -> Optional[Dict]:
     """Get current authenticated user data"""
@@ -119,9 +304,14 @@ def is_instructor() -> bool:
     return user and user.get('role') == 'instructor'
 
 def logout():
-    """Logout current user"""
-    st.session_state.authenticated = False
-    st.session_state.user_data = {}
+    """Logout current user and revoke their tokens everywhere"""
+    user_id = (st.session_state.get('user_data') or {}).get('id')
+    if user_id:
+        try:
+            revoke_sessions(user_id)
+        except Exception as e:
+            pass  # The token still expires; the session below is closed regardless
+    end_session()
     st.rerun()
 
 def update_user_progress(progress_type: str, increment: int = 1):
@@ -136,6 +326,10 @@ def update_user_progress(progress_type: str, increment: int = 1):
             new_score = ((current_score * quiz_count) + increment) / (quiz_count + 1)
             st.session_state.user_progress['average_quiz_score'] = new_score
             st.session_state.user_progress['quiz_count'] = quiz_count + 1
+        
+        # Recompute AI recommendations off the request path when progress changed meaningfully
+        from utils.recommendations import refresh_recommendations
+        refresh_recommendations()
 
 def get_user_skill_level(language: str) -> str:
     """Get user's skill level for a specific programming language"""
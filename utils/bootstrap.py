@@ -0,0 +1,76 @@
+"""
+Process-wide startup work
+
+Streamlit reruns app.py on every interaction, so anything that only has to
+happen once per server process lives here behind ``st.cache_resource``:
+creating tables and indexes, seeding the default admin and warming caches.
+Reruns get the cached result without touching the database.
+"""
+import time
+from typing import Callable, Dict, List
+import streamlit as st
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from utils.db_schema import engine, create_tables
+
+# Callables run once after the database is ready; failures are recorded, not raised
+_warmups: List[Callable[[], None]] = []
+
+def register_warmup(fn: Callable[[], None]) -> Callable[[], None]:
+    """Add a cache warm-up step to the bootstrap (usable as a decorator)"""
+    _warmups.append(fn)
+    return fn
+
+@register_warmup
+def _warm_orm():
+    # Mapper configuration and the first pooled connection are otherwise paid by the first request
+    configure_mappers()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+@register_warmup
+def _warm_course_catalog():
+    from utils.course_data import get_catalog
+    from utils.lesson_render import LESSON_RENDER_PREWARM, prerender_catalog
+    catalog = get_catalog()
+    if LESSON_RENDER_PREWARM:
+        prerender_catalog(catalog)
+
+@register_warmup
+def _warm_password_hash():
+    # Times the KDF for admission control and keeps the dummy hash off the first unknown-user login
+    from utils.passwords import dummy_hash
+    dummy_hash()
+
+@st.cache_resource(show_spinner=False)
+def bootstrap_app() -> Dict:
+    """Create tables, seed the admin and warm caches; runs once per server process
+    
+    Exceptions propagate and are not cached, so a failed bootstrap is retried
+    on the next rerun.
+    """
+    from utils.auth import ensure_default_admin
+    
+    started = time.perf_counter()
+    create_tables()
+    admin_created = ensure_default_admin()
+    
+    # One-time rollup backfill for databases that predate user_stats
+    from utils.user_stats import backfill_if_empty
+    stats_backfilled = backfill_if_empty()
+    
+    warmed, failed = [], {}
+    for warmup in _warmups:
+        try:
+            warmup()
+            warmed.append(warmup.__name__)
+        except Exception as e:
+            failed[warmup.__name__] = str(e)
+    
+    return {
+        'admin_created': admin_created,
+        'stats_backfilled': stats_backfilled,
+        'warmed': warmed,
+        'warmup_errors': failed,
+        'elapsed_ms': (time.perf_counter() - started) * 1000
+    }
@@ -0,0 +1,157 @@
+"""
+Bulk AI analysis of code submissions for instructor review
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import String, cast, or_, update
+from utils.db_schema import CodeSubmission, SessionLocal
+from utils.ai_services import ai_assistant
+
+def code_hash(code: str, language: str) -> str:
+    """Hash code content so identical submissions share one analysis"""
+    normalized = code.strip().replace('\r\n', '\n')
+    return hashlib.sha256(f"{language.lower()}\0{normalized}".encode()).hexdigest()
+
+def pending_feedback_filter():
+    """SQL filter for submissions that still need AI feedback"""
+    return or_(
+        CodeSubmission.ai_feedback.is_(None),
+        cast(CodeSubmission.ai_feedback, String).in_(['null', '{}'])
+    )
+
+class BulkAnalysisJob:
+    """Analyze every pending CodeSubmission with a bounded worker pool
+
+    Identical code is analyzed once and the feedback is fanned out to every
+    matching row. Feedback is written in batched UPDATEs, so an interrupted
+    job keeps everything already flushed and a re-run only picks up the rows
+    that still have no feedback.
+    """
+
+    def __init__(self, max_workers: int = 4, batch_size: int = 50, page_size: int = 500,
+                 progress_callback: Optional[Callable[[Dict], None]] = None):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.progress_callback = progress_callback
+        self.progress = {
+            'total_submissions': 0,
+            'unique_submissions': 0,
+            'analyzed': 0,
+            'updated_rows': 0,
+            'failed': 0
+        }
+
+    def _report(self):
+        if self.progress_callback:
+            self.progress_callback(dict(self.progress))
+
+    def _collect_pending(self, user_ids: Optional[List[int]], language: Optional[str]) -> Dict[str, Dict]:
+        """Group pending submissions by code hash using keyset pagination"""
+        groups = {}
+        last_id = 0
+
+        with SessionLocal() as db:
+            while True:
+                query = db.query(
+                    CodeSubmission.id, CodeSubmission.language, CodeSubmission.code_content
+                ).filter(CodeSubmission.id > last_id, pending_feedback_filter())
+
+                if user_ids:
+                    query = query.filter(CodeSubmission.user_id.in_(user_ids))
+                if language:
+                    query = query.filter(CodeSubmission.language == language)
+
+                rows = query.order_by(CodeSubmission.id).limit(self.page_size).all()
+                if not rows:
+                    break
+
+                for row_id, row_language, code in rows:
+                    key = code_hash(code or '', row_language or '')
+                    group = groups.get(key)
+                    if group is None:
+                        # Keep the code of the first instance only
+                        groups[key] = {'language': row_language, 'code': code or '', 'ids': [row_id]}
+                    else:
+                        group['ids'].append(row_id)
+
+                last_id = rows[-1][0]
+
+        return groups
+
+    def _flush(self, pending_updates: List[Dict]):
+        """Write a batch of feedback rows in a single transaction"""
+        if not pending_updates:
+            return
+
+        with SessionLocal() as db:
+            db.execute(update(CodeSubmission), pending_updates)
+            db.commit()
+
+        self.progress['updated_rows'] += len(pending_updates)
+        pending_updates.clear()
+
+    def run(self, user_ids: Optional[List[int]] = None, language: Optional[str] = None) -> Dict:
+        """Run the job and return the final progress counters"""
+        groups = self._collect_pending(user_ids, language)
+
+        self.progress['total_submissions'] = sum(len(g['ids']) for g in groups.values())
+        self.progress['unique_submissions'] = len(groups)
+        self._report()
+
+        pending_updates = []
+        work = iter(groups.values())
+        max_in_flight = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+
+            def submit_next():
+                group = next(work, None)
+                if group is not None:
+                    future = executor.submit(ai_assistant.analyze_code, group['code'], group['language'])
+                    in_flight[future] = group
+                return group is not None
+
+            try:
+                while len(in_flight) < max_in_flight and submit_next():
+                    pass
+
+                while in_flight:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        group = in_flight.pop(future)
+
+                        try:
+                            feedback = future.result()
+                        except Exception:
+                            feedback = None
+
+                        if not feedback or feedback.get('is_fallback'):
+                            # Leave the rows pending so a later run retries them
+                            self.progress['failed'] += 1
+                        else:
+                            self.progress['analyzed'] += 1
+                            pending_updates.extend({'id': row_id, 'ai_feedback': feedback} for row_id in group['ids'])
+
+                        if len(pending_updates) >= self.batch_size:
+                            self._flush(pending_updates)
+
+                        self._report()
+                        submit_next()
+            finally:
+                # Cancel queued work and keep whatever already finished
+                for future in in_flight:
+                    future.cancel()
+                self._flush(pending_updates)
+
+        self._report()
+        return dict(self.progress)
+
+def run_bulk_analysis(user_ids: Optional[List[int]] = None, language: Optional[str] = None,
+                      max_workers: int = 4, progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Analyze all pending code submissions and write feedback back to the database"""
+    job = BulkAnalysisJob(max_workers=max_workers, progress_callback=progress_callback)
+    return job.run(user_ids=user_ids, language=language)
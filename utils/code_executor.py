@@ -2,6 +2,7 @@ import subprocess
 import tempfile
 import os
 import sys
+import time
 from typing import Dict, Tuple
 import streamlit as st
 
@@ -22,6 +23,7 @@ class SafeCodeExecutor:
             
             try:
                 # Execute the code with timeout
+                started = time.perf_counter()
                 result = subprocess.run(
                     [sys.executable, temp_file],
                     capture_output=True,
@@ -30,6 +32,7 @@ class SafeCodeExecutor:
                     cwd=tempfile.gettempdir()
                 )
                 
+                execution_time_ms = int((time.perf_counter() - started) * 1000)
                 output = result.stdout
                 error = result.stderr
                 
@@ -44,7 +47,8 @@ class SafeCodeExecutor:
                     'success': result.returncode == 0,
                     'output': output,
                     'error': error,
-                    'execution_time': 'N/A'  # Would need more complex timing
+                    'execution_time': f'{execution_time_ms} ms',
+                    'execution_time_ms': execution_time_ms
                 }
                 
             finally:
@@ -79,6 +83,7 @@ class SafeCodeExecutor:
             
             try:
                 # Execute the code with timeout
+                started = time.perf_counter()
                 result = subprocess.run(
                     ['perl', temp_file],
                     capture_output=True,
@@ -87,6 +92,7 @@ class SafeCodeExecutor:
                     cwd=tempfile.gettempdir()
                 )
                 
+                execution_time_ms = int((time.perf_counter() - started) * 1000)
                 output = result.stdout
                 error = result.stderr
                 
@@ -101,7 +107,8 @@ class SafeCodeExecutor:
                     'success': result.returncode == 0,
                     'output': output,
                     'error': error,
-                    'execution_time': 'N/A'
+                    'execution_time': f'{execution_time_ms} ms',
+                    'execution_time_ms': execution_time_ms
                 }
                 
             finally:
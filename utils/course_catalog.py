@@ -0,0 +1,234 @@
+"""
+Immutable course catalog shared by every session
+
+The catalog is built once per server process and never mutated, so sessions
+can hold plain references to it instead of their own copies of the course
+tree. All records are frozen, slotted dataclasses.
+
+Courses, modules and lesson titles form a light metadata index that is built
+eagerly. A lesson's body (its content and exercises) is only materialised the
+first time it is read, so building the catalog stays cheap as courses grow.
+"""
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+@dataclass(frozen=True, slots=True)
+class Exercise:
+    """A practice exercise attached to a lesson"""
+    title: str
+    description: str
+    starter_code: str = ""
+    solution: str = ""
+
+@dataclass(frozen=True, slots=True)
+class LessonBody:
+    """The heavy part of a lesson, loaded on demand"""
+    content: str
+    exercises: Tuple[Exercise, ...] = ()
+
+class LazyBody:
+    """Thread-safe holder that calls its loader once, on first access"""
+    __slots__ = ('_loader', '_body', '_lock')
+
+    def __init__(self, loader: Callable[[], LessonBody]):
+        self._loader = loader
+        self._body = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._body is not None
+
+    def get(self) -> LessonBody:
+        body = self._body
+        if body is None:
+            with self._lock:
+                if self._body is None:
+                    self._body = self._loader()
+                    self._loader = None  # Release the source data
+                body = self._body
+        return body
+
+    def peek(self) -> LessonBody:
+        """The body, without keeping it loaded if nothing has opened it yet"""
+        body = self._body
+        if body is None:
+            with self._lock:
+                body = self._body if self._body is not None else self._loader()
+        return body
+
+@dataclass(frozen=True, slots=True)
+class Lesson:
+    """Lesson metadata; content and exercises load on first access"""
+    id: str
+    title: str
+    body: LazyBody = field(compare=False, repr=False)
+    digest: Optional[str] = field(default=None, compare=False, repr=False)  # lesson_digest, when known
+
+    @property
+    def content(self) -> str:
+        return self.body.get().content
+
+    @property
+    def exercises(self) -> Tuple[Exercise, ...]:
+        return self.body.get().exercises
+
+@dataclass(frozen=True, slots=True)
+class Module:
+    """An ordered group of lessons"""
+    id: str
+    title: str
+    description: str
+    lessons: Tuple[Lesson, ...] = ()
+
+    def get_lesson(self, lesson_id: str) -> Optional[Lesson]:
+        return next((lesson for lesson in self.lessons if lesson.id == lesson_id), None)
+
+@dataclass(frozen=True, slots=True)
+class LessonPosition:
+    """Where a lesson sits in its course's reading order"""
+    index: int
+    index_in_module: int
+    module_id: str
+    lesson_id: str
+    prev: Optional[Tuple[str, str]] = None  # (module_id, lesson_id)
+    next: Optional[Tuple[str, str]] = None
+
+@dataclass(frozen=True, slots=True)
+class CourseNavigation:
+    """Constant-time lookups over a course's flattened lesson order"""
+    positions: Mapping[Tuple[str, str], LessonPosition]
+    lessons: Mapping[Tuple[str, str], Lesson]
+    modules: Mapping[str, Module]
+    module_totals: Mapping[str, int]
+    total_lessons: int
+
+    def position(self, module_id: str, lesson_id: str) -> Optional[LessonPosition]:
+        return self.positions.get((module_id, lesson_id))
+
+    def lesson(self, module_id: str, lesson_id: str) -> Optional[Lesson]:
+        return self.lessons.get((module_id, lesson_id))
+
+    def progress_percent(self, completed: int) -> float:
+        """Share of the course's lessons that completed represents"""
+        if not self.total_lessons:
+            return 0.0
+        return min(100.0, completed * 100.0 / self.total_lessons)
+
+def build_navigation(modules: Tuple[Module, ...]) -> CourseNavigation:
+    """Index lesson positions and prev/next links; reads metadata only, never lesson bodies"""
+    order = [(module.id, lesson.id, j) for module in modules for j, lesson in enumerate(module.lessons)]
+    positions = {
+        (module_id, lesson_id): LessonPosition(
+            index=i,
+            index_in_module=j,
+            module_id=module_id,
+            lesson_id=lesson_id,
+            prev=order[i - 1][:2] if i > 0 else None,
+            next=order[i + 1][:2] if i + 1 < len(order) else None
+        )
+        for i, (module_id, lesson_id, j) in enumerate(order)
+    }
+    return CourseNavigation(
+        positions=MappingProxyType(positions),
+        lessons=MappingProxyType({(module.id, lesson.id): lesson for module in modules for lesson in module.lessons}),
+        modules=MappingProxyType({module.id: module for module in modules}),
+        module_totals=MappingProxyType({module.id: len(module.lessons) for module in modules}),
+        total_lessons=len(order)
+    )
+
+@dataclass(frozen=True, slots=True)
+class Course:
+    """A course with its modules in order and a navigation index built with it"""
+    id: str
+    title: str
+    description: str
+    difficulty: str
+    estimated_hours: int
+    modules: Tuple[Module, ...] = ()
+    provider: Optional[str] = field(default=None, compare=False)  # Provider module name, when known
+    navigation: CourseNavigation = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        # Built once per Course, so once per catalog version
+        object.__setattr__(self, 'navigation', build_navigation(self.modules))
+
+    def get_module(self, module_id: str) -> Optional[Module]:
+        return self.navigation.modules.get(module_id)
+
+@dataclass(frozen=True, slots=True)
+class CourseCatalog:
+    """Read-only mapping of course id to Course"""
+    courses: Mapping[str, Course]
+
+    def get(self, course_id: str) -> Optional[Course]:
+        return self.courses.get(course_id)
+
+    def __iter__(self):
+        return iter(self.courses.values())
+
+def lesson_digest(title: str, body: LessonBody) -> str:
+    """Hash of everything a reader sees in a lesson"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(title.encode('utf-8') + b'\0' + body.content.encode('utf-8'))
+    for exercise in body.exercises:
+        for part in (exercise.title, exercise.description, exercise.starter_code, exercise.solution):
+            digest.update(b'\0' + part.encode('utf-8'))
+    return digest.hexdigest()
+
+def _build_exercise(data: Dict) -> Exercise:
+    return Exercise(
+        title=data.get('title', ''),
+        description=data.get('description', ''),
+        starter_code=data.get('starter_code', ''),
+        solution=data.get('solution', '')
+    )
+
+def _build_body(data: Dict) -> LessonBody:
+    content = data.get('content', '')
+    exercises = data.get('exercises', [])
+    # Providers may defer expensive content behind a zero-argument callable
+    if callable(content):
+        content = content()
+    if callable(exercises):
+        exercises = exercises()
+    return LessonBody(
+        content=content or '',
+        exercises=tuple(_build_exercise(e) for e in exercises or [])
+    )
+
+def _build_lesson(data: Dict) -> Lesson:
+    return Lesson(
+        id=data['id'],
+        title=data.get('title', ''),
+        body=LazyBody(lambda: _build_body(data))
+    )
+
+def _build_module(data: Dict) -> Module:
+    return Module(
+        id=data['id'],
+        title=data.get('title', ''),
+        description=data.get('description', ''),
+        lessons=tuple(_build_lesson(l) for l in data.get('lessons', []))
+    )
+
+def build_course(course_id: str, data: Dict, provider: Optional[str] = None) -> Course:
+    """Freeze one course definition dict into a Course"""
+    return Course(
+        id=course_id,
+        title=data.get('title', ''),
+        description=data.get('description', ''),
+        difficulty=data.get('difficulty', ''),
+        estimated_hours=data.get('estimated_hours', 0),
+        modules=tuple(_build_module(m) for m in data.get('modules', [])),
+        provider=provider
+    )
+
+def build_catalog(sources: Dict[str, Dict]) -> CourseCatalog:
+    """Freeze course definition dicts, keyed by course id, into a catalog"""
+    return CourseCatalog(MappingProxyType({
+        course_id: build_course(course_id, data) for course_id, data in sources.items()
+    }))
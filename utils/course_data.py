@@ -1,120 +1,46 @@
-from typing import Dict, List
+from typing import Dict, Optional
 import streamlit as st
+from utils.course_catalog import Course, CourseCatalog
+from utils.course_loader import load_course_sources
+from utils.course_pack import open_catalog
+from utils.course_reload import COURSE_HOT_RELOAD, CatalogStore
 
 class CourseManager:
     """Manages course content and structure"""
     
-    def __init__(self):
-        self.initialize_courses()
+    def course_sources(self) -> Dict[str, Dict]:
+        """Course definitions from the data/courses providers, keyed by course id"""
+        return load_course_sources()
     
-    def initialize_courses(self):
-        """Initialize course data structure"""
-        if 'courses' not in st.session_state:
-            st.session_state.courses = {
-                'python': {
-                    'title': 'Python Programming Course',
-                    'description': 'Comprehensive Python programming course from basics to advanced topics',
-                    'difficulty': 'Beginner to Advanced',
-                    'estimated_hours': 40,
-                    'modules': self._get_python_modules()
-                },
-                'perl': {
-                    'title': 'PERL Programming Course',
-                    'description': 'Complete PERL programming course covering essential concepts and practical applications',
-                    'difficulty': 'Beginner to Intermediate',
-                    'estimated_hours': 30,
-                    'modules': self._get_perl_modules()
-                }
-            }
+    @property
+    def catalog(self) -> CourseCatalog:
+        """The process-wide catalog; sessions only ever hold references into it"""
+        return get_catalog()
     
-    def _get_python_modules(self) -> List[Dict]:
-        """Get Python course modules"""
-        return [
-            {
-                'id': 'python_basics',
-                'title': 'Python Basics',
-                'lessons': [
-                    {
-                        'id': 'introduction',
-                        'title': 'Introduction to Python',
-                        'content': '''
-# Introduction to Python
-
-Python is a high-level, interpreted programming language known for its simplicity and readability.
-
-## Why Python?
-- Easy to learn and use
-- Versatile (web development, data science, AI, automation)
-- Large community and extensive libraries
-- Cross-platform compatibility
-
-## Python Philosophy
-"Beautiful is better than ugly. Explicit is better than implicit. Simple is better than complex."
-
-## Your First Python Program
-```python
-print("Hello, World!")
-```
-
-This simple program demonstrates Python's clean syntax. The `print()` function outputs text to the console.
-                        ''',
-                        'exercises': [
-                            {
-                                'title': 'Hello World Exercise',
-                                'description': 'Write a Python program that prints "Hello, World!" to the console.',
-                                'starter_code': '# Write your code here\n',
-                                'solution': 'print("Hello, World!")'
-                            }
-                        ]
-                    }
-                ]
-            }
-        ]
+    def get_course(self, course_id: str) -> Optional[Course]:
+        """Get course by ID"""
+        return self.catalog.get(course_id)
     
-    def _get_perl_modules(self) -> List[Dict]:
-        """Get PERL course modules"""
-        return [
-            {
-                'id': 'perl_basics',
-                'title': 'PERL Basics', 
-                'lessons': [
-                    {
-                        'id': 'introduction',
-                        'title': 'Introduction to PERL',
-                        'content': '''
-# Introduction to PERL
-
-PERL (Practical Extraction and Reporting Language) is a powerful scripting language excellent for text processing.
-
-## Key Features
-- Powerful regular expressions
-- Flexible syntax
-- Rich library (CPAN)
-- Cross-platform support
-
-## Your First PERL Program
-```perl
-#!/usr/bin/perl
-print "Hello, World!\\n";
-```
-                        ''',
-                        'exercises': [
-                            {
-                                'title': 'Hello World Exercise',
-                                'description': 'Write a PERL program that prints "Hello, World!" to the console.',
-                                'starter_code': '#!/usr/bin/perl\n# Write your code here\n',
-                                'solution': '#!/usr/bin/perl\nprint "Hello, World!\\n";'
-                            }
-                        ]
-                    }
-                ]
-            }
-        ]
+    def lesson_version(self, course_id: str, module_id: str, lesson_id: str) -> int:
+        """Bumped each time hot reload changes the lesson"""
+        return get_catalog_store().lesson_version(course_id, module_id, lesson_id)
+
+@st.cache_resource(show_spinner=False)
+def get_catalog_store() -> CatalogStore:
+    """Load the catalog once per server process, from the pack when current, and watch for edits"""
+    from utils.course_search import invalidate_search_entries
+    from utils.lesson_render import invalidate_lessons
     
-    def get_course(self, course_id: str) -> Dict:
-        """Get course by ID"""
-        courses = st.session_state.get('courses', {})
-        return courses.get(course_id, {})
+    store = CatalogStore(open_catalog())
+    store.add_listener(invalidate_lessons)
+    store.add_listener(invalidate_search_entries)
+    if COURSE_HOT_RELOAD:
+        store.start_watching()
+    return store
+
+def get_catalog() -> CourseCatalog:
+    """The current immutable catalog; a hot reload swaps in a new one"""
+    return get_catalog_store().catalog
 
 # Initialize course manager
 course_manager = CourseManager()
@@ -0,0 +1,94 @@
+"""
+Catalog loader for the course providers in data/courses
+
+Every module in data/courses that defines ``get_<course_id>_course_content()``
+contributes one course, so adding a course means dropping in a new provider
+module. A provider returns the usual course dict; a lesson's ``content`` (or
+``exercises``) may also be a zero-argument callable, which the catalog only
+calls the first time that lesson is opened.
+"""
+import hashlib
+import importlib
+import importlib.util
+import os
+import pkgutil
+import re
+from typing import Callable, Dict
+from utils.course_catalog import CourseCatalog, build_catalog
+
+COURSE_PROVIDER_PACKAGE = os.environ.get('COURSE_PROVIDER_PACKAGE', 'data.courses')
+
+PROVIDER_PATTERN = re.compile(r'^get_(\w+)_course_content$')
+
+def providers_in_module(module) -> Dict[str, Callable[[], Dict]]:
+    """Map course id to provider function for one provider module"""
+    providers = {}
+    for name in dir(module):
+        match = PROVIDER_PATTERN.match(name)
+        if match and callable(getattr(module, name)):
+            providers[match.group(1)] = getattr(module, name)
+    return providers
+
+def _provider_modules(package: str):
+    """(module name, module) for every provider module in package that imports"""
+    try:
+        package_module = importlib.import_module(package)
+    except ImportError:
+        return
+
+    for module_info in sorted(pkgutil.iter_modules(package_module.__path__), key=lambda m: m.name):
+        try:
+            module = importlib.import_module(f"{package}.{module_info.name}")
+        except Exception as e:
+            continue  # Skip a broken provider rather than losing every course
+        yield module_info.name, module
+
+def discover_course_providers(package: str = COURSE_PROVIDER_PACKAGE) -> Dict[str, Callable[[], Dict]]:
+    """Map course id to provider function for every provider module in package"""
+    providers = {}
+    for _, module in _provider_modules(package):
+        providers.update(providers_in_module(module))
+    return providers
+
+def course_origins(package: str = COURSE_PROVIDER_PACKAGE) -> Dict[str, str]:
+    """Map course id to the name of the provider module it comes from"""
+    origins = {}
+    for name, module in _provider_modules(package):
+        origins.update(dict.fromkeys(providers_in_module(module), name))
+    return origins
+
+def load_course_sources(package: str = COURSE_PROVIDER_PACKAGE) -> Dict[str, Dict]:
+    """Course definition dicts from every provider, keyed by course id"""
+    sources = {}
+    for course_id, provider in discover_course_providers(package).items():
+        try:
+            sources[course_id] = provider()
+        except Exception as e:
+            continue  # Skip a broken provider rather than losing every course
+    return sources
+
+def load_catalog(package: str = COURSE_PROVIDER_PACKAGE) -> CourseCatalog:
+    """Build the catalog index from the providers; lesson bodies stay unloaded"""
+    return build_catalog(load_course_sources(package))
+
+def provider_files(package: str = COURSE_PROVIDER_PACKAGE) -> Dict[str, str]:
+    """Map provider module name to source path, found without importing the modules"""
+    try:
+        spec = importlib.util.find_spec(package)
+    except ImportError:
+        spec = None
+
+    files = {}
+    for directory in (spec.submodule_search_locations or []) if spec else []:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py') and not name.startswith('_'):
+                files.setdefault(name[:-3], os.path.join(directory, name))
+    return files
+
+def provider_fingerprint(package: str = COURSE_PROVIDER_PACKAGE) -> str:
+    """Digest of the provider source files, computed without importing them"""
+    digest = hashlib.sha256()
+    for path in sorted(provider_files(package).values()):
+        with open(path, 'rb') as f:
+            digest.update(os.path.basename(path).encode() + b'\0' + f.read() + b'\0')
+    return digest.hexdigest()
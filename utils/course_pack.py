@@ -0,0 +1,230 @@
+"""
+Compiled course pack: the whole catalog in one memory-mapped file
+
+Layout (little-endian):
+
+    header    magic b'CPAK', version, body count, index offset, index length
+    offsets   one (offset, stored length, raw length, codec) entry per lesson body
+    index     JSON metadata tree: courses with their provider module, modules, and
+              lesson titles with body slots and content digests
+    bodies    per-lesson JSON {content, exercises}, raw or zlib-compressed
+
+The reader maps the file read-only, so only the lessons someone opens are paged
+in and every worker process shares the same page-cache pages. The pack records
+a fingerprint of the provider sources it was built from; a stale pack is
+ignored in favour of the providers until it is rebuilt with
+
+    python -m utils.course_pack build
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from types import MappingProxyType
+from typing import Dict, List, Optional
+from utils.course_catalog import (
+    Course, CourseCatalog, Exercise, LazyBody, Lesson, LessonBody, Module, build_catalog, lesson_digest
+)
+from utils.course_loader import course_origins, load_course_sources, provider_fingerprint
+
+COURSE_PACK_PATH = os.environ.get('COURSE_PACK_PATH', './data/course_pack.bin')
+
+PACK_MAGIC = b'CPAK'
+PACK_VERSION = 1
+HEADER = struct.Struct('<4sHHIQQ')  # magic, version, reserved, body count, index offset, index length
+ENTRY = struct.Struct('<QIIB3x')  # body offset, stored length, raw length, codec
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+# Compress a body only when it saves at least this fraction; raw bodies decode without inflating
+COMPRESS_MIN_SAVING = 0.1
+NO_SOURCES_FINGERPRINT = hashlib.sha256().hexdigest()
+
+def _encode_body(body: LessonBody, compress: bool):
+    raw = json.dumps({
+        'content': body.content,
+        'exercises': [
+            {'title': e.title, 'description': e.description,
+             'starter_code': e.starter_code, 'solution': e.solution}
+            for e in body.exercises
+        ]
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    if compress:
+        packed = zlib.compress(raw, 9)
+        if len(packed) <= len(raw) * (1 - COMPRESS_MIN_SAVING):
+            return packed, len(raw), CODEC_ZLIB
+    return raw, len(raw), CODEC_RAW
+
+def build_pack(path: str = COURSE_PACK_PATH, sources: Optional[Dict[str, Dict]] = None,
+               fingerprint: Optional[str] = None, compress: bool = True) -> Dict:
+    """Compile the provider courses into a pack file, replacing it atomically
+
+    Packs built from explicit sources record the given fingerprint, if any; a
+    pack without one is always treated as current.
+    """
+    origins = {}
+    if sources is None:
+        fingerprint = fingerprint or provider_fingerprint()
+        sources = load_course_sources()
+        origins = course_origins()
+    catalog = build_catalog(sources)
+
+    bodies: List[LessonBody] = []
+    index = {'source_fingerprint': fingerprint, 'courses': []}
+    for course in catalog:
+        modules = []
+        for module in course.modules:
+            lessons = []
+            for lesson in module.lessons:
+                body = lesson.body.get()
+                lessons.append({'id': lesson.id, 'title': lesson.title, 'slot': len(bodies),
+                                'digest': lesson_digest(lesson.title, body)})
+                bodies.append(body)
+            modules.append({'id': module.id, 'title': module.title,
+                            'description': module.description, 'lessons': lessons})
+        index['courses'].append({
+            'id': course.id, 'title': course.title, 'description': course.description,
+            'difficulty': course.difficulty, 'estimated_hours': course.estimated_hours,
+            'provider': origins.get(course.id), 'modules': modules
+        })
+
+    index_bytes = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    index_offset = HEADER.size + ENTRY.size * len(bodies)
+    offset = index_offset + len(index_bytes)
+
+    encoded = [_encode_body(body, compress) for body in bodies]
+    entries = []
+    for stored, raw_length, codec in encoded:
+        entries.append(ENTRY.pack(offset, len(stored), raw_length, codec))
+        offset += len(stored)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.course_pack_', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(bodies), index_offset, len(index_bytes)))
+            f.writelines(entries)
+            f.write(index_bytes)
+            f.writelines(stored for stored, _, _ in encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers that already mapped the old file keep their inode
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return {
+        'path': path,
+        'courses': len(index['courses']),
+        'lessons': len(bodies),
+        'compressed': sum(1 for _, _, codec in encoded if codec == CODEC_ZLIB),
+        'bytes': offset
+    }
+
+class CoursePack:
+    """Read-only, memory-mapped view of a compiled course pack"""
+
+    def __init__(self, path: str = COURSE_PACK_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, _, self.body_count, index_offset, index_length = HEADER.unpack_from(self._mmap, 0)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise ValueError(f"{path} is not a version {PACK_VERSION} course pack")
+            self.index = json.loads(self._mmap[index_offset:index_offset + index_length])
+        except Exception:
+            self._mmap.close()
+            raise
+
+    @property
+    def source_fingerprint(self) -> Optional[str]:
+        return self.index.get('source_fingerprint')
+
+    def body(self, slot: int) -> LessonBody:
+        """Decode one lesson body; only its pages are touched"""
+        if not 0 <= slot < self.body_count:
+            raise IndexError(slot)
+        offset, length, _, codec = ENTRY.unpack_from(self._mmap, HEADER.size + ENTRY.size * slot)
+        data = self._mmap[offset:offset + length]
+        if codec == CODEC_ZLIB:
+            data = zlib.decompress(data)
+
+        decoded = json.loads(data)
+        return LessonBody(
+            content=decoded['content'],
+            exercises=tuple(Exercise(**e) for e in decoded['exercises'])
+        )
+
+    def _lesson(self, data: Dict) -> Lesson:
+        slot = data['slot']
+        return Lesson(id=data['id'], title=data['title'], body=LazyBody(lambda: self.body(slot)),
+                      digest=data.get('digest'))
+
+    def to_catalog(self) -> CourseCatalog:
+        """Catalog whose lesson bodies are read from the mapping on first access"""
+        courses = {}
+        for course in self.index['courses']:
+            courses[course['id']] = Course(
+                id=course['id'],
+                title=course['title'],
+                description=course['description'],
+                difficulty=course['difficulty'],
+                estimated_hours=course['estimated_hours'],
+                modules=tuple(
+                    Module(
+                        id=module['id'],
+                        title=module['title'],
+                        description=module['description'],
+                        lessons=tuple(self._lesson(lesson) for lesson in module['lessons'])
+                    )
+                    for module in course['modules']
+                ),
+                provider=course.get('provider')
+            )
+        return CourseCatalog(MappingProxyType(courses))
+
+    def close(self):
+        self._mmap.close()
+
+def open_catalog(path: str = COURSE_PACK_PATH) -> CourseCatalog:
+    """Catalog from the compiled pack when it is current, otherwise from the providers"""
+    if os.path.exists(path):
+        try:
+            pack = CoursePack(path)
+            fingerprint = provider_fingerprint()
+            # A deployment may ship only the pack, without provider sources
+            if pack.source_fingerprint in (fingerprint, None) or fingerprint == NO_SOURCES_FINGERPRINT:
+                return pack.to_catalog()
+            pack.close()
+        except Exception as e:
+            pass  # Continue to fallback
+    return build_catalog(load_course_sources())
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    target = sys.argv[2] if len(sys.argv) > 2 else COURSE_PACK_PATH
+
+    if command == "build":
+        print(json.dumps(build_pack(target), indent=2))
+    elif command == "info":
+        pack = CoursePack(target)
+        print(json.dumps({
+            'path': target,
+            'lessons': pack.body_count,
+            'bytes': os.path.getsize(target),
+            'source_fingerprint': pack.source_fingerprint,
+            'current': pack.source_fingerprint == provider_fingerprint(),
+            'courses': [c['id'] for c in pack.index['courses']]
+        }, indent=2))
+    else:
+        print("Usage: python -m utils.course_pack build [path] | info [path]")
+        sys.exit(1)
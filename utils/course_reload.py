@@ -0,0 +1,268 @@
+"""
+Hot reload of course content
+
+A CatalogStore owns the live catalog. A daemon thread polls the provider files
+in data/courses; when one changes, its module is re-imported and only the
+courses it provides are rebuilt. Lessons whose title, content and exercises
+are unchanged keep their existing Lesson objects (and loaded bodies), while
+changed lessons get a new object and a bumped per-lesson version. Changes are
+found by comparing content digests: pack lessons carry the one recorded when
+the pack was built, and other bodies are hashed through ``LazyBody.peek`` so
+a reload never leaves old bodies loaded. Courses a reload does not touch keep
+their objects and navigation indexes. The pack also records which provider
+file each course came from, so deleting a file removes its courses even when
+the providers were never imported.
+
+The rebuilt catalog is swapped in as one new snapshot (copy-on-write), so
+readers never take a lock and sessions holding the old snapshot keep working.
+Listeners are told which lessons changed so they can drop dependent cache
+entries, such as rendered HTML.
+"""
+import hashlib
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+from utils.course_catalog import Course, CourseCatalog, Lesson, Module, build_course, lesson_digest
+from utils.course_loader import COURSE_PROVIDER_PACKAGE, provider_files, providers_in_module
+
+COURSE_HOT_RELOAD = os.environ.get('COURSE_HOT_RELOAD', '1') == '1'
+COURSE_RELOAD_INTERVAL_SECONDS = float(os.environ.get('COURSE_RELOAD_INTERVAL_SECONDS', '2'))
+
+LessonKey = Tuple[str, str, str]  # (course_id, module_id, lesson_id)
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    """A catalog and its lesson versions, swapped in together"""
+    version: int
+    catalog: CourseCatalog
+    lesson_versions: Mapping[LessonKey, int]
+
+def _file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class CatalogStore:
+    """Live catalog that rebuilds only what changed when provider files are edited"""
+
+    def __init__(self, catalog: CourseCatalog, package: str = COURSE_PROVIDER_PACKAGE):
+        self.package = package
+        self._snapshot = CatalogSnapshot(version=1, catalog=catalog, lesson_versions=MappingProxyType({}))
+        self._write_lock = threading.Lock()
+        self._listeners: List[Callable[[Set[LessonKey]], None]] = []
+        self._files = self._scan({})
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_reload: Optional[Dict] = None
+
+        # Pack courses name their provider file; providers already imported can be asked directly
+        self._file_courses: Dict[str, Set[str]] = {}
+        for course in catalog:
+            if course.provider:
+                self._file_courses.setdefault(course.provider, set()).add(course.id)
+        for name in self._files:
+            module = sys.modules.get(f"{package}.{name}")
+            if module is not None:
+                self._file_courses[name] = set(providers_in_module(module))
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    @property
+    def catalog(self) -> CourseCatalog:
+        return self._snapshot.catalog
+
+    def lesson_version(self, course_id: str, module_id: str, lesson_id: str) -> int:
+        """Starts at 1 and goes up each time a reload changes the lesson"""
+        return self._snapshot.lesson_versions.get((course_id, module_id, lesson_id), 1)
+
+    def add_listener(self, listener: Callable[[Set[LessonKey]], None]):
+        """Call listener with the changed and removed lesson keys after each reload"""
+        self._listeners.append(listener)
+
+    def _scan(self, previous: Dict[str, Tuple]) -> Dict[str, Tuple]:
+        # (mtime_ns, size, sha256); the file is only re-hashed when its stat changes
+        state = {}
+        for name, path in provider_files(self.package).items():
+            try:
+                stat = os.stat(path)
+                known = previous.get(name)
+                if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                    state[name] = known
+                else:
+                    state[name] = (stat.st_mtime_ns, stat.st_size, _file_hash(path))
+            except OSError:
+                continue  # Deleted between listing and stat
+        return state
+
+    def check_for_changes(self) -> Optional[Dict]:
+        """Reload provider files whose content changed since the last check"""
+        previous = self._files
+        current = self._scan(previous)
+        changed = {name for name, state in current.items()
+                   if name not in previous or previous[name][2] != state[2]}
+        removed = set(previous) - set(current)
+        self._files = current
+
+        if not changed and not removed:
+            return None
+        return self.reload_files(changed, removed)
+
+    @staticmethod
+    def _digest(lesson: Lesson) -> str:
+        if lesson.digest is not None:
+            return lesson.digest
+        return lesson_digest(lesson.title, lesson.body.peek())
+
+    def _merge_course(self, old: Optional[Course], new: Course, changed: Set[LessonKey]) -> Course:
+        """New course structure, reusing the old Lesson objects that did not change"""
+        course_changed = False
+        modules = []
+        for module in new.modules:
+            lessons = []
+            for lesson in module.lessons:
+                key = (new.id, module.id, lesson.id)
+                previous = old.navigation.lesson(module.id, lesson.id) if old else None
+                digest = self._digest(lesson)
+                if previous is not None and self._digest(previous) == digest:
+                    lessons.append(previous)
+                else:
+                    changed.add(key)
+                    course_changed = True
+                    lessons.append(replace(lesson, digest=digest))
+            modules.append(Module(id=module.id, title=module.title, description=module.description,
+                                  lessons=tuple(lessons)))
+
+        merged = Course(id=new.id, title=new.title, description=new.description, difficulty=new.difficulty,
+                        estimated_hours=new.estimated_hours, modules=tuple(modules), provider=new.provider)
+        # Untouched courses keep their object, and with it their navigation index
+        if old is not None and not course_changed and merged == old:
+            return old
+        return merged
+
+    def reload_files(self, changed: Set[str], removed: Set[str] = frozenset()) -> Dict:
+        """Rebuild the courses provided by the given files and swap in a new snapshot"""
+        started = time.perf_counter()
+        changed_lessons: Set[LessonKey] = set()
+        errors = {}
+
+        # New provider files are invisible to the import system until its caches are reset
+        importlib.invalidate_caches()
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            courses = dict(snapshot.catalog.courses)
+            touched = set()
+
+            for name in removed:
+                for course_id in self._file_courses.pop(name, set()):
+                    courses.pop(course_id, None)
+                    touched.add(course_id)
+
+            for name in sorted(changed):
+                module_name = f"{self.package}.{name}"
+                try:
+                    self._drop_bytecode(module_name)
+                    # Import a fresh module; reload() would keep functions deleted from the file
+                    previous_module = sys.modules.pop(module_name, None)
+                    try:
+                        module = importlib.import_module(module_name)
+                    except Exception:
+                        if previous_module is not None:
+                            sys.modules[module_name] = previous_module
+                        raise
+                    providers = providers_in_module(module)
+                except Exception as e:
+                    # A half-saved file keeps serving the previous content
+                    errors[name] = str(e)
+                    continue
+
+                for course_id in self._file_courses.get(name, set()) - set(providers):
+                    courses.pop(course_id, None)
+                    touched.add(course_id)
+
+                for course_id, provider in providers.items():
+                    try:
+                        new_course = build_course(course_id, provider(), provider=name)
+                        courses[course_id] = self._merge_course(courses.get(course_id), new_course, changed_lessons)
+                        touched.add(course_id)
+                    except Exception as e:
+                        errors[f"{name}:{course_id}"] = str(e)
+                self._file_courses[name] = set(providers)
+
+            # Lessons that disappeared from a rebuilt course
+            removed_lessons = set()
+            for course_id in touched:
+                old_course = snapshot.catalog.get(course_id)
+                new_course = courses.get(course_id)
+                for module_id, lesson_id in (old_course.navigation.positions if old_course else {}):
+                    if new_course is None or new_course.navigation.position(module_id, lesson_id) is None:
+                        removed_lessons.add((course_id, module_id, lesson_id))
+            versions = dict(snapshot.lesson_versions)
+            for key in changed_lessons:
+                versions[key] = versions.get(key, 1) + 1 if self._was_present(snapshot, key) else 1
+            for key in removed_lessons:
+                versions.pop(key, None)
+
+            if changed_lessons or removed_lessons or touched:
+                # One reference assignment; readers see either the old snapshot or the new one
+                self._snapshot = CatalogSnapshot(
+                    version=snapshot.version + 1,
+                    catalog=CourseCatalog(MappingProxyType(courses)),
+                    lesson_versions=MappingProxyType(versions)
+                )
+
+        invalidated = changed_lessons | removed_lessons
+        for listener in self._listeners:
+            try:
+                listener(invalidated)
+            except Exception as e:
+                errors[getattr(listener, '__name__', 'listener')] = str(e)
+
+        self.last_reload = {
+            'version': self._snapshot.version,
+            'files': sorted(changed | set(removed)),
+            'changed_lessons': len(changed_lessons),
+            'removed_lessons': len(removed_lessons),
+            'errors': errors,
+            'elapsed_ms': (time.perf_counter() - started) * 1000
+        }
+        return self.last_reload
+
+    @staticmethod
+    def _drop_bytecode(module_name: str):
+        # .pyc validation uses whole-second mtimes and size, so a quick same-size edit would reload stale code
+        try:
+            spec = importlib.util.find_spec(module_name)
+            if spec and spec.origin and spec.origin.endswith('.py'):
+                os.remove(importlib.util.cache_from_source(spec.origin))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    @staticmethod
+    def _was_present(snapshot: CatalogSnapshot, key: LessonKey) -> bool:
+        course = snapshot.catalog.get(key[0])
+        return course is not None and course.navigation.position(key[1], key[2]) is not None
+
+    def _watch(self):
+        while not self._stop.wait(COURSE_RELOAD_INTERVAL_SECONDS):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                pass  # Keep watching; the next poll retries
+
+    def start_watching(self):
+        """Poll the provider files from a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="course-reload", daemon=True)
+            self._thread.start()
+
+    def stop_watching(self):
+        self._stop.set()
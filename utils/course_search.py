@@ -0,0 +1,160 @@
+"""
+Search index over the course catalog
+
+The search page used to lowercase every lesson body on every query, loading
+(and keeping) every lazily stored body on the way. The index keeps no body
+text: each lesson holds its lowercased title, a short preview and the set of
+words in its title, content and exercises, interned so lessons share them. A
+query's words are looked up in the vocabulary of the whole catalog, lessons
+that lack any of them are skipped, and only the remaining candidates have
+their bodies scanned, read through ``LazyBody.peek`` so nothing stays
+loaded. Memory grows with the catalog's vocabulary, not with its text.
+
+The index is brought up to date on the first search after each catalog swap:
+lessons a hot reload left alone are the same Lesson objects and keep their
+entries, and the CatalogStore listener drops the entries of changed or
+removed lessons.
+"""
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from utils.course_catalog import CourseCatalog, Exercise, Lesson
+
+SEARCH_PREVIEW_LENGTH = int(os.environ.get('SEARCH_PREVIEW_LENGTH', '200'))
+
+# A substring of some text has each of its word runs inside one of the text's word runs
+WORD_PATTERN = re.compile(r"\w+")
+
+LessonKey = Tuple[str, str, str]  # (course_id, module_id, lesson_id)
+
+def _words(text: str) -> FrozenSet[str]:
+    return frozenset(sys.intern(word) for word in WORD_PATTERN.findall(text.lower()))
+
+@dataclass(frozen=True, slots=True)
+class SearchHit:
+    """What a query matched in one lesson"""
+    lesson: bool
+    exercises: Tuple[Exercise, ...] = ()
+
+@dataclass(frozen=True, slots=True)
+class IndexedLesson:
+    """Searchable summary of one lesson"""
+    lesson: Lesson
+    title_lower: str
+    preview: str
+    words: FrozenSet[str]
+
+    def search(self, query_lower: str, terms: Optional[List[FrozenSet[str]]] = None) -> Optional[SearchHit]:
+        """Match against the title, content and exercises; terms from query_terms skip lessons early"""
+        if terms and any(self.words.isdisjoint(term) for term in terms):
+            return None
+
+        body = self.lesson.body.peek()
+        matched = query_lower in self.title_lower or query_lower in body.content.lower()
+        exercises = tuple(
+            e for e in body.exercises
+            if query_lower in e.title.lower() or query_lower in e.description.lower()
+        )
+        if not matched and not exercises:
+            return None
+        return SearchHit(matched, exercises)
+
+def index_lesson(lesson: Lesson) -> IndexedLesson:
+    """Index one lesson; a body nothing has opened yet is read without being kept"""
+    body = lesson.body.peek()
+    words = _words(lesson.title) | _words(body.content)
+    for exercise in body.exercises:
+        words |= _words(exercise.title) | _words(exercise.description)
+    return IndexedLesson(
+        lesson=lesson,
+        title_lower=lesson.title.lower(),
+        preview=body.content[:SEARCH_PREVIEW_LENGTH],
+        words=words
+    )
+
+class CourseSearchIndex:
+    """Thread-safe lesson index kept in step with the live catalog"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog: Optional[CourseCatalog] = None
+        self._entries: Dict[LessonKey, IndexedLesson] = {}
+        self._vocabulary: FrozenSet[str] = frozenset()
+        self.updates = 0
+        self.lessons_indexed = 0
+
+    def entries(self, catalog: CourseCatalog) -> Dict[LessonKey, IndexedLesson]:
+        """Entries for every lesson in catalog, indexing the ones not seen before"""
+        return self._snapshot(catalog)[0]
+
+    def query_terms(self, catalog: CourseCatalog, query_lower: str) -> Optional[List[FrozenSet[str]]]:
+        """For each word of the query, the catalog words containing it; None when the query has no words"""
+        query_words = WORD_PATTERN.findall(query_lower)
+        if not query_words:
+            return None
+        vocabulary = self._snapshot(catalog)[1]
+        return [frozenset(word for word in vocabulary if query_word in word) for query_word in query_words]
+
+    def _snapshot(self, catalog: CourseCatalog) -> Tuple[Dict[LessonKey, IndexedLesson], FrozenSet[str]]:
+        with self._lock:
+            if catalog is self._catalog:
+                return self._entries, self._vocabulary
+            previous = self._entries
+
+        # Index outside the lock; a concurrent update for the same catalog just does the work twice
+        entries = {}
+        indexed = 0
+        for course in catalog:
+            for module in course.modules:
+                for lesson in module.lessons:
+                    key = (course.id, module.id, lesson.id)
+                    entry = previous.get(key)
+                    if entry is None or entry.lesson is not lesson:
+                        entry = index_lesson(lesson)
+                        indexed += 1
+                    entries[key] = entry
+        vocabulary = frozenset().union(*(entry.words for entry in entries.values()))
+
+        with self._lock:
+            self._catalog = catalog
+            self._entries = entries
+            self._vocabulary = vocabulary
+            self.updates += 1
+            self.lessons_indexed += indexed
+        return entries, vocabulary
+
+    def invalidate(self, keys: Iterable[LessonKey]):
+        """Drop entries for (course_id, module_id, lesson_id) keys"""
+        targets = set(keys)
+        if not targets:
+            return
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._entries.items() if key not in targets}
+            self._catalog = None
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._vocabulary = frozenset()
+            self._catalog = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Global search index shared by every session
+course_search_index = CourseSearchIndex()
+
+def get_search_entries(catalog: CourseCatalog) -> Dict[LessonKey, IndexedLesson]:
+    """Search entries for the given catalog snapshot"""
+    return course_search_index.entries(catalog)
+
+def get_query_terms(catalog: CourseCatalog, query_lower: str) -> Optional[List[FrozenSet[str]]]:
+    """Candidate filter for IndexedLesson.search"""
+    return course_search_index.query_terms(catalog, query_lower)
+
+def invalidate_search_entries(keys: Iterable[LessonKey]):
+    """Drop search entries for changed lessons, e.g. after a hot reload"""
+    course_search_index.invalidate(keys)
@@ -0,0 +1,150 @@
+"""
+Streaming export of a user's data as NDJSON
+
+Each table is read with keyset pagination (``WHERE (ts, id) > (last_ts, last_id)``
+over the per-user composite indexes), serialized one row per line and emitted
+in fixed-size chunks, optionally gzip-compressed. Only one page of rows and
+one output chunk are held in memory at a time, however long the history is.
+
+That bound holds up to the file write_user_export produces. Streamlit has no
+streaming download path: st.download_button reads whatever its data callable
+returns into one bytes object held by its media file manager. A download
+through the Settings page therefore costs one compressed export in server
+memory per click, until the media file is released. Callers that need more,
+like offline tooling, should consume stream_user_export directly.
+"""
+import json
+import tempfile
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import select, tuple_
+from utils.db_schema import (
+    User, UserProgress, QuizResult, CodeSubmission, ChatSession,
+    UserActivity, ActivityDailyAggregate, LearningRecommendation, UserStats, SessionLocal
+)
+
+EXPORT_PAGE_SIZE = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FORMAT_VERSION = 1
+
+# (record type, model, keyset order column) per exported table; the order
+# column matches the table's (user_id, <column>) index
+EXPORT_TABLES = [
+    ('user_progress', UserProgress, UserProgress.id),
+    ('quiz_result', QuizResult, QuizResult.completed_at),
+    ('code_submission', CodeSubmission, CodeSubmission.submitted_at),
+    ('chat_session', ChatSession, ChatSession.last_activity),
+    ('activity', UserActivity, UserActivity.timestamp),
+    ('activity_daily', ActivityDailyAggregate, ActivityDailyAggregate.activity_date),
+    ('recommendation', LearningRecommendation, LearningRecommendation.id),
+]
+
+# Columns that never leave the server
+EXCLUDED_COLUMNS = {'password_hash'}
+
+def _export_columns(model) -> List:
+    return [column for column in model.__table__.columns if column.key not in EXCLUDED_COLUMNS]
+
+def _row_to_dict(model, row) -> Dict:
+    """Plain column values of a result row, with stored compression undone"""
+    from utils.database import decompress_text
+
+    record = dict(row)
+    if model is CodeSubmission:
+        record['execution_output'] = decompress_text(record['execution_output'])
+        record['execution_error'] = decompress_text(record['execution_error'])
+    return record
+
+def _keyset_pages(db, query, columns, page_size: int) -> Iterator:
+    """Rows of query in columns order, fetched page by page after the last key seen"""
+    last = None
+    while True:
+        page_query = query if last is None else query.where(tuple_(*columns) > last)
+        page = db.execute(page_query.order_by(*columns).limit(page_size)).mappings().all()
+        yield from page
+        if len(page) < page_size:
+            return
+        last = tuple(page[-1][column.key] for column in columns)
+
+def _iter_table(db, model, order_column, user_id: int, page_size: int) -> Iterator:
+    """Rows of one table for a user in index order"""
+    # Core selects keep this free of ORM identity-map and instance overhead
+    base = select(*_export_columns(model)).where(model.user_id == user_id)
+    if order_column is model.id:
+        yield from _keyset_pages(db, base, (model.id,), page_size)
+        return
+
+    # NULLs can't take part in the tuple comparison, so those rows are paged by id first
+    yield from _keyset_pages(db, base.where(order_column.is_(None)), (model.id,), page_size)
+    yield from _keyset_pages(db, base.where(order_column.isnot(None)), (order_column, model.id), page_size)
+
+def _single_row(db, model, key_column, key) -> Optional[Dict]:
+    row = db.execute(select(*_export_columns(model)).where(key_column == key)).mappings().first()
+    return _row_to_dict(model, row) if row is not None else None
+
+def iter_user_export_lines(user_id: int, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[str]:
+    """NDJSON lines covering the user's profile, rollup and every per-user table"""
+    with SessionLocal() as db:
+        user = _single_row(db, User, User.id, user_id)
+        if user is None:
+            raise ValueError(f"Unknown user id {user_id}")
+
+        yield json.dumps({
+            'type': 'export',
+            'format_version': EXPORT_FORMAT_VERSION,
+            'generated_at': datetime.utcnow().isoformat(),
+            'user_id': user_id
+        }) + "\n"
+        yield json.dumps({'type': 'user', 'data': user}, default=str) + "\n"
+
+        stats = _single_row(db, UserStats, UserStats.user_id, user_id)
+        if stats is not None:
+            yield json.dumps({'type': 'user_stats', 'data': stats}, default=str) + "\n"
+
+        for record_type, model, order_column in EXPORT_TABLES:
+            for row in _iter_table(db, model, order_column, user_id, page_size):
+                yield json.dumps({'type': record_type, 'data': _row_to_dict(model, row)}, default=str) + "\n"
+
+def stream_user_export(user_id: int, compress: bool = False, chunk_bytes: int = EXPORT_CHUNK_BYTES,
+                       page_size: int = EXPORT_PAGE_SIZE) -> Iterator[bytes]:
+    """Export as byte chunks of roughly chunk_bytes, gzip-compressed if requested"""
+    # Rows still waiting in the write-behind queues belong in the export too
+    from utils.database import activity_writer, submission_writer
+    activity_writer.flush()
+    submission_writer.flush()
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31 writes a gzip container
+    buffer = []
+    buffered = 0
+
+    for line in iter_user_export_lines(user_id, page_size):
+        data = line.encode('utf-8')
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= chunk_bytes:
+            chunk = b"".join(buffer)
+            buffer, buffered = [], 0
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = b"".join(buffer)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+def write_user_export(user_id: int, compress: bool = True, fileobj: Optional[object] = None):
+    """Stream the export into a file object (a fresh temporary file by default), rewound for reading
+
+    The file is built without holding the export in memory, but st.download_button
+    reads it back fully; see the module docstring.
+    """
+    if fileobj is None:
+        fileobj = tempfile.TemporaryFile()
+    for chunk in stream_user_export(user_id, compress=compress):
+        fileobj.write(chunk)
+    fileobj.seek(0)
+    return fileobj
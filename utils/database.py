@@ -3,18 +3,161 @@ import pandas as pd
 from typing import Dict, List, Optional
 import json
 import hashlib
+import os
+import base64
+import threading
+import zlib
+from collections import deque
 from datetime import datetime, timedelta
+from sqlalchemy import func, case, insert, update
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import InterfaceError, OperationalError
 from utils.db_schema import (
     User, Course, UserProgress, QuizResult, CodeSubmission, 
-    ChatSession, UserActivity, SystemSettings, SessionLocal, create_tables
+    ChatSession, UserActivity, SystemSettings, SessionLocal
 )
+from utils.write_behind import BatchWriter, register_writer
+from utils.user_stats import apply_activity_batch, apply_code_submission_batch, apply_quiz_batch, get_user_stats
+from utils.fallback_store import FallbackStore
+
+# Activity logging is write-behind: rows are flushed together every N rows or T milliseconds
+ACTIVITY_BATCH_SIZE = int(os.environ.get('ACTIVITY_BATCH_SIZE', '100'))
+ACTIVITY_FLUSH_MS = int(os.environ.get('ACTIVITY_FLUSH_MS', '250'))
+
+# Events the database couldn't take, shared by every session and replayed once it recovers
+fallback_store = FallbackStore()
+_replay_lock = threading.Lock()
+
+def _db_row(row: Dict) -> Dict:
+    # Queued rows carry the username for the fallback store; it isn't a column
+    return {key: value for key, value in row.items() if key != 'username'}
+
+def _insert_activities(rows: List[Dict]):
+    """Insert a batch of activity rows in one transaction"""
+    rows = [_db_row(row) for row in rows]
+    with SessionLocal() as db:
+        db.execute(insert(UserActivity), rows)
+        apply_activity_batch(db, rows)
+        db.commit()
+
+def _spill_activities(rows: List[Dict]):
+    """Writer failure callback: keep activities the database refused"""
+    for row in rows:
+        fallback_store.add('activity', row.get('username', 'anonymous'), row['user_id'], {
+            'activity_type': row['activity_type'],
+            'details': row['activity_data']
+        }, created_at=row['timestamp'])
+
+def _schedule_replay(rows: Optional[List[Dict]] = None):
+    """Writer success callback: the database is back, so replay buffered events off the script thread"""
+    if not fallback_store.unreplayed or not _replay_lock.acquire(blocking=False):
+        return
+    
+    def replay():
+        try:
+            _replay_fallback_records()
+        finally:
+            _replay_lock.release()
+    
+    threading.Thread(target=replay, name="fallback-replay", daemon=True).start()
+
+activity_writer = register_writer(BatchWriter(
+    'user_activities', _insert_activities,
+    max_batch=ACTIVITY_BATCH_SIZE, max_delay_ms=ACTIVITY_FLUSH_MS,
+    on_failure=_spill_activities, on_success=_schedule_replay
+))
+
+# Execution output above this many bytes is stored zlib-compressed
+COMPRESS_THRESHOLD = int(os.environ.get('SUBMISSION_COMPRESS_THRESHOLD', '1024'))
+COMPRESSED_PREFIX = 'zlib:'
+
+# Each session only keeps its most recent submissions in memory
+RECENT_SUBMISSIONS_LIMIT = 20
+
+def compress_text(text: Optional[str]) -> Optional[str]:
+    """Compress large text for storage in a Text column"""
+    if not text:
+        return text
+    raw = text.encode('utf-8')
+    if len(raw) < COMPRESS_THRESHOLD:
+        return text
+    return COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw)).decode('ascii')
+
+def decompress_text(stored: Optional[str]) -> Optional[str]:
+    """Inverse of compress_text"""
+    if not stored or not stored.startswith(COMPRESSED_PREFIX):
+        return stored
+    return zlib.decompress(base64.b64decode(stored[len(COMPRESSED_PREFIX):])).decode('utf-8')
+
+def _insert_code_submissions(rows: List[Dict]):
+    """Insert a batch of code submissions in one transaction"""
+    rows = [_db_row(row) for row in rows]
+    with SessionLocal() as db:
+        db.execute(insert(CodeSubmission), rows)
+        apply_code_submission_batch(db, rows)
+        db.commit()
+
+def _spill_code_submissions(rows: List[Dict]):
+    """Writer failure callback: keep submissions the database refused"""
+    for row in rows:
+        fallback_store.add('submission', row.get('username', 'anonymous'), row['user_id'],
+                           {'row': _db_row(row)}, created_at=row['submitted_at'])
+
+submission_writer = register_writer(BatchWriter(
+    'code_submissions', _insert_code_submissions,
+    max_batch=ACTIVITY_BATCH_SIZE, max_delay_ms=ACTIVITY_FLUSH_MS,
+    on_failure=_spill_code_submissions, on_success=_schedule_replay
+))
+
+def _update_last_logins(rows: List[Dict]):
+    """Apply a batch of logins as one executemany UPDATE, latest login per user"""
+    latest = {}
+    for row in rows:
+        if row['user_id'] not in latest or row['last_login'] > latest[row['user_id']]:
+            latest[row['user_id']] = row['last_login']
+    
+    with SessionLocal() as db:
+        db.execute(update(User), [{'id': user_id, 'last_login': last_login} for user_id, last_login in latest.items()])
+        db.commit()
+
+def _spill_last_logins(rows: List[Dict]):
+    """Writer failure callback: keep last_login updates the database refused"""
+    for row in rows:
+        fallback_store.add('login', row.get('username', 'anonymous'), row['user_id'],
+                           {'last_login': row['last_login']}, created_at=row['last_login'])
+
+last_login_writer = register_writer(BatchWriter(
+    'last_login', _update_last_logins,
+    max_batch=ACTIVITY_BATCH_SIZE, max_delay_ms=ACTIVITY_FLUSH_MS,
+    on_failure=_spill_last_logins, on_success=_schedule_replay
+))
+
+def record_login(user_id: int, login_time: datetime, username: str = 'anonymous'):
+    """Queue the last_login update and the login activity for batched writing"""
+    login = {'user_id': user_id, 'last_login': login_time, 'username': username}
+    if not last_login_writer.submit(login):
+        # Buffer full: write this one directly, keeping it if the database refuses
+        try:
+            _update_last_logins([login])
+        except Exception as e:
+            _spill_last_logins([login])
+    
+    activity = {
+        'user_id': user_id,
+        'username': username,
+        'activity_type': 'login',
+        'activity_data': {},
+        'timestamp': login_time
+    }
+    if not activity_writer.submit(activity):
+        _spill_activities([activity])
 
 def initialize_database():
     """Initialize the PostgreSQL database"""
     try:
-        # Create all database tables
-        create_tables()
+        # Tables, admin seed and cache warm-up run once per server process
+        from utils.bootstrap import bootstrap_app
+        bootstrap_app()
         
         # Initialize session state for temporary data
         if 'db_initialized' not in st.session_state:
@@ -23,44 +166,109 @@ def initialize_database():
     except Exception as e:
         st.error(f"Database initialization failed: {str(e)}")
         # Fallback to session-based storage
-        if 'user_activities' not in st.session_state:
-            st.session_state.user_activities = []
-        if 'quiz_results' not in st.session_state:
-            st.session_state.quiz_results = []
+        _get_fallback_store()
         if 'code_submissions' not in st.session_state:
-            st.session_state.code_submissions = []
+            st.session_state.code_submissions = deque(maxlen=RECENT_SUBMISSIONS_LIMIT)
+
+def _get_fallback_store() -> FallbackStore:
+    """The process-wide bounded fallback store"""
+    return fallback_store
+
+def get_fallback_records(kind: str, user: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+    """Fallback records as dicts, oldest first; all users when user is None
+
+    kind is 'activity', 'quiz', 'submission' (code submissions the writer
+    couldn't store) or 'login' (last-login updates). Records leave the store
+    once they are replayed into the database.
+    """
+    return [record.to_dict() for record in _get_fallback_store().records(kind, user, limit)]
+
+def clear_fallback_records(user: str):
+    """Drop a user's fallback records"""
+    _get_fallback_store().clear_user(user)
+
+def _insert_quiz_results(rows: List[Dict]):
+    """Insert quiz results and fold them into the rollup in one transaction"""
+    with SessionLocal() as db:
+        db.execute(insert(QuizResult), rows)
+        apply_quiz_batch(db, rows)
+        db.commit()
+
+def _is_transient_error(error: Exception) -> bool:
+    """Errors that mean the database is unavailable rather than that the rows are bad"""
+    return isinstance(error, (OperationalError, InterfaceError)) or getattr(error, 'connection_invalidated', False)
+
+def _replay_activities(records):
+    _insert_activities([{
+        'user_id': r.user_id,
+        'activity_type': r.payload['activity_type'],
+        'activity_data': r.payload['details'],
+        'timestamp': r.created_at
+    } for r in records])
+
+def _replay_quiz_results(records):
+    rows = []
+    for r in records:
+        total_questions = r.payload['total_questions']
+        correct_answers = r.payload['score']
+        rows.append({
+            'user_id': r.user_id,
+            'quiz_topic': r.payload['quiz_topic'],
+            'language': r.payload['language'],
+            'difficulty': r.payload['difficulty'],
+            'total_questions': total_questions,
+            'correct_answers': correct_answers,
+            'score_percentage': (correct_answers / total_questions * 100) if total_questions else 0.0,
+            'time_taken_seconds': r.payload['time_taken'],
+            'questions_data': {'answers': r.payload['answers']},
+            'completed_at': r.created_at
+        })
+    _insert_quiz_results(rows)
+
+def _replay_code_submissions(records):
+    _insert_code_submissions([r.payload['row'] for r in records])
+
+def _replay_last_logins(records):
+    _update_last_logins([{'user_id': r.user_id, 'last_login': r.payload['last_login']} for r in records])
+
+def _replay_fallback_records():
+    """Write buffered events to the database now that it accepts writes again
+    
+    Runs on the replay thread started by _schedule_replay, never on the script thread.
+    """
+    replayers = {
+        'activity': _replay_activities,
+        'quiz': _replay_quiz_results,
+        'submission': _replay_code_submissions,
+        'login': _replay_last_logins
+    }
+    for kind, replayer in replayers.items():
+        # Stops at the first sign the database is unreachable again; the next successful write retries
+        fallback_store.replay(kind, replayer, is_transient=_is_transient_error)
 
 def log_user_activity(activity_type: str, details: Dict):
     """Log user activity for progress tracking"""
     try:
         if 'user_data' in st.session_state and st.session_state.user_data:
             user_id = st.session_state.user_data.get('id')
-            if user_id:
-                with SessionLocal() as db:
-                    activity = UserActivity(
-                        user_id=user_id,
-                        activity_type=activity_type,
-                        activity_data=details,
-                        timestamp=datetime.utcnow()
-                    )
-                    db.add(activity)
-                    db.commit()
-                    return
+            # Database failures after this point reach the fallback store through the writer
+            if user_id and activity_writer.submit({
+                'user_id': user_id,
+                'username': st.session_state.user_data.get('username', 'anonymous'),
+                'activity_type': activity_type,
+                'activity_data': details,
+                'timestamp': datetime.utcnow()
+            }):
+                return
     except Exception as e:
         pass  # Continue to fallback
     
-    # Fallback to session storage
-    if 'user_activities' not in st.session_state:
-        st.session_state.user_activities = []
-    
-    activity = {
-        'timestamp': datetime.now().isoformat(),
-        'user': st.session_state.get('user_data', {}).get('username', 'anonymous'),
+    # Buffer full or no user: fall back to bounded storage
+    user_data = st.session_state.get('user_data') or {}
+    _get_fallback_store().add('activity', user_data.get('username', 'anonymous'), user_data.get('id'), {
         'activity_type': activity_type,
         'details': details
-    }
-    
-    st.session_state.user_activities.append(activity)
+    })
 
 def save_quiz_result(quiz_data: Dict):
     """Save quiz result to database"""
@@ -68,58 +276,82 @@ def save_quiz_result(quiz_data: Dict):
         if 'user_data' in st.session_state and st.session_state.user_data:
             user_id = st.session_state.user_data.get('id')
             if user_id:
-                with SessionLocal() as db:
-                    quiz_result = QuizResult(
-                        user_id=user_id,
-                        quiz_topic=quiz_data.get('topic', ''),
-                        language=quiz_data.get('language', ''),
-                        difficulty=quiz_data.get('difficulty', 'beginner'),
-                        total_questions=quiz_data.get('total_questions', 0),
-                        correct_answers=quiz_data.get('correct_answers', 0),
-                        score_percentage=quiz_data.get('score', 0),
-                        time_taken_seconds=quiz_data.get('time_taken', 0),
-                        questions_data=quiz_data.get('questions', {}),
-                        completed_at=datetime.utcnow()
-                    )
-                    db.add(quiz_result)
-                    db.commit()
-                    return
+                # The quiz page reports 'score' as the number of correct answers
+                total_questions = quiz_data.get('total_questions', 0)
+                correct_answers = quiz_data.get('correct_answers', quiz_data.get('score', 0))
+                _insert_quiz_results([{
+                    'user_id': user_id,
+                    'quiz_topic': quiz_data.get('topic', ''),
+                    'language': quiz_data.get('language', ''),
+                    'difficulty': quiz_data.get('difficulty', 'beginner'),
+                    'total_questions': total_questions,
+                    'correct_answers': correct_answers,
+                    'score_percentage': (correct_answers / total_questions * 100) if total_questions else 0.0,
+                    'time_taken_seconds': quiz_data.get('time_taken', 0),
+                    'questions_data': quiz_data.get('questions', {}),
+                    'completed_at': datetime.utcnow()
+                }])
+                _schedule_replay()
+                return
     except Exception as e:
         pass  # Continue to fallback
     
-    # Fallback to session storage
-    if 'quiz_results' not in st.session_state:
-        st.session_state.quiz_results = []
-    
-    result = {
-        'timestamp': datetime.now().isoformat(),
-        'user': st.session_state.get('user_data', {}).get('username', 'anonymous'),
+    # Fallback to bounded storage
+    user_data = st.session_state.get('user_data') or {}
+    _get_fallback_store().add('quiz', user_data.get('username', 'anonymous'), user_data.get('id'), {
         'quiz_topic': quiz_data.get('topic', ''),
         'language': quiz_data.get('language', ''),
+        'difficulty': quiz_data.get('difficulty', 'beginner'),
         'score': quiz_data.get('score', 0),
         'total_questions': quiz_data.get('total_questions', 0),
         'time_taken': quiz_data.get('time_taken', 0),
         'answers': quiz_data.get('answers', [])
-    }
-    
-    st.session_state.quiz_results.append(result)
+    })
 
 def save_code_submission(code_data: Dict):
     """Save code submission to database"""
-    if 'code_submissions' not in st.session_state:
-        st.session_state.code_submissions = []
+    result = code_data.get('result') or {}
+    
+    try:
+        if 'user_data' in st.session_state and st.session_state.user_data:
+            user_id = st.session_state.user_data.get('id')
+            if user_id:
+                submission = {
+                    'user_id': user_id,
+                    'username': st.session_state.user_data.get('username', 'anonymous'),
+                    'language': code_data.get('language', ''),
+                    'code_content': code_data.get('code', ''),
+                    'execution_output': compress_text(result.get('output')),
+                    'execution_error': compress_text(result.get('error')),
+                    'execution_time_ms': result.get('execution_time_ms'),
+                    # Empty feedback stays NULL so bulk review picks it up
+                    'ai_feedback': code_data.get('ai_feedback') or None,
+                    'submitted_at': datetime.utcnow()
+                }
+                if not submission_writer.submit(submission):
+                    # Buffer full: write this one directly, keeping it if the database refuses
+                    try:
+                        _insert_code_submissions([submission])
+                    except Exception as e:
+                        _spill_code_submissions([submission])
+    except Exception as e:
+        pass  # The session cache below still records it
+    
+    # Keep only a bounded list of recent submissions in the session
+    recent_submissions = st.session_state.get('code_submissions')
+    if not isinstance(recent_submissions, deque):
+        recent_submissions = deque(recent_submissions or [], maxlen=RECENT_SUBMISSIONS_LIMIT)
+        st.session_state.code_submissions = recent_submissions
     
-    submission = {
+    recent_submissions.append({
         'timestamp': datetime.now().isoformat(),
         'user': st.session_state.get('user_data', {}).get('username', 'anonymous'),
         'language': code_data.get('language', ''),
         'code': code_data.get('code', ''),
         'exercise_id': code_data.get('exercise_id', ''),
-        'result': code_data.get('result', ''),
+        'result': result,
         'ai_feedback': code_data.get('ai_feedback', {})
-    }
-    
-    st.session_state.code_submissions.append(submission)
+    })
 
 def save_course_evaluation(evaluation_data: Dict):
     """Save course evaluation to database"""
@@ -138,21 +370,150 @@ def save_course_evaluation(evaluation_data: Dict):
     
     st.session_state.course_evaluations.append(evaluation)
 
+RECENT_ACTIVITY_LIMIT = 10
+RECENT_RESULTS_LIMIT = 50
+
+def _activity_to_dict(activity: UserActivity, username: str) -> Dict:
+    return {
+        'timestamp': activity.timestamp.isoformat() if activity.timestamp else None,
+        'user': username,
+        'activity_type': activity.activity_type,
+        'details': activity.activity_data or {}
+    }
+
+def _pending_activity_to_dict(row: Dict, username: str) -> Dict:
+    return {
+        'timestamp': row['timestamp'].isoformat(),
+        'user': username,
+        'activity_type': row['activity_type'],
+        'details': row['activity_data'] or {}
+    }
+
+def _quiz_result_to_dict(result: QuizResult, username: str) -> Dict:
+    return {
+        'timestamp': result.completed_at.isoformat() if result.completed_at else None,
+        'user': username,
+        'quiz_topic': result.quiz_topic,
+        'language': result.language,
+        'score': result.correct_answers,
+        'total_questions': result.total_questions,
+        'score_percentage': result.score_percentage,
+        'time_taken': result.time_taken_seconds
+    }
+
+def _code_submission_to_dict(submission: CodeSubmission, username: str) -> Dict:
+    return {
+        'timestamp': submission.submitted_at.isoformat() if submission.submitted_at else None,
+        'user': username,
+        'language': submission.language,
+        'code': submission.code_content,
+        'result': {
+            'output': decompress_text(submission.execution_output),
+            'error': decompress_text(submission.execution_error),
+            'execution_time_ms': submission.execution_time_ms
+        },
+        'ai_feedback': submission.ai_feedback or {}
+    }
+
 def get_user_progress_data() -> Dict:
     """Get comprehensive user progress data"""
-    username = st.session_state.get('user_data', {}).get('username', 'anonymous')
+    user_data = st.session_state.get('user_data') or {}
+    user_id = user_data.get('id')
     
-    # Filter activities for current user
-    user_activities = [
-        activity for activity in st.session_state.get('user_activities', [])
-        if activity.get('user') == username
-    ]
+    if user_id:
+        try:
+            return _get_db_progress_data(user_id, user_data.get('username', 'anonymous'))
+        except Exception as e:
+            pass  # Continue to fallback
     
-    # Filter quiz results for current user
-    user_quiz_results = [
-        result for result in st.session_state.get('quiz_results', [])
-        if result.get('user') == username
-    ]
+    return _get_session_progress_data()
+
+def _aggregate_user_metrics(db: Session, user_id: int) -> Dict:
+    """Headline counters computed from the raw tables, for users without a rollup row"""
+    total_activities, lessons_completed = db.query(
+        func.count(UserActivity.id),
+        func.coalesce(func.sum(case((UserActivity.activity_type == 'lesson_completed', 1), else_=0)), 0)
+    ).filter(UserActivity.user_id == user_id).one()
+    
+    quiz_count, correct_sum, questions_sum = db.query(
+        func.count(QuizResult.id),
+        func.coalesce(func.sum(QuizResult.correct_answers), 0),
+        func.coalesce(func.sum(QuizResult.total_questions), 0)
+    ).filter(QuizResult.user_id == user_id).one()
+    
+    code_submissions_count = db.query(func.count(CodeSubmission.id)).filter(
+        CodeSubmission.user_id == user_id
+    ).scalar()
+    
+    return {
+        'total_activities': total_activities,
+        'lessons_completed': int(lessons_completed),
+        'quiz_count': quiz_count,
+        'code_submissions_count': code_submissions_count,
+        'average_quiz_score': (correct_sum / questions_sum) * 100 if questions_sum else 0,
+        'current_streak': 0
+    }
+
+def get_user_metrics(user_id: int) -> Dict:
+    """Headline counters for one user from the user_stats rollup"""
+    metrics = get_user_stats(user_id)
+    if metrics is None:
+        with SessionLocal() as db:
+            metrics = _aggregate_user_metrics(db, user_id)
+    
+    # Include writes still waiting in the write-behind buffers
+    pending = activity_writer.pending(lambda row: row['user_id'] == user_id)
+    metrics['total_activities'] += len(pending)
+    metrics['lessons_completed'] += sum(1 for row in pending if row['activity_type'] == 'lesson_completed')
+    metrics['code_submissions_count'] += len(submission_writer.pending(lambda row: row['user_id'] == user_id))
+    if pending and not metrics['current_streak']:
+        metrics['current_streak'] = 1
+    
+    return metrics
+
+def _get_db_progress_data(user_id: int, username: str) -> Dict:
+    """Progress for one user: rollup counters plus indexed latest-N queries"""
+    metrics = get_user_metrics(user_id)
+    
+    with SessionLocal() as db:
+        recent_activities = db.query(UserActivity).filter(
+            UserActivity.user_id == user_id
+        ).order_by(UserActivity.timestamp.desc()).limit(RECENT_ACTIVITY_LIMIT).all()
+        
+        quiz_results = db.query(QuizResult).filter(
+            QuizResult.user_id == user_id
+        ).order_by(QuizResult.completed_at.desc()).limit(RECENT_RESULTS_LIMIT).all()
+        
+        code_submissions = db.query(CodeSubmission).filter(
+            CodeSubmission.user_id == user_id
+        ).order_by(CodeSubmission.submitted_at.desc()).limit(RECENT_RESULTS_LIMIT).all()
+        
+        recent = [_activity_to_dict(a, username) for a in reversed(recent_activities)]
+        recent.extend(
+            _pending_activity_to_dict(row, username)
+            for row in activity_writer.pending(lambda row: row['user_id'] == user_id)
+        )
+        
+        # Callers expect chronological order, oldest first
+        return {
+            'total_activities': metrics['total_activities'],
+            'lessons_completed': metrics['lessons_completed'],
+            'quiz_count': metrics['quiz_count'],
+            'code_submissions_count': metrics['code_submissions_count'],
+            'average_quiz_score': metrics['average_quiz_score'],
+            'current_streak': metrics['current_streak'],
+            'recent_activities': recent[-RECENT_ACTIVITY_LIMIT:],
+            'quiz_results': [_quiz_result_to_dict(r, username) for r in reversed(quiz_results)],
+            'code_submissions': [_code_submission_to_dict(c, username) for c in reversed(code_submissions)]
+        }
+
+def _get_session_progress_data() -> Dict:
+    """Progress computed from session-state fallback storage"""
+    username = st.session_state.get('user_data', {}).get('username', 'anonymous')
+    
+    # The per-user index avoids scanning other users' records
+    user_activities = get_fallback_records('activity', username)
+    user_quiz_results = get_fallback_records('quiz', username)
     
     # Filter code submissions for current user
     user_code_submissions = [
@@ -192,8 +553,18 @@ def get_user_progress_data() -> Dict:
 
 def get_learning_analytics() -> Dict:
     """Get learning analytics for instructor dashboard"""
-    all_activities = st.session_state.get('user_activities', [])
-    all_quiz_results = st.session_state.get('quiz_results', [])
+    try:
+        from utils.analytics import analytics_cache
+        return analytics_cache.get()
+    except Exception as e:
+        pass  # Continue to fallback
+    
+    return _get_session_learning_analytics()
+
+def _get_session_learning_analytics() -> Dict:
+    """Analytics computed from session-state fallback storage"""
+    all_activities = get_fallback_records('activity')
+    all_quiz_results = get_fallback_records('quiz')
     all_code_submissions = st.session_state.get('code_submissions', [])
     
     # Create DataFrames for analysis
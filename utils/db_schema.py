@@ -2,14 +2,60 @@
 Database schema for the Learning Management System
 """
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, JSON, ForeignKey
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Text, Date, DateTime, Boolean, Float, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import QueuePool, StaticPool
 from datetime import datetime
 
 # Database configuration - Using SQLite instead of MySQL
 DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///./learning_platform.db')
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+
+# SQLite tuning profile: "production" applies SQLITE_PRAGMAS on every connection, "default" leaves SQLite as-is
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',  # Lets retention hand freed pages back in steps; new files only until a VACUUM
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),  # Readers don't block the writer
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),  # Safe with WAL, no fsync per commit
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', '-65536')),  # Negative values are KiB
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'temp_store': 'MEMORY',
+}
+
+# One pooled connection per script-runner thread, plus headroom for background writers
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', str(min(32, (os.cpu_count() or 1) + 4))))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = SQLITE_PROFILE):
+    """Create the SQLAlchemy engine, applying the SQLite profile when relevant"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+    
+    connect_args = {"check_same_thread": False}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # An in-memory database only exists on a single shared connection
+        return create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    
+    sqlite_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW
+    )
+    
+    if profile == "production":
+        @event.listens_for(sqlite_engine, "connect")
+        def apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+    
+    return sqlite_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,6 +72,8 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime)
     is_active = Column(Boolean, default=True)
+    # Bumped on logout or password change; tokens carrying an older value are rejected
+    session_generation = Column(Integer, default=0, server_default='0', nullable=False)
     
     # Relationships
     progress_records = relationship("UserProgress", back_populates="user")
@@ -83,6 +131,11 @@ class QuizResult(Base):
     questions_data = Column(JSON)  # Store quiz questions and answers
     completed_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_quiz_results_user_id_completed_at", "user_id", "completed_at"),
+        Index("ix_quiz_results_language_score", "language", "score_percentage"),  # Class-wide analytics
+    )
+    
     # Relationships
     user = relationship("User", back_populates="quiz_results")
 
@@ -100,6 +153,10 @@ class CodeSubmission(Base):
     ai_feedback = Column(JSON)  # Store AI analysis feedback
     submitted_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_code_submissions_user_id_submitted_at", "user_id", "submitted_at"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="code_submissions")
 
@@ -115,6 +172,10 @@ class ChatSession(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     last_activity = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_last_activity", "user_id", "last_activity"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="chat_sessions")
 
@@ -127,6 +188,53 @@ class UserActivity(Base):
     activity_type = Column(String(50), nullable=False)  # login, course_access, quiz_complete, etc.
     activity_data = Column(JSON)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_user_activities_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_user_activities_user_id_type_timestamp", "user_id", "activity_type", "timestamp"),
+        Index("ix_user_activities_timestamp", "timestamp"),  # Retention scans by age
+    )
+
+class ActivityDailyAggregate(Base):
+    """Per-user daily activity counts kept after raw events are archived"""
+    __tablename__ = "activity_daily_aggregates"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    activity_date = Column(Date, nullable=False)
+    activity_type = Column(String(50), nullable=False)
+    event_count = Column(Integer, default=0, nullable=False)
+    first_event_at = Column(DateTime)
+    last_event_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ux_activity_daily_aggregates_user_date_type", "user_id", "activity_date", "activity_type", unique=True),
+    )
+
+class LearningRecommendation(Base):
+    """Precomputed AI learning recommendations per user"""
+    __tablename__ = "learning_recommendations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True, nullable=False)
+    progress_fingerprint = Column(String(64), nullable=False)  # Hash of the progress inputs used
+    recommendations = Column(JSON)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class UserStats(Base):
+    """Per-user rollup of progress counters, maintained incrementally on each write"""
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_activities = Column(Integer, default=0, nullable=False)
+    lessons_completed = Column(Integer, default=0, nullable=False)
+    quiz_count = Column(Integer, default=0, nullable=False)
+    quiz_correct_sum = Column(Integer, default=0, nullable=False)
+    quiz_question_sum = Column(Integer, default=0, nullable=False)
+    code_submission_count = Column(Integer, default=0, nullable=False)
+    last_activity_date = Column(Date, index=True)
+    current_streak = Column(Integer, default=0, nullable=False)  # Consecutive active days ending at last_activity_date
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 class SystemSettings(Base):
     """System configuration and settings"""
@@ -141,6 +249,51 @@ class SystemSettings(Base):
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    migrate_columns()
+    migrate_indexes()
+
+def migrate_columns():
+    """Add columns introduced after a database file was first created
+    
+    create_all() never alters existing tables. Only columns that are nullable
+    or have a server default can be added this way, which is how new columns
+    are declared.
+    """
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                clause = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    clause += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        clause += ' NOT NULL'
+                conn.exec_driver_sql(clause)
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+def migrate_indexes():
+    """Create indexes added after a database file was first created
+    
+    create_all() only creates indexes together with new tables, so existing
+    learning_platform.db files need the missing ones added explicitly.
+    """
+    created = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if not inspect(conn).has_index(table.name, index.name):
+                    index.create(bind=conn)
+                    created.append(index.name)
+        
+        # Refresh planner statistics so the new indexes get used
+        if created and engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+    return created
 
 def get_db():
     """Get database session"""
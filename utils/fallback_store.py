@@ -0,0 +1,219 @@
+"""
+Bounded process-wide storage for events the database couldn't take
+
+Each record kind lives in a fixed-capacity ring buffer of ``__slots__``
+records, so the process holds at most ``capacity`` events per kind no matter
+how long the database stays unreachable. A per-user index keeps lookups and
+clears proportional to that user's records. Records that carry a user id are
+replayed into the database once it accepts writes again, in small batches,
+and leave the store as soon as they are written. A batch that fails for a
+reason other than the database being unreachable is retried one record at a
+time, so a single bad record can't hold back the rest; a record that fails
+``FALLBACK_REPLAY_MAX_ATTEMPTS`` replays is quarantined: still listed, never
+replayed again.
+
+The write-behind writers spill into the store from their flush threads, so
+every operation is guarded by a lock; replay writes outside it.
+"""
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+FALLBACK_CAPACITY = int(os.environ.get('FALLBACK_STORE_CAPACITY', '500'))
+FALLBACK_REPLAY_BATCH_SIZE = int(os.environ.get('FALLBACK_REPLAY_BATCH_SIZE', '50'))
+FALLBACK_REPLAY_MAX_ATTEMPTS = int(os.environ.get('FALLBACK_REPLAY_MAX_ATTEMPTS', '3'))
+
+class FallbackRecord:
+    """One buffered event; payload holds the legacy session-dict fields"""
+    __slots__ = ('kind', 'user', 'user_id', 'created_at', 'payload', 'attempts', 'quarantined', 'alive')
+
+    def __init__(self, kind: str, user: str, user_id: Optional[int], payload: Dict,
+                 created_at: Optional[datetime] = None):
+        self.kind = kind
+        self.user = user
+        self.user_id = user_id
+        self.created_at = created_at or datetime.utcnow()
+        self.payload = payload
+        self.attempts = 0
+        self.quarantined = False
+        self.alive = True
+
+    def to_dict(self) -> Dict:
+        record = {'timestamp': self.created_at.isoformat(), 'user': self.user}
+        record.update(self.payload)
+        return record
+
+class RingBuffer:
+    """Fixed-capacity FIFO that overwrites its oldest slot when full"""
+    __slots__ = ('capacity', '_slots', '_start', '_size')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def append(self, item) -> Optional[object]:
+        """Add an item and return the one it displaced, if any"""
+        if self._size < self.capacity:
+            self._slots[(self._start + self._size) % self.capacity] = item
+            self._size += 1
+            return None
+
+        evicted = self._slots[self._start]
+        self._slots[self._start] = item
+        self._start = (self._start + 1) % self.capacity
+        return evicted
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator:
+        for offset in range(self._size):
+            yield self._slots[(self._start + offset) % self.capacity]
+
+class FallbackStore:
+    """Ring buffers per record kind with a per-user index"""
+
+    def __init__(self, capacity: int = FALLBACK_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+        self._by_user = {}  # (kind, user) -> deque of live records, oldest first
+        self._unreplayed = 0
+        self._lock = threading.RLock()
+        self.evicted = 0
+        self.replayed = 0
+        self.quarantined = 0
+
+    def add(self, kind: str, user: str, user_id: Optional[int], payload: Dict,
+            created_at: Optional[datetime] = None) -> FallbackRecord:
+        """Buffer a record, evicting the oldest of its kind when full"""
+        record = FallbackRecord(kind, user, user_id, payload, created_at)
+        with self._lock:
+            buffer = self._buffers.get(kind)
+            if buffer is None:
+                buffer = self._buffers[kind] = RingBuffer(self.capacity)
+
+            evicted = buffer.append(record)
+            if evicted is not None:
+                self.evicted += 1
+                self._forget(evicted)
+                # Superseded by newer events; an unreplayed record is lost here
+                if evicted.alive and self._replayable(evicted):
+                    self._unreplayed -= 1
+                evicted.alive = False
+
+            self._by_user.setdefault((kind, user), deque()).append(record)
+            if user_id:
+                self._unreplayed += 1
+        return record
+
+    @staticmethod
+    def _replayable(record: FallbackRecord) -> bool:
+        return bool(record.user_id) and not record.quarantined
+
+    def _drop(self, record: FallbackRecord):
+        """Take a live record out of the store; the ring slot is reused later"""
+        if not record.alive:
+            return
+        record.alive = False
+        if self._replayable(record):
+            self._unreplayed -= 1
+        index = self._by_user.get((record.kind, record.user))
+        if index is not None:
+            try:
+                index.remove(record)
+            except ValueError:
+                pass
+            if not index:
+                del self._by_user[(record.kind, record.user)]
+
+    def _forget(self, record: FallbackRecord):
+        index = self._by_user.get((record.kind, record.user))
+        # Records reach the ring's head in insertion order, so this is the index's oldest entry
+        if index and index[0] is record:
+            index.popleft()
+            if not index:
+                del self._by_user[(record.kind, record.user)]
+
+    def records(self, kind: str, user: Optional[str] = None, limit: Optional[int] = None) -> List[FallbackRecord]:
+        """Live records of a kind, oldest first, optionally for one user and only the newest limit"""
+        with self._lock:
+            if user is not None:
+                records = list(self._by_user.get((kind, user), ()))
+            else:
+                records = [r for r in self._buffers.get(kind, ()) if r.alive]
+        return records[-limit:] if limit else records
+
+    def count(self, kind: str, user: Optional[str] = None) -> int:
+        with self._lock:
+            if user is not None:
+                return len(self._by_user.get((kind, user), ()))
+            return sum(1 for r in self._buffers.get(kind, ()) if r.alive)
+
+    def clear_user(self, user: str):
+        """Drop every record of a user"""
+        with self._lock:
+            for key in [key for key in self._by_user if key[1] == user]:
+                for record in list(self._by_user[key]):
+                    self._drop(record)
+
+    @property
+    def unreplayed(self) -> int:
+        return self._unreplayed
+
+    def _written(self, records: List[FallbackRecord]):
+        with self._lock:
+            for record in records:
+                # Evicted or cleared meanwhile: already off the unreplayed count
+                if record.alive:
+                    self.replayed += 1
+                self._drop(record)
+
+    def _failed(self, record: FallbackRecord, max_attempts: int):
+        with self._lock:
+            record.attempts += 1
+            if record.attempts >= max_attempts and record.alive and not record.quarantined:
+                self._unreplayed -= 1
+                record.quarantined = True
+                self.quarantined += 1
+
+    def replay(self, kind: str, write: Callable[[List[FallbackRecord]], None],
+               is_transient: Callable[[Exception], bool] = lambda e: False,
+               batch_size: int = FALLBACK_REPLAY_BATCH_SIZE,
+               max_attempts: int = FALLBACK_REPLAY_MAX_ATTEMPTS) -> int:
+        """Hand pending records of a kind to write in batches; returns how many were written
+
+        write raises on failure. An error is_transient calls unreachable-database
+        stops the replay without charging any record; any other error falls
+        back to one record at a time. write runs without the lock held, so
+        callers must not replay the same store concurrently.
+        """
+        with self._lock:
+            pending = [r for r in self._buffers.get(kind, ()) if r.alive and self._replayable(r)]
+
+        written = 0
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                write(batch)
+            except Exception as e:
+                if is_transient(e):
+                    return written
+                # Isolate the records that can't be written from the ones that can
+                for record in batch:
+                    try:
+                        write([record])
+                    except Exception as e:
+                        if is_transient(e):
+                            return written
+                        self._failed(record, max_attempts)
+                        continue
+                    self._written([record])
+                    written += 1
+                continue
+            self._written(batch)
+            written += len(batch)
+        return written
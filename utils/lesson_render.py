@@ -0,0 +1,131 @@
+"""
+Shared cache of rendered lesson HTML
+
+Rendering a lesson's markdown (with code highlighting) is the most expensive
+part of a lesson view, and it used to run on every rerun. The HTML is now
+rendered once per lesson version and kept in a process-wide LRU keyed by the
+qualified lesson id plus a hash of its content, so every session navigating
+to that lesson gets a cache hit, and an edited lesson can never be served
+stale HTML. Fenced code blocks are extracted at the same time for the
+"Try it" runner.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+import markdown
+
+LESSON_RENDER_CACHE_SIZE = int(os.environ.get('LESSON_RENDER_CACHE_SIZE', '2000'))
+# Render every lesson during bootstrap; off by default so lesson bodies stay lazily loaded
+LESSON_RENDER_PREWARM = os.environ.get('LESSON_RENDER_PREWARM', '0') == '1'
+
+MARKDOWN_EXTENSIONS = ['codehilite', 'fenced_code']
+
+FENCED_CODE_PATTERN = re.compile(r'^[ \t]*```[ \t]*([\w+-]*)[^\n]*\n(.*?)^[ \t]*```[ \t]*$', re.MULTILINE | re.DOTALL)
+
+@dataclass(frozen=True, slots=True)
+class CodeBlock:
+    """A fenced code block from a lesson"""
+    language: str
+    code: str
+
+@dataclass(frozen=True, slots=True)
+class RenderedLesson:
+    """Lesson HTML plus the code blocks it contains"""
+    content_hash: str
+    html: str
+    code_blocks: Tuple[CodeBlock, ...] = ()
+
+    def runnable_blocks(self, language: str) -> Tuple[CodeBlock, ...]:
+        """Code blocks in the given language, including unlabelled ones"""
+        return tuple(b for b in self.code_blocks if b.language in (language, ''))
+
+def content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+def extract_code_blocks(content: str) -> Tuple[CodeBlock, ...]:
+    """Fenced code blocks in markdown source, in order"""
+    return tuple(
+        CodeBlock(language=match.group(1).lower(), code=match.group(2).rstrip('\n'))
+        for match in FENCED_CODE_PATTERN.finditer(content)
+    )
+
+def render_lesson(content: str, digest: Optional[str] = None) -> RenderedLesson:
+    """Render markdown to HTML and extract its code blocks, uncached"""
+    return RenderedLesson(
+        content_hash=digest or content_hash(content),
+        html=markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS),
+        code_blocks=extract_code_blocks(content)
+    )
+
+class LessonRenderCache:
+    """Thread-safe LRU of RenderedLesson keyed by (lesson key, content hash)"""
+
+    def __init__(self, maxsize: int = LESSON_RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, lesson_key: str, content: str) -> RenderedLesson:
+        """Rendered lesson for this exact content, rendering it on a miss"""
+        key = (lesson_key, content_hash(content))
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rendered
+            self.misses += 1
+
+        # Render outside the lock; a concurrent miss for the same lesson just renders twice
+        rendered = render_lesson(content, key[1])
+        with self._lock:
+            self._entries[key] = rendered
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def invalidate(self, *lesson_keys: str):
+        """Drop every cached version of the given lessons"""
+        targets = set(lesson_keys)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in targets]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Global render cache shared by every session
+lesson_render_cache = LessonRenderCache()
+
+def lesson_key(course_id: str, module_id: str, lesson_id: str) -> str:
+    """Lesson ids repeat across courses, so cache keys are fully qualified"""
+    return f"{course_id}/{module_id}/{lesson_id}"
+
+def get_rendered_lesson(course_id: str, module_id: str, lesson) -> RenderedLesson:
+    """Cached render of a catalog lesson"""
+    return lesson_render_cache.get(lesson_key(course_id, module_id, lesson.id), lesson.content)
+
+def invalidate_lessons(keys: Iterable[Tuple[str, str, str]]):
+    """Drop rendered HTML for (course_id, module_id, lesson_id) keys, e.g. after a hot reload"""
+    lesson_render_cache.invalidate(*(lesson_key(*key) for key in keys))
+
+def prerender_catalog(catalog: Iterable) -> int:
+    """Render every lesson in the catalog into the cache; returns the lesson count"""
+    count = 0
+    for course in catalog:
+        for module in course.modules:
+            for lesson in module.lessons:
+                get_rendered_lesson(course.id, module.id, lesson)
+                count += 1
+    return count
@@ -0,0 +1,167 @@
+"""
+Password hashing with a tunable key-derivation function
+
+Hashes are self-describing strings, so the algorithm and cost can change
+without invalidating existing accounts:
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+
+Legacy accounts store a bare unsalted SHA-256 hex digest; those still verify
+and are reported by ``needs_rehash`` so login can upgrade them.
+
+All KDF work runs on a bounded thread pool, which caps how many CPU cores a
+login storm can occupy. The calling script thread still waits for the
+result; the pool limits concurrency, it does not make the call asynchronous.
+Work that would queue for longer than ``PASSWORD_HASH_MAX_WAIT_MS`` (judged
+from the running average KDF time) is refused with ``PasswordHashBusy``
+instead, so a storm gets fast "try again" answers rather than every login
+waiting behind all the others. One scrypt N=2^14 hash takes about 50 ms on
+one core, so the default admits about 40 queued logins per worker.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'scrypt')  # scrypt or pbkdf2_sha256
+SCRYPT_N = int(os.environ.get('SCRYPT_N', str(2 ** 14)))
+SCRYPT_R = int(os.environ.get('SCRYPT_R', '8'))
+SCRYPT_P = int(os.environ.get('SCRYPT_P', '1'))
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', '600000'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_WAIT_MS = int(os.environ.get('PASSWORD_HASH_MAX_WAIT_MS', '2000'))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Leaves the remaining cores to the script runners while logins queue here
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+class PasswordHashBusy(RuntimeError):
+    """The hashing pool is too backed up to start this hash within PASSWORD_HASH_MAX_WAIT_MS"""
+
+_admission_lock = threading.Lock()
+_admission = {'in_flight': 0, 'average_ms': 0.0, 'admitted': 0, 'rejected': 0}
+_dummy_hash = None
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # OpenSSL needs headroom above the 128 * n * r bytes the derivation itself uses
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p + 1024 * 1024, dklen=KEY_BYTES)
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, dklen=KEY_BYTES)
+
+def _hash_now(password: str) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    if PASSWORD_HASH_ALGORITHM == 'pbkdf2_sha256':
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(_pbkdf2(password, salt, PBKDF2_ITERATIONS))}"
+    key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+def _verify_now(password: str, stored: str) -> bool:
+    if not stored:
+        return False
+
+    parts = stored.split('$')
+    try:
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            candidate = _scrypt(password, _unb64(parts[4]), n, r, p)
+            return hmac.compare_digest(candidate, _unb64(parts[5]))
+        if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            candidate = _pbkdf2(password, _unb64(parts[2]), int(parts[1]))
+            return hmac.compare_digest(candidate, _unb64(parts[3]))
+    except (ValueError, TypeError):
+        return False
+
+    if len(parts) == 1:
+        # Legacy unsalted SHA-256
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    return False
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with _admission_lock:
+            average = _admission['average_ms']
+            _admission['average_ms'] = elapsed_ms if not average else average * 0.8 + elapsed_ms * 0.2
+
+def _run_on_pool(fn, *args):
+    """Run KDF work on the pool and wait for it, refusing work that would queue too long"""
+    with _admission_lock:
+        queued_ahead = _admission['in_flight'] // PASSWORD_HASH_WORKERS
+        # Until a hash has been timed, admit only what the workers can start right away
+        unmeasured = not _admission['average_ms'] and queued_ahead > 0
+        if unmeasured or queued_ahead * _admission['average_ms'] > PASSWORD_HASH_MAX_WAIT_MS:
+            _admission['rejected'] += 1
+            raise PasswordHashBusy("Too many sign-ins in progress; try again in a moment")
+        _admission['in_flight'] += 1
+        _admission['admitted'] += 1
+    try:
+        return _hash_pool.submit(_timed, fn, *args).result()
+    finally:
+        with _admission_lock:
+            _admission['in_flight'] -= 1
+
+def hash_password(password: str) -> str:
+    """Salted KDF hash of a password; blocks the caller until the hashing pool computes it
+
+    Raises PasswordHashBusy when the pool is too backed up.
+    """
+    return _run_on_pool(_hash_now, password)
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against any supported stored format; blocks the caller like hash_password"""
+    if stored and '$' not in stored:
+        return _verify_now(password, stored)  # Legacy SHA-256 is too cheap to queue
+    return _run_on_pool(_verify_now, password, stored)
+
+def dummy_hash() -> str:
+    """A hash at the configured cost to verify against for unknown usernames
+
+    Without it a login for a missing account returns without running the
+    KDF, and the response time tells an attacker which usernames exist.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+def pool_stats() -> Dict:
+    """Admission counters and the running average KDF time"""
+    with _admission_lock:
+        return dict(_admission)
+
+def hash_parameters(stored: str) -> Dict:
+    """Algorithm and cost recorded in a stored hash"""
+    parts = (stored or '').split('$')
+    if parts[0] == 'scrypt' and len(parts) == 6:
+        return {'algorithm': 'scrypt', 'n': int(parts[1]), 'r': int(parts[2]), 'p': int(parts[3])}
+    if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+        return {'algorithm': 'pbkdf2_sha256', 'iterations': int(parts[1])}
+    return {'algorithm': 'sha256_legacy'}
+
+def needs_rehash(stored: str) -> bool:
+    """True if a hash uses a legacy format or differs from the configured algorithm and cost"""
+    params = hash_parameters(stored)
+    if params['algorithm'] != PASSWORD_HASH_ALGORITHM:
+        return True
+    if params['algorithm'] == 'scrypt':
+        return (params['n'], params['r'], params['p']) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return params['iterations'] != PBKDF2_ITERATIONS
@@ -0,0 +1,173 @@
+"""
+Precomputed AI learning recommendations
+
+Recommendations are generated in a background worker whenever a user's
+progress changes meaningfully and are stored together with a fingerprint of
+the progress inputs. Page renders only read the stored result.
+
+The fingerprint comes from the database-backed progress counters, so it is
+the same in every session. Only real AI answers are stored; when the AI call
+fails, nothing is saved, and the same fingerprint is retried after
+RECOMMENDATION_RETRY_SECONDS.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import streamlit as st
+from utils.db_schema import LearningRecommendation, SessionLocal
+
+DEFAULT_RECOMMENDATIONS = [
+    "Practice coding exercises regularly",
+    "Review course materials for better understanding",
+    "Try implementing small projects",
+    "Join programming communities for help",
+    "Take quizzes to test your knowledge"
+]
+
+RECOMMENDATION_RETRY_SECONDS = int(os.environ.get('RECOMMENDATION_RETRY_SECONDS', '300'))
+
+def summarize_progress(user_progress: Dict) -> Dict:
+    """Reduce raw progress to the inputs that should change recommendations
+
+    Scores are bucketed so small fluctuations don't trigger a new AI call.
+    """
+    average_score = float(user_progress.get('average_quiz_score', 0) or 0)
+    return {
+        'lessons_completed': int(user_progress.get('lessons_completed', 0) or 0),
+        'code_submissions_count': int(user_progress.get('code_submissions_count', 0) or 0),
+        'quiz_count': int(user_progress.get('quiz_count', 0) or 0),
+        'average_quiz_score_bucket': int(average_score // 10) * 10
+    }
+
+def progress_fingerprint(summary: Dict) -> str:
+    """Stable hash of a progress summary"""
+    return hashlib.sha256(json.dumps(summary, sort_keys=True).encode()).hexdigest()
+
+class RecommendationStore:
+    """Background computation and storage of per-user recommendations"""
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recommendations")
+        self._lock = threading.Lock()
+        self._cache = {}  # user key -> (fingerprint, recommendations)
+        self._in_flight = set()
+        self._failed = {}  # user key -> (fingerprint, monotonic time of the failed attempt)
+
+    def _load(self, user_id: int) -> Optional[tuple]:
+        try:
+            with SessionLocal() as db:
+                row = db.query(LearningRecommendation).filter(LearningRecommendation.user_id == user_id).first()
+                # Rows saved before fallbacks were filtered may hold the generic list
+                if row and row.recommendations and row.recommendations != DEFAULT_RECOMMENDATIONS:
+                    return row.progress_fingerprint, row.recommendations
+        except Exception:
+            pass
+        return None
+
+    def _save(self, user_id: int, fingerprint: str, recommendations: List[str]):
+        with SessionLocal() as db:
+            row = db.query(LearningRecommendation).filter(LearningRecommendation.user_id == user_id).first()
+            if row is None:
+                row = LearningRecommendation(user_id=user_id)
+                db.add(row)
+            row.progress_fingerprint = fingerprint
+            row.recommendations = recommendations
+            row.computed_at = datetime.utcnow()
+            db.commit()
+
+    def _lookup(self, user_key) -> Optional[tuple]:
+        with self._lock:
+            entry = self._cache.get(user_key)
+        if entry is None and isinstance(user_key, int):
+            entry = self._load(user_key)
+            if entry is not None:
+                with self._lock:
+                    self._cache[user_key] = entry
+        return entry
+
+    def get(self, user_key) -> Optional[List[str]]:
+        """Return stored recommendations for a user, or None if none exist yet"""
+        entry = self._lookup(user_key)
+        return entry[1] if entry else None
+
+    def _compute(self, user_key, fingerprint: str, summary: Dict):
+        try:
+            from utils.ai_services import ai_assistant
+            # Raises instead of returning the generic list, which must not be stored as personalized
+            recommendations = ai_assistant.get_learning_recommendations(summary, fallback=False)
+        except Exception:
+            with self._lock:
+                self._failed[user_key] = (fingerprint, time.monotonic())
+                self._in_flight.discard((user_key, fingerprint))
+            return
+
+        try:
+            with self._lock:
+                self._cache[user_key] = (fingerprint, recommendations)
+                self._failed.pop(user_key, None)
+            if isinstance(user_key, int):
+                self._save(user_key, fingerprint, recommendations)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._in_flight.discard((user_key, fingerprint))
+
+    def refresh(self, user_key, user_progress: Dict) -> bool:
+        """Schedule a recomputation if the progress fingerprint changed
+
+        Returns True when a background computation was scheduled.
+        """
+        if user_key is None:
+            return False
+
+        summary = summarize_progress(user_progress)
+        fingerprint = progress_fingerprint(summary)
+
+        entry = self._lookup(user_key)
+        if entry is not None and entry[0] == fingerprint:
+            return False
+
+        with self._lock:
+            if (user_key, fingerprint) in self._in_flight:
+                return False
+            failed = self._failed.get(user_key)
+            if failed and failed[0] == fingerprint and time.monotonic() - failed[1] < RECOMMENDATION_RETRY_SECONDS:
+                return False
+            self._in_flight.add((user_key, fingerprint))
+
+        self._executor.submit(self._compute, user_key, fingerprint, summary)
+        return True
+
+# Global recommendation store instance
+recommendation_store = RecommendationStore()
+
+def _current_user_key():
+    user_data = st.session_state.get('user_data') or {}
+    return user_data.get('id') or user_data.get('username')
+
+def _current_progress(user_key) -> Dict:
+    """Database-backed progress counters; session state resets every session"""
+    from utils.database import get_user_metrics, get_user_progress_data
+    if isinstance(user_key, int):
+        try:
+            return get_user_metrics(user_key)
+        except Exception as e:
+            pass  # Continue to fallback
+    return get_user_progress_data()
+
+def refresh_recommendations():
+    """Recompute the current user's recommendations in the background if progress changed"""
+    user_key = _current_user_key()
+    if user_key is None:
+        return False
+    return recommendation_store.refresh(user_key, _current_progress(user_key))
+
+def get_cached_recommendations() -> Optional[List[str]]:
+    """Get the current user's precomputed recommendations without calling the AI service"""
+    return recommendation_store.get(_current_user_key())
@@ -0,0 +1,236 @@
+"""
+Retention for the user_activities table
+
+Raw events older than the retention window are folded into per-user daily
+aggregates, written to gzip NDJSON archive files and deleted in bounded
+batches; SQLite then returns the freed pages with incremental VACUUM. The
+policy lives in system_settings, so it can be changed without a deploy:
+
+    python -m utils.retention run
+    python -m utils.retention set activity_retention_days 30
+"""
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session
+from utils.db_schema import UserActivity, ActivityDailyAggregate, SystemSettings, SessionLocal, engine, create_tables
+
+# Policy keys in system_settings and their defaults; values are cast to the default's type
+RETENTION_DEFAULTS = {
+    'activity_retention_days': 90,
+    'activity_archive_enabled': True,
+    'activity_archive_dir': 'archives',
+    'activity_retention_batch_size': 5000,
+    'activity_retention_max_batches': 200,  # Bounds one run; the next run carries on
+    'activity_vacuum_pages': 2000,
+}
+
+RETENTION_DESCRIPTIONS = {
+    'activity_retention_days': 'Days of raw user_activities rows kept before aggregation',
+    'activity_archive_enabled': 'Write raw rows to gzip NDJSON files before deleting them',
+    'activity_archive_dir': 'Directory for activity archive files',
+    'activity_retention_batch_size': 'Rows aggregated, archived and deleted per transaction',
+    'activity_retention_max_batches': 'Maximum batches processed per retention run',
+    'activity_vacuum_pages': 'Free pages returned to the filesystem per incremental vacuum',
+}
+
+def _cast(value: str, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int):
+        return int(value)
+    return value
+
+def get_retention_policy() -> Dict:
+    """Retention settings from system_settings, falling back to the defaults"""
+    policy = dict(RETENTION_DEFAULTS)
+    with SessionLocal() as db:
+        rows = db.query(SystemSettings.setting_key, SystemSettings.setting_value).filter(
+            SystemSettings.setting_key.in_(list(RETENTION_DEFAULTS.keys()))
+        ).all()
+
+    for key, value in rows:
+        if value is None:
+            continue
+        try:
+            policy[key] = _cast(value, RETENTION_DEFAULTS[key])
+        except ValueError:
+            pass  # Keep the default for unparseable values
+    return policy
+
+def set_retention_setting(key: str, value: str):
+    """Store one retention setting"""
+    if key not in RETENTION_DEFAULTS:
+        raise KeyError(f"Unknown retention setting: {key}")
+    _cast(value, RETENTION_DEFAULTS[key])  # Reject values that wouldn't parse
+
+    with SessionLocal() as db:
+        setting = db.query(SystemSettings).filter(SystemSettings.setting_key == key).first()
+        if setting is None:
+            setting = SystemSettings(setting_key=key, description=RETENTION_DESCRIPTIONS[key])
+            db.add(setting)
+        setting.setting_value = str(value)
+        setting.updated_at = datetime.utcnow()
+        db.commit()
+
+def _upsert_aggregates(db: Session, rows: List[Dict]):
+    """Add a batch's daily counts to activity_daily_aggregates"""
+    per_key = {}
+    for row in rows:
+        key = (row['user_id'], row['timestamp'].date(), row['activity_type'])
+        aggregate = per_key.get(key)
+        if aggregate is None:
+            per_key[key] = {
+                'user_id': key[0], 'activity_date': key[1], 'activity_type': key[2], 'event_count': 1,
+                'first_event_at': row['timestamp'], 'last_event_at': row['timestamp']
+            }
+        else:
+            aggregate['event_count'] += 1
+            aggregate['first_event_at'] = min(aggregate['first_event_at'], row['timestamp'])
+            aggregate['last_event_at'] = max(aggregate['last_event_at'], row['timestamp'])
+
+    values = list(per_key.values())
+    if not values:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            least, greatest = func.min, func.max  # SQLite's multi-argument min/max are scalar
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            least, greatest = func.least, func.greatest
+
+        statement = dialect_insert(ActivityDailyAggregate).values(values)
+        excluded = statement.excluded
+        db.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'activity_date', 'activity_type'],
+            set_={
+                'event_count': ActivityDailyAggregate.event_count + excluded.event_count,
+                'first_event_at': least(ActivityDailyAggregate.first_event_at, excluded.first_event_at),
+                'last_event_at': greatest(ActivityDailyAggregate.last_event_at, excluded.last_event_at),
+            }
+        ))
+        return
+
+    for value in values:
+        existing = db.query(ActivityDailyAggregate).filter_by(
+            user_id=value['user_id'], activity_date=value['activity_date'], activity_type=value['activity_type']
+        ).first()
+        if existing is None:
+            db.add(ActivityDailyAggregate(**value))
+        else:
+            existing.event_count += value['event_count']
+            existing.first_event_at = min(existing.first_event_at, value['first_event_at'])
+            existing.last_event_at = max(existing.last_event_at, value['last_event_at'])
+    db.flush()
+
+def _open_archive(policy: Dict, started: datetime):
+    directory = policy['activity_archive_dir']
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"user_activities-{started.strftime('%Y%m%dT%H%M%S')}.ndjson.gz")
+    return path, gzip.open(path, 'at', encoding='utf-8')
+
+def _archive_rows(archive, rows: List[Dict]):
+    for row in rows:
+        archive.write(json.dumps(row, default=str) + "\n")
+    # The rows must be on disk before the transaction that deletes them commits
+    archive.flush()
+    os.fsync(archive.fileno())
+
+def incremental_vacuum(pages: int) -> Dict:
+    """Return up to pages free pages to the filesystem (SQLite only)"""
+    if engine.dialect.name != 'sqlite':
+        return {'supported': False}
+
+    with engine.connect() as conn:
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        free_before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if mode != 2:
+            # Files created before auto_vacuum=INCREMENTAL need one full VACUUM to switch modes
+            return {'supported': False, 'auto_vacuum': mode, 'free_pages': free_before}
+
+        # execute() stops the sqlite3 module after the first freed page; executescript() runs it to completion
+        conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        free_after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        conn.commit()
+
+    return {'supported': True, 'pages_released': free_before - free_after, 'free_pages': free_after}
+
+def run_retention(now: datetime = None, policy: Dict = None) -> Dict:
+    """Aggregate, archive and delete user_activities rows older than the retention window"""
+    now = now or datetime.utcnow()
+    policy = policy or get_retention_policy()
+    cutoff = datetime(now.year, now.month, now.day) - timedelta(days=policy['activity_retention_days'])
+    batch_size = policy['activity_retention_batch_size']
+
+    report = {'cutoff': cutoff.isoformat(), 'rows_deleted': 0, 'batches': 0, 'archive_path': None}
+    started = time.perf_counter()
+    archive = None
+
+    columns = [UserActivity.id, UserActivity.user_id, UserActivity.activity_type,
+               UserActivity.activity_data, UserActivity.timestamp]
+
+    try:
+        while report['batches'] < policy['activity_retention_max_batches']:
+            with SessionLocal() as db:
+                rows = [dict(row) for row in db.execute(
+                    select(*columns)
+                    .where(UserActivity.timestamp < cutoff)
+                    .order_by(UserActivity.timestamp, UserActivity.id)
+                    .limit(batch_size)
+                ).mappings()]
+                if not rows:
+                    break
+
+                if policy['activity_archive_enabled']:
+                    if archive is None:
+                        report['archive_path'], archive = _open_archive(policy, now)
+                    _archive_rows(archive, rows)
+
+                _upsert_aggregates(db, rows)
+                db.execute(delete(UserActivity).where(UserActivity.id.in_([row['id'] for row in rows])))
+                db.commit()
+
+            report['rows_deleted'] += len(rows)
+            report['batches'] += 1
+            if len(rows) < batch_size:
+                break
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if report['rows_deleted']:
+        report['vacuum'] = incremental_vacuum(policy['activity_vacuum_pages'])
+    report['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+def enable_incremental_vacuum() -> int:
+    """One-off full VACUUM that switches an older SQLite file to auto_vacuum=INCREMENTAL"""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    create_tables()
+
+    if command == "run":
+        print(json.dumps(run_retention(), indent=2, default=str))
+    elif command == "set" and len(sys.argv) == 4:
+        set_retention_setting(sys.argv[2], sys.argv[3])
+        print(json.dumps(get_retention_policy(), indent=2))
+    elif command == "enable-incremental-vacuum":
+        print(f"auto_vacuum mode is now {enable_incremental_vacuum()}")
+    elif command == "show":
+        print(json.dumps(get_retention_policy(), indent=2))
+    else:
+        print("Usage: python -m utils.retention run | show | set <key> <value> | enable-incremental-vacuum")
+        sys.exit(1)
@@ -0,0 +1,165 @@
+"""
+Signed session tokens and the in-process user cache
+
+A token is ``<payload>.<signature>``: the base64url payload holds the user id,
+the user's session generation and the expiry, signed with HMAC-SHA256. The
+signing key comes from ``SESSION_SECRET`` or is generated once and kept in
+system_settings, so tokens survive server restarts. Verifying the signature
+needs no database access, and the user record it points to is served from a
+TTL'd LRU cache.
+
+Revocation is per user: logging out or changing the password bumps
+users.session_generation, and a token minted under an older generation no
+longer restores a session. Other processes notice once their cached record
+expires (USER_CACHE_TTL_SECONDS).
+
+Handing the token to the browser is opt-in (``SESSION_URL_TOKENS=1``).
+Streamlit gives scripts no way to set cookies, so the token would travel in
+the ``?session=`` query parameter, where the address bar, browser history,
+bookmarks and any proxy or access logs that record URLs can leak it; a copied
+link signs its holder in until the token expires. Left off, a session lives
+only as long as its websocket, as it did before tokens. Turned on, tokens
+default to short lifetimes: serve the app over HTTPS and keep request URLs
+out of shared logs.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from utils.db_schema import SystemSettings, SessionLocal
+
+SESSION_URL_TOKENS = os.environ.get('SESSION_URL_TOKENS', '0') == '1'
+SESSION_TOKEN_TTL_SECONDS = int(os.environ.get('SESSION_TOKEN_TTL_SECONDS', str(3600)))
+SESSION_REMEMBER_TTL_SECONDS = int(os.environ.get('SESSION_REMEMBER_TTL_SECONDS', str(12 * 3600)))
+USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', '300'))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+
+SIGNING_KEY_SETTING = 'session_signing_key'
+
+_signing_key = None
+_signing_key_lock = threading.Lock()
+
+def _load_signing_key() -> bytes:
+    with SessionLocal() as db:
+        setting = db.query(SystemSettings).filter(SystemSettings.setting_key == SIGNING_KEY_SETTING).first()
+        if setting is not None:
+            return setting.setting_value.encode()
+
+        key = secrets.token_hex(32)
+        db.add(SystemSettings(
+            setting_key=SIGNING_KEY_SETTING,
+            setting_value=key,
+            description='HMAC key for session tokens; changing it signs everyone out'
+        ))
+        try:
+            db.commit()
+            return key.encode()
+        except IntegrityError:
+            # Another process stored its key first; use that one
+            db.rollback()
+            setting = db.query(SystemSettings).filter(SystemSettings.setting_key == SIGNING_KEY_SETTING).one()
+            return setting.setting_value.encode()
+
+def get_signing_key() -> bytes:
+    """The HMAC key, loaded once per process"""
+    global _signing_key
+    if _signing_key is None:
+        with _signing_key_lock:
+            if _signing_key is None:
+                secret = os.environ.get('SESSION_SECRET')
+                _signing_key = secret.encode() if secret else _load_signing_key()
+    return _signing_key
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(get_signing_key(), payload.encode('ascii'), hashlib.sha256).digest())
+
+def issue_token(user_id: int, ttl_seconds: int = SESSION_TOKEN_TTL_SECONDS, generation: int = 0) -> str:
+    """Signed token for user_id at the given session generation that expires after ttl_seconds"""
+    payload = _b64encode(f"{user_id}:{generation}:{int(time.time()) + ttl_seconds}".encode('ascii'))
+    return f"{payload}.{_sign(payload)}"
+
+def verify_token(token: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(user id, session generation) of a valid, unexpired token, otherwise None"""
+    if not token or '.' not in token:
+        return None
+
+    payload, signature = token.rsplit('.', 1)
+    try:
+        if not hmac.compare_digest(_sign(payload), signature):
+            return None
+        # Tokens from before generations existed have two fields and fail to unpack
+        user_id, generation, expires = _b64decode(payload).decode('ascii').split(':')
+        if int(expires) < time.time():
+            return None
+        return int(user_id), int(generation)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Global user record cache, keyed by user id
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+def get_cached_user(user_id: int, loader: Callable[[int], Optional[Dict]]) -> Optional[Dict]:
+    """User record from the cache, loading and caching it on a miss"""
+    record = user_cache.get(user_id)
+    if record is None:
+        record = loader(user_id)
+        if record is not None:
+            user_cache.put(user_id, record)
+    return record
+
+def invalidate_user(user_id: int):
+    """Drop a user's cached record after a profile, role or status change"""
+    user_cache.invalidate(user_id)
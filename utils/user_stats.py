@@ -0,0 +1,279 @@
+"""
+Per-user statistics rollup
+
+The user_stats table is updated inside the same transaction as each write to
+user_activities, quiz_results and code_submissions, so dashboard metrics are
+a single primary-key lookup. A user's first write seeds their row from the
+raw tables, and the bootstrap backfills an empty table once; run
+``python -m utils.user_stats rebuild`` to repair it by hand.
+"""
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import func, case, update, delete, select, union
+from sqlalchemy.orm import Session
+from utils.db_schema import UserStats, UserActivity, ActivityDailyAggregate, QuizResult, CodeSubmission, SessionLocal, create_tables
+
+def _seed_missing(db: Session, user_ids: Iterable[int]) -> Set[int]:
+    """Create rollup rows for users without one, computed from the raw tables
+
+    Callers insert the new raw rows first, in the same transaction, so a
+    seeded row already counts them; returns the seeded ids, which must not be
+    incremented again.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+
+    existing = {row[0] for row in db.query(UserStats.user_id).filter(UserStats.user_id.in_(user_ids))}
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    if not missing:
+        return set()
+
+    values = list(_compute_stats(db, missing).values())
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.bulk_insert_mappings(UserStats, values)
+        db.flush()
+        return set(missing)
+
+    # A concurrent writer may seed the same user first; only rows inserted here count as seeded
+    inserted = db.execute(
+        dialect_insert(UserStats).values(values).on_conflict_do_nothing().returning(UserStats.user_id)
+    )
+    return {row[0] for row in inserted}
+
+def _advance_streak(last_date: Optional[date], streak: int, activity_date: date):
+    """Return (last_date, streak) after recording activity on activity_date"""
+    if last_date is None or activity_date > last_date + timedelta(days=1):
+        return activity_date, 1
+    if activity_date == last_date + timedelta(days=1):
+        return activity_date, streak + 1
+    return last_date, max(streak, 1)
+
+def apply_activity_batch(db: Session, rows: List[Dict]):
+    """Fold a batch of new user_activities rows into the rollup"""
+    per_user = {}
+    for row in rows:
+        stats = per_user.setdefault(row['user_id'], {'count': 0, 'lessons': 0, 'dates': set()})
+        stats['count'] += 1
+        if row['activity_type'] == 'lesson_completed':
+            stats['lessons'] += 1
+        stats['dates'].add(row['timestamp'].date())
+
+    seeded = _seed_missing(db, per_user.keys())
+    per_user = {user_id: stats for user_id, stats in per_user.items() if user_id not in seeded}
+    if not per_user:
+        return
+
+    current = {
+        row.user_id: (row.last_activity_date, row.current_streak or 0)
+        for row in db.query(UserStats.user_id, UserStats.last_activity_date, UserStats.current_streak)
+        .filter(UserStats.user_id.in_(list(per_user.keys())))
+    }
+
+    for user_id, stats in per_user.items():
+        last_date, streak = current.get(user_id, (None, 0))
+        for activity_date in sorted(stats['dates']):
+            last_date, streak = _advance_streak(last_date, streak, activity_date)
+
+        db.execute(
+            update(UserStats).where(UserStats.user_id == user_id).values(
+                total_activities=UserStats.total_activities + stats['count'],
+                lessons_completed=UserStats.lessons_completed + stats['lessons'],
+                last_activity_date=last_date,
+                current_streak=streak,
+                updated_at=datetime.utcnow()
+            )
+        )
+
+def apply_quiz_batch(db: Session, rows: List[Dict]):
+    """Fold a batch of new quiz_results rows into the rollup"""
+    per_user = {}
+    for row in rows:
+        stats = per_user.setdefault(row['user_id'], {'count': 0, 'correct': 0, 'questions': 0})
+        stats['count'] += 1
+        stats['correct'] += row['correct_answers']
+        stats['questions'] += row['total_questions']
+
+    seeded = _seed_missing(db, per_user.keys())
+    for user_id, stats in per_user.items():
+        if user_id in seeded:
+            continue
+        db.execute(
+            update(UserStats).where(UserStats.user_id == user_id).values(
+                quiz_count=UserStats.quiz_count + stats['count'],
+                quiz_correct_sum=UserStats.quiz_correct_sum + stats['correct'],
+                quiz_question_sum=UserStats.quiz_question_sum + stats['questions'],
+                updated_at=datetime.utcnow()
+            )
+        )
+
+def apply_code_submission_batch(db: Session, rows: List[Dict]):
+    """Fold a batch of new code submissions into the rollup"""
+    per_user = {}
+    for row in rows:
+        per_user[row['user_id']] = per_user.get(row['user_id'], 0) + 1
+
+    seeded = _seed_missing(db, per_user.keys())
+    for user_id, count in per_user.items():
+        if user_id in seeded:
+            continue
+        db.execute(
+            update(UserStats).where(UserStats.user_id == user_id).values(
+                code_submission_count=UserStats.code_submission_count + count,
+                updated_at=datetime.utcnow()
+            )
+        )
+
+def get_user_stats(user_id: int) -> Optional[Dict]:
+    """Rollup counters for one user, or None if the user has no row yet"""
+    with SessionLocal() as db:
+        stats = db.get(UserStats, user_id)
+        if stats is None:
+            return None
+
+        # A streak only counts while the user was active today or yesterday
+        streak = stats.current_streak
+        if stats.last_activity_date is None or stats.last_activity_date < datetime.utcnow().date() - timedelta(days=1):
+            streak = 0
+
+        return {
+            'total_activities': stats.total_activities,
+            'lessons_completed': stats.lessons_completed,
+            'quiz_count': stats.quiz_count,
+            'average_quiz_score': (stats.quiz_correct_sum / stats.quiz_question_sum) * 100 if stats.quiz_question_sum else 0,
+            'code_submissions_count': stats.code_submission_count,
+            'last_activity_date': stats.last_activity_date,
+            'current_streak': streak
+        }
+
+def reset_user_stats(db: Session, user_id: int):
+    """Remove a user's rollup row, e.g. when their learning history is deleted"""
+    db.execute(delete(UserStats).where(UserStats.user_id == user_id))
+
+def _streak_from_dates(dates: List[date]) -> int:
+    """Length of the consecutive-day run ending at the last date"""
+    streak = 0
+    previous = None
+    for activity_date in dates:
+        if previous is not None and activity_date == previous + timedelta(days=1):
+            streak += 1
+        elif activity_date != previous:
+            streak = 1
+        previous = activity_date
+    return streak
+
+def _compute_stats(db: Session, user_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+    """Rollup rows computed from the raw tables, keyed by user id; every requested id gets a row"""
+    def scoped(query, column):
+        return query.filter(column.in_(user_ids)) if user_ids else query
+
+    totals = {}
+
+    def row_for(user_id):
+        return totals.setdefault(user_id, {
+            'user_id': user_id, 'total_activities': 0, 'lessons_completed': 0, 'quiz_count': 0,
+            'quiz_correct_sum': 0, 'quiz_question_sum': 0, 'code_submission_count': 0,
+            'last_activity_date': None, 'current_streak': 0, 'updated_at': datetime.utcnow()
+        })
+
+    for user_id in user_ids or []:
+        row_for(user_id)
+
+    activity_query = db.query(
+        UserActivity.user_id,
+        func.count(UserActivity.id),
+        func.coalesce(func.sum(case((UserActivity.activity_type == 'lesson_completed', 1), else_=0)), 0)
+    ).group_by(UserActivity.user_id)
+    for user_id, count, lessons in scoped(activity_query, UserActivity.user_id):
+        row = row_for(user_id)
+        row['total_activities'] = count
+        row['lessons_completed'] = int(lessons)
+    
+    # Events already rolled up by the retention job
+    archived_query = db.query(
+        ActivityDailyAggregate.user_id,
+        func.sum(ActivityDailyAggregate.event_count),
+        func.coalesce(func.sum(case(
+            (ActivityDailyAggregate.activity_type == 'lesson_completed', ActivityDailyAggregate.event_count), else_=0
+        )), 0)
+    ).group_by(ActivityDailyAggregate.user_id)
+    for user_id, count, lessons in scoped(archived_query, ActivityDailyAggregate.user_id):
+        row = row_for(user_id)
+        row['total_activities'] += int(count)
+        row['lessons_completed'] += int(lessons)
+
+    quiz_query = db.query(
+        QuizResult.user_id,
+        func.count(QuizResult.id),
+        func.coalesce(func.sum(QuizResult.correct_answers), 0),
+        func.coalesce(func.sum(QuizResult.total_questions), 0)
+    ).group_by(QuizResult.user_id)
+    for user_id, count, correct, questions in scoped(quiz_query, QuizResult.user_id):
+        row = row_for(user_id)
+        row['quiz_count'] = count
+        row['quiz_correct_sum'] = int(correct)
+        row['quiz_question_sum'] = int(questions)
+
+    submission_query = db.query(CodeSubmission.user_id, func.count(CodeSubmission.id)).group_by(CodeSubmission.user_id)
+    for user_id, count in scoped(submission_query, CodeSubmission.user_id):
+        row_for(user_id)['code_submission_count'] = count
+
+    # Distinct activity days per user (raw and archived), streamed in order, for the streak
+    raw_days = select(UserActivity.user_id.label('user_id'), func.date(UserActivity.timestamp).label('day'))
+    archived_days = select(ActivityDailyAggregate.user_id, func.date(ActivityDailyAggregate.activity_date))
+    if user_ids:
+        raw_days = raw_days.where(UserActivity.user_id.in_(user_ids))
+        archived_days = archived_days.where(ActivityDailyAggregate.user_id.in_(user_ids))
+    days = union(raw_days, archived_days).subquery()
+    day_query = select(days.c.user_id, days.c.day).order_by(days.c.user_id, days.c.day)
+    current_user, dates = None, []
+    for user_id, activity_day in db.execute(day_query.execution_options(yield_per=1000)):
+        if user_id != current_user and dates:
+            row_for(current_user).update(last_activity_date=dates[-1], current_streak=_streak_from_dates(dates))
+            dates = []
+        current_user = user_id
+        dates.append(activity_day if isinstance(activity_day, date) else date.fromisoformat(str(activity_day)[:10]))
+    if dates:
+        row_for(current_user).update(last_activity_date=dates[-1], current_streak=_streak_from_dates(dates))
+
+    return totals
+
+def rebuild_user_stats(user_ids: Optional[List[int]] = None) -> int:
+    """Recompute the rollup from the raw tables; returns the number of users rebuilt"""
+    with SessionLocal() as db:
+        totals = _compute_stats(db, user_ids)
+
+        if user_ids:
+            db.execute(delete(UserStats).where(UserStats.user_id.in_(user_ids)))
+        else:
+            db.execute(delete(UserStats))
+        if totals:
+            db.bulk_insert_mappings(UserStats, list(totals.values()))
+        db.commit()
+
+        return len(totals)
+
+def backfill_if_empty() -> int:
+    """Rebuild the whole rollup once when user_stats is empty but activity history exists"""
+    with SessionLocal() as db:
+        has_stats = db.query(UserStats.user_id).first() is not None
+        has_history = db.query(UserActivity.id).first() is not None or db.query(QuizResult.id).first() is not None \
+            or db.query(CodeSubmission.id).first() is not None
+    if has_stats or not has_history:
+        return 0
+    return rebuild_user_stats()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Usage: python -m utils.user_stats rebuild [user_id ...]")
+        sys.exit(1)
+
+    create_tables()
+    rebuilt = rebuild_user_stats([int(arg) for arg in sys.argv[2:]] or None)
+    print(f"Rebuilt statistics for {rebuilt} users")
@@ -0,0 +1,221 @@
+"""
+Write-behind batching for high-frequency database inserts
+
+Callers hand rows to a BatchWriter, which returns immediately. A background
+thread flushes the buffer with a single executemany transaction every
+``max_batch`` rows or ``max_delay_ms`` milliseconds, whichever comes first.
+
+A failed flush is retried with exponential backoff. Rows are never dropped:
+once a row has failed ``max_retries`` times it is handed to the ``on_failure``
+spill callback, or kept queued until the database recovers when there is no
+callback. ``on_success`` is called with each batch that was written.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+class BatchWriter:
+    """Buffered, batched writer backed by a daemon flush thread"""
+
+    def __init__(self, name: str, flush_fn: Callable[[List[Dict]], None], max_batch: int = 100,
+                 max_delay_ms: int = 200, max_queue: int = 10000, max_retries: int = 3,
+                 backoff_ms: int = 100, max_backoff_ms: int = 30000,
+                 on_failure: Optional[Callable[[List[Dict]], None]] = None,
+                 on_success: Optional[Callable[[List[Dict]], None]] = None):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff = backoff_ms / 1000
+        self.max_backoff = max_backoff_ms / 1000
+        self.on_failure = on_failure
+        self.on_success = on_success
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._oldest_at = None
+        self._retry_at = 0.0
+        self._consecutive_failures = 0
+        self._closed = False
+        self._thread = None
+
+        self._metrics = {
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+            'rows_submitted': 0,
+            'rows_written': 0,
+            'rows_rejected': 0,
+            'rows_spilled': 0,
+            'batches_written': 0,
+            'failed_batches': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+            self._thread.start()
+
+    def submit(self, row: Dict) -> bool:
+        """Queue a row for writing; returns False if the buffer is full or closed"""
+        with self._condition:
+            if self._closed or len(self._queue) >= self.max_queue:
+                self._metrics['rows_rejected'] += 1
+                return False
+
+            if not self._queue:
+                self._oldest_at = time.monotonic()
+            self._queue.append((row, 0))
+            self._metrics['rows_submitted'] += 1
+            self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], len(self._queue))
+
+            self._ensure_thread()
+            # The first row starts the max_delay clock, which an idle flush thread isn't timing yet
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._condition.notify()
+        return True
+
+    def pending(self, predicate: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """Rows accepted but not yet written, optionally filtered"""
+        with self._condition:
+            return [row for row, _ in self._queue if predicate is None or predicate(row)]
+
+    def _take_batch(self) -> List[tuple]:
+        with self._condition:
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            self._oldest_at = time.monotonic() if self._queue else None
+            return batch
+
+    def _write(self, batch: List[tuple]):
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            self.flush_fn([row for row, _ in batch])
+        except Exception:
+            failed = [(row, attempts + 1) for row, attempts in batch]
+            spill = [row for row, attempts in failed if attempts >= self.max_retries] if self.on_failure else []
+            if spill:
+                try:
+                    self.on_failure(spill)
+                    failed = [(row, attempts) for row, attempts in failed if attempts < self.max_retries]
+                except Exception:
+                    spill = []  # Nowhere to put them; keep retrying
+
+            with self._condition:
+                self._metrics['failed_batches'] += 1
+                self._metrics['rows_spilled'] += len(spill)
+                self._consecutive_failures += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (self._consecutive_failures - 1))
+                self._retry_at = time.monotonic() + delay
+                # Put the rows back at the front, keeping their order
+                self._queue.extendleft(reversed(failed))
+                if failed and self._oldest_at is None:
+                    self._oldest_at = time.monotonic()
+            return
+
+        with self._condition:
+            self._consecutive_failures = 0
+            self._retry_at = 0.0
+            self._metrics['rows_written'] += len(batch)
+            self._metrics['batches_written'] += 1
+            self._metrics['last_batch_size'] = len(batch)
+            self._metrics['last_flush_ms'] = (time.perf_counter() - started) * 1000
+
+        if self.on_success:
+            try:
+                self.on_success([row for row, _ in batch])
+            except Exception:
+                pass  # The rows are written; a callback failure must not requeue them
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.monotonic()
+                    if self._queue and now < self._retry_at:
+                        # Backing off after a failed flush
+                        self._condition.wait(self._retry_at - now)
+                        continue
+                    if len(self._queue) >= self.max_batch:
+                        break
+                    if self._queue and now - self._oldest_at >= self.max_delay:
+                        break
+                    timeout = None
+                    if self._queue:
+                        timeout = max(0.0, self.max_delay - (now - self._oldest_at))
+                    self._condition.wait(timeout)
+
+                if self._closed:
+                    return  # close() flushes what is left
+
+            with self._flush_lock:
+                self._write(self._take_batch())
+
+    def flush(self):
+        """Write everything currently buffered, synchronously"""
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    if not self._queue:
+                        return
+                    failures = self._metrics['failed_batches']
+                self._write(self._take_batch())
+                with self._condition:
+                    if self._metrics['failed_batches'] != failures:
+                        return
+
+    def close(self):
+        """Flush remaining rows and stop accepting new ones; unwritable rows go to on_failure"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+
+        with self._condition:
+            remaining = [row for row, _ in self._queue] if self.on_failure else []
+        if remaining:
+            try:
+                self.on_failure(remaining)
+                with self._condition:
+                    self._queue.clear()
+                    self._metrics['rows_spilled'] += len(remaining)
+            except Exception:
+                pass
+
+    def metrics(self) -> Dict:
+        """Queue depth and throughput counters"""
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics['queue_depth'] = len(self._queue)
+            metrics['oldest_pending_ms'] = (time.monotonic() - self._oldest_at) * 1000 if self._oldest_at and self._queue else 0.0
+            metrics['consecutive_failures'] = self._consecutive_failures
+            metrics['retry_in_ms'] = max(0.0, (self._retry_at - time.monotonic()) * 1000) if self._queue else 0.0
+        metrics['name'] = self.name
+        return metrics
+
+_writers = []
+
+def register_writer(writer: BatchWriter) -> BatchWriter:
+    """Track a writer so it is flushed when the server process exits"""
+    _writers.append(writer)
+    return writer
+
+def get_writer_metrics() -> List[Dict]:
+    """Metrics for every registered writer"""
+    return [writer.metrics() for writer in _writers]
+
+@atexit.register
+def _flush_all_writers():
+    for writer in _writers:
+        try:
+            writer.close()
+        except Exception:
+            pass